@@ -209,6 +209,20 @@ def tts_say():
         return make_response(status="error", error=repr(e))
 
 
+@app.route("/tts_stop", methods=["POST"])
+def tts_stop():
+    """
+    Stop lopende spraak (barge-in). Een lopende /tts-call keert daarna terug.
+    Vereist dat de server threaded draait (anders wacht dit op die /tts-call).
+    """
+    try:
+        tts = get_proxy("ALTextToSpeech")
+        tts.stopAll()
+        return make_response(data="TTS gestopt")
+    except Exception as e:
+        return make_response(status="error", error=repr(e))
+
+
 @app.route("/list_behaviors", methods=["GET"])
 def list_behaviors_ep():
     """
@@ -489,4 +503,5 @@ if __name__ == "__main__":
 
     local_ip = _get_local_ip()
     sys.stdout.write("Flask app beschikbaar op: http://%s:%s\n" % (local_ip, args.port))
-    app.run(host=args.host, port=args.port)
+    # threaded: /tts_stop moet kunnen binnenkomen terwijl /tts nog blokkeert in say()
+    app.run(host=args.host, port=args.port, threaded=True)
@@ -68,6 +68,23 @@ class TestTtsRoute(unittest.TestCase):
         self.assertEqual(arg, u"")
 
 
+class TestTtsStopRoute(unittest.TestCase):
+
+    @patch("nao_api.get_proxy")
+    def test_tts_stop_calls_stop_all(self, mock_get_proxy):
+        tts = MagicMock()
+        mock_get_proxy.return_value = tts
+
+        client = nao_api.app.test_client()
+        resp = client.post("/tts_stop")
+
+        self.assertEqual(resp.status_code, 200)
+        data = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual(data["status"], "ok")
+        mock_get_proxy.assert_called_once_with("ALTextToSpeech")
+        tts.stopAll.assert_called_once_with()
+
+
 class TestDoBehaviorRoute(unittest.TestCase):
 
     @patch("nao_api.is_awake", return_value=True)
@@ -0,0 +1,83 @@
+# py3_nao_behavior_manager/dialog/async_adapters.py
+from __future__ import annotations
+
+import asyncio
+import inspect
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+from dialog.interfaces import History, LLMResult, UserInput
+
+
+def is_async_method(obj: Any, name: str) -> bool:
+    return inspect.iscoroutinefunction(getattr(obj, name, None))
+
+
+class _ExecutorAdapter:
+    """
+    Basis: draait blokkerende calls van een sync backend in een executor
+    (default: de executor van de event loop), zodat de loop vrij blijft.
+    Andere attributen (mic, stop, close, ...) lopen door naar de sync backend.
+    """
+
+    def __init__(self, backend: Any, executor: Optional[Executor] = None) -> None:
+        self.backend = backend
+        self.executor = executor
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def __getattr__(self, name: str) -> Any:
+        # alleen aangeroepen voor attributen die de adapter zelf niet heeft
+        return getattr(self.backend, name)
+
+
+class AsyncInputAdapter(_ExecutorAdapter):
+    async def get_input(self) -> UserInput:
+        return await self._call(self.backend.get_input)
+
+
+class AsyncLLMAdapter(_ExecutorAdapter):
+    async def generate(self, messages: History) -> LLMResult:
+        return await self._call(self.backend.generate, messages)
+
+
+class AsyncStreamingLLMAdapter(AsyncLLMAdapter):
+    """
+    Voor sync backends met generate_stream: on_delta wordt op de event loop
+    aangeroepen (call_soon_threadsafe), in volgorde, vóór generate_stream terugkeert.
+    """
+
+    async def generate_stream(self, messages: History, on_delta: Callable[[str], None]) -> LLMResult:
+        loop = asyncio.get_running_loop()
+
+        def delta_to_loop(delta: str) -> None:
+            loop.call_soon_threadsafe(on_delta, delta)
+
+        return await self._call(self.backend.generate_stream, messages, delta_to_loop)
+
+
+class AsyncOutputAdapter(_ExecutorAdapter):
+    async def emit(self, text: str) -> None:
+        await self._call(self.backend.emit, text)
+
+
+def to_async_input(backend: Any, executor: Optional[Executor] = None) -> Any:
+    if is_async_method(backend, "get_input"):
+        return backend
+    return AsyncInputAdapter(backend, executor)
+
+
+def to_async_llm(backend: Any, executor: Optional[Executor] = None) -> Any:
+    if is_async_method(backend, "generate"):
+        return backend
+    if hasattr(backend, "generate_stream"):
+        return AsyncStreamingLLMAdapter(backend, executor)
+    return AsyncLLMAdapter(backend, executor)
+
+
+def to_async_output(backend: Any, executor: Optional[Executor] = None) -> Any:
+    if is_async_method(backend, "emit"):
+        return backend
+    return AsyncOutputAdapter(backend, executor)
@@ -0,0 +1,138 @@
+# py3_nao_behavior_manager/dialog/backends/audio_stream.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+import numpy as np
+
+
+class BlockRingBuffer:
+    """
+    Thread-safe, begrensde FIFO van audio-blocks (int16 mono) met timestamp.
+
+    Bedoeld tussen een achtergrond-producer (audio-callback / reader-thread) en
+    de VAD-capture. Is de buffer vol, dan valt het oudste block eruit en telt
+    'dropped' op (overflow-boekhouding); de producer blokkeert dus nooit.
+
+    Timestamps zijn time.monotonic() op het moment van binnenkomst.
+
+    Listeners (add_listener) zien elk block direct bij put(), op de producer-thread,
+    zonder het uit de buffer te halen (bijv. barge-in-detectie naast de capture).
+    Ze moeten dus goedkoop zijn; een exception wordt ingeslikt.
+    """
+
+    def __init__(self, max_blocks: int) -> None:
+        self.max_blocks = max(1, int(max_blocks))
+        self._dq: Deque[Tuple[float, np.ndarray]] = deque(maxlen=self.max_blocks)
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[float, np.ndarray], None]] = []
+
+        self.dropped = 0   # blocks weggevallen door overflow
+        self.received = 0  # totaal aantal put()-calls
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._dq)
+
+    def put(self, block: np.ndarray, ts: Optional[float] = None) -> None:
+        if ts is None:
+            ts = time.monotonic()
+        with self._cond:
+            if len(self._dq) == self.max_blocks:
+                self.dropped += 1
+            self._dq.append((ts, block))
+            self.received += 1
+            self._cond.notify()
+            listeners = self._listeners
+
+        for fn in listeners:
+            try:
+                fn(ts, block)
+            except Exception:
+                pass
+
+    def add_listener(self, fn: Callable[[float, np.ndarray], None]) -> None:
+        with self._cond:
+            self._listeners = self._listeners + [fn]  # copy-on-write: put() itereert zonder lock
+
+    def remove_listener(self, fn: Callable[[float, np.ndarray], None]) -> None:
+        with self._cond:
+            self._listeners = [f for f in self._listeners if f is not fn]
+
+    def get_with_ts(self, timeout: float) -> Optional[Tuple[float, np.ndarray]]:
+        with self._cond:
+            if not self._dq:
+                self._cond.wait(timeout)
+            if not self._dq:
+                return None
+            return self._dq.popleft()
+
+    def get(self, timeout: float) -> Optional[np.ndarray]:
+        """Signatuur past op VAD capture(get_block=...)."""
+        item = self.get_with_ts(timeout)
+        return None if item is None else item[1]
+
+    def discard_before(self, ts: float) -> int:
+        """Gooi blocks ouder dan ts weg (verouderde audio); retourneert het aantal."""
+        n = 0
+        with self._cond:
+            while self._dq and self._dq[0][0] < ts:
+                self._dq.popleft()
+                n += 1
+        return n
+
+    def clear(self) -> int:
+        with self._cond:
+            n = len(self._dq)
+            self._dq.clear()
+            return n
+
+
+class PersistentStreamMic:
+    """
+    Mixin voor mics met een persistent stream in een BlockRingBuffer (LaptopMic, NaoSshMic).
+
+    Verwacht op de mic: _ring (BlockRingBuffer), _vad (VAD-capturer), persistent_stream,
+    speaking_gate (Optional[SpeakingGate]) en _start_stream() (idempotent: stream openen
+    als hij nog niet loopt).
+    """
+
+    _ring: BlockRingBuffer
+    _vad: Any
+    persistent_stream: bool
+    speaking_gate: Any
+
+    def _start_stream(self) -> None:
+        raise NotImplementedError
+
+    @property
+    def dropped_blocks(self) -> int:
+        """Aantal blocks dat uit de ringbuffer viel omdat niemand las (overflow)."""
+        return self._ring.dropped
+
+    def add_block_listener(self, fn: Callable[[float, np.ndarray], None]) -> None:
+        """fn(ts, block) voor elk binnenkomend block (barge-in); vereist persistent_stream."""
+        if not self.persistent_stream:
+            raise RuntimeError("add_block_listener vereist persistent_stream: true")
+        self._start_stream()
+        self._ring.add_listener(fn)
+
+    def remove_block_listener(self, fn: Callable[[float, np.ndarray], None]) -> None:
+        self._ring.remove_listener(fn)
+
+    def speech_detector(self) -> Callable[[np.ndarray], bool]:
+        """block -> spraak? volgens de VAD van deze mic (rms-drempels of webrtc); voor barge-in."""
+        return self._vad.speech_detector()
+
+    def _get_block(self) -> Callable[[float], Optional[np.ndarray]]:
+        # overlap_listen: blocks van terwijl de robot sprak (plus echo-staart) overslaan
+        if self.speaking_gate is None:
+            return self._ring.get
+        return self.speaking_gate.gated(self._ring.get_with_ts)
+
+    def _hold(self) -> Optional[Callable[[], bool]]:
+        # overlap_listen: start-timeout pas laten lopen als de robot uitgesproken is
+        return self.speaking_gate.muted_now if self.speaking_gate is not None else None
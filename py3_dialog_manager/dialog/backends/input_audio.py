@@ -5,7 +5,9 @@ from typing import Optional
 
 from prompt_toolkit import prompt  # required dependency
 
+from dialog import timing
 from dialog.interfaces import InputBackend, UserInput
+from dialog.backends.stt_streaming import IncrementalTranscriber
 
 
 class AudioInputBackend(InputBackend):
@@ -24,6 +26,12 @@ class AudioInputBackend(InputBackend):
         Als confirm aan staat, wordt INPUT sowieso getoond vóór de confirm prompt.
     status_to_console:
         Print statusregels (LISTENING/TRANSCRIBING/...) naar console.
+    streaming_stt:
+        Transcribeer al tijdens het spreken (IncrementalTranscriber); na einde-spraak
+        hoeft alleen de staart nog door STT. Vereist mic met on_progress en een STT
+        met transcribe_words (WhisperSTTBackend); anders valt dit terug op normaal.
+    stream_interval_ms:
+        Hoe vaak (ms) het groeiende venster opnieuw getranscribeerd wordt.
 
     Vereist:
         pip install prompt_toolkit
@@ -39,6 +47,8 @@ class AudioInputBackend(InputBackend):
         start_timeout_s: Optional[float] = 10.0,
         print_input: bool = False,
         status_to_console: bool = True,
+        streaming_stt: bool = False,
+        stream_interval_ms: int = 500,
     ) -> None:
         self.mic = mic
         self.stt = stt
@@ -48,11 +58,41 @@ class AudioInputBackend(InputBackend):
         self.start_timeout_s = start_timeout_s
         self.print_input = print_input
         self.status_to_console = status_to_console
+        self.streaming_stt = bool(streaming_stt) and hasattr(stt, "transcribe_words")
+        self.stream_interval_ms = int(stream_interval_ms)
 
     def _status(self, msg: str) -> None:
         if self.status_to_console:
             print(msg)
 
+    def close(self) -> None:
+        """Sluit de mic (persistent stream / SSH-reader). De STT kan gedeeld zijn en blijft open."""
+        close = getattr(self.mic, "close", None)
+        if close is not None:
+            close()
+
+    def _capture_streaming(self, timeout_s: float) -> tuple:
+        mic_cfg = getattr(self.mic, "cfg", None)
+        inc = IncrementalTranscriber(
+            self.stt,
+            sample_rate=getattr(mic_cfg, "sample_rate", 16000),
+            language=getattr(self.stt, "language", "nl"),
+            interval_ms=self.stream_interval_ms,
+            on_partial=(lambda t: print(f"… {t}")) if self.print_input else None,
+        )
+        inc.start()
+        try:
+            audio = self.mic.capture_utterance(timeout_s=timeout_s, on_progress=inc.on_progress)
+        except BaseException:
+            inc.cancel()
+            raise
+
+        self._status("📝 TRANSCRIBING...")
+        if audio.samples is None:
+            inc.cancel()
+            return audio, self.stt.transcribe(audio)
+        return audio, inc.finish(audio.samples)
+
     def _capture_and_transcribe(self) -> tuple:
         if self.confirm_before_record:
             input("Press Enter to record...")
@@ -62,16 +102,29 @@ class AudioInputBackend(InputBackend):
             timeout = 10**9
 
         self._status("🎤 LISTENING...")
-        audio = self.mic.capture_utterance(timeout_s=float(timeout))
+        t_listen = timing.now()
+        if self.streaming_stt:
+            audio, stt_res = self._capture_streaming(float(timeout))
+        else:
+            audio = self.mic.capture_utterance(timeout_s=float(timeout))
 
-        self._status("📝 TRANSCRIBING...")
-        stt_res = self.stt.transcribe(audio)
+            self._status("📝 TRANSCRIBING...")
+            stt_res = self.stt.transcribe(audio)
+
+        audio.timings.setdefault("listen_start", t_listen)
+        audio.timings["stt_done"] = timing.now()
 
         raw = stt_res.text or ""
         text = raw.strip()
 
         return audio, stt_res, raw, text
 
+    @staticmethod
+    def _user_input(raw: str, text: str, audio, stt_res) -> UserInput:
+        timings = dict(audio.timings)
+        timings["input_done"] = timing.now()
+        return UserInput(raw_text=raw, text=text, audio=audio, stt=stt_res, timings=timings)
+
     def get_input(self) -> UserInput:
         while True:
             audio, stt_res, raw, current = self._capture_and_transcribe()
@@ -83,14 +136,14 @@ class AudioInputBackend(InputBackend):
                 print(f"INPUT: {current}" if current else "INPUT: <leeg>")
 
             if not self.confirm_before_send:
-                return UserInput(raw_text=raw, text=current, audio=audio, stt=stt_res)
+                return self._user_input(raw, current, audio, stt_res)
 
             # Confirm-loop: Enter / e / r
             while True:
                 choice = input("Send? [Enter=send / e=edit / r=redo]: ").strip().lower()
 
                 if choice == "":
-                    return UserInput(raw_text=raw, text=current, audio=audio, stt=stt_res)
+                    return self._user_input(raw, current, audio, stt_res)
 
                 if choice == "e":
                     # Prefilled edit
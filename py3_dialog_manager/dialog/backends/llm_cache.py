@@ -0,0 +1,193 @@
+# py3_nao_behavior_manager/dialog/backends/llm_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dialog.interfaces import ChatMessage, History, LLMBackend, LLMResult
+
+
+def _plain_messages(messages: History) -> list:
+    return [{"role": m.get("role"), "content": m.get("content") or ""} if isinstance(m, dict) else m for m in messages]
+
+
+def cache_key(model: str, options: Optional[Dict[str, Any]], messages: History) -> str:
+    """sha256 over (model, options, messages) als canonieke JSON."""
+    payload = {"model": model, "options": options or {}, "messages": _plain_messages(messages)}
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def llm_identity(llm: Any) -> Dict[str, Any]:
+    """
+    Wat een LLM-backend écht gebruikt (na defaults/env): model + host van de Ollama-client,
+    recursief voor samengestelde backends (hedged, cache), anders de klassenaam (echo/none).
+    Zo geeft een ander model of een andere host nooit antwoorden uit een oude (SQLite-)cache.
+    """
+    inner = getattr(llm, "llm", None)
+    if isinstance(llm, CachingLLMBackend) and inner is not None:
+        return llm_identity(inner)
+    client = getattr(llm, "client", None)
+    if client is not None and getattr(client, "model", None):
+        return {"model": client.model, "host": getattr(client, "host", None)}
+    backends = getattr(llm, "backends", None)
+    if backends:
+        return {"backend": type(llm).__name__, "backends": [llm_identity(b) for b in backends]}
+    return {"backend": type(llm).__name__}
+
+
+class CachingLLMBackend(LLMBackend):
+    """
+    Response-cache vóór een LLM-backend, voor demo's en regressieruns die steeds
+    dezelfde messages sturen (zelfde system prompt + gescripte user-regels).
+
+    - sleutel: sha256 over (model, options, messages), zie cache_key(); model en host
+      komen uit de backend zelf (llm_identity), options vult dat aan
+    - geheugen: LRU van max_entries; daarachter optioneel SQLite (path) dat
+      runs overleeft
+    - ttl_s: ouder dan dit telt als miss (None = nooit verlopen)
+
+    Alleen complete antwoorden komen in de cache (een afgebroken stream, bijv.
+    barge-in, niet). Bij een hit komt de reply in één keer via on_delta;
+    LLMResult.cached is dan True en er zijn geen token-tellingen.
+
+    Let op: sampling maakt LLM-antwoorden niet deterministisch; met cache krijgt
+    dezelfde prompt altijd hetzelfde antwoord. Bedoeld voor demo's/tests, niet voor de klas.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        *,
+        model: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        max_entries: int = 256,
+        ttl_s: Optional[float] = None,
+        path: Optional[str] = None,
+    ) -> None:
+        self.llm = llm
+        identity = llm_identity(llm)
+        self.model = model or identity.get("model") or identity.get("backend", "")
+        self.options = {**identity, **(options or {})}
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = ttl_s
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            parent = os.path.dirname(path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, reply TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            if ttl_s is not None:
+                self._db.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - ttl_s,))
+            self._db.commit()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_s is not None and time.time() - created > self.ttl_s
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                reply, created = item
+                if not self._expired(created):
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return reply
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT reply, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    reply, created = row
+                    if not self._expired(created):
+                        self._put_mem(key, reply, created)
+                        self.hits += 1
+                        return reply
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def _put_mem(self, key: str, reply: str, created: float) -> None:
+        self._mem[key] = (reply, created)
+        self._mem.move_to_end(key)
+        if len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _put(self, key: str, reply: str) -> None:
+        created = time.time()
+        with self._lock:
+            self._put_mem(key, reply, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, reply, created) VALUES (?, ?, ?)", (key, reply, created)
+                )
+                self._db.commit()
+
+    def _hit(self, messages: History, reply: str) -> LLMResult:
+        return LLMResult(
+            reply=reply,
+            messages=list(messages) + [ChatMessage(role="assistant", content=reply)],  # type: ignore[arg-type]
+            model=self.model,
+            cached=True,
+        )
+
+    def generate(self, messages: History) -> LLMResult:
+        key = cache_key(self.model, self.options, messages)
+        reply = self._get(key)
+        if reply is not None:
+            return self._hit(messages, reply)
+
+        res = self.llm.generate(messages)
+        self._put(key, res.reply)
+        return res
+
+    def generate_stream(self, messages: History, on_delta: Callable[[str], None]) -> LLMResult:
+        """Hit: reply in één delta. Miss: stream van de onderliggende LLM (of generate als die niet streamt)."""
+        key = cache_key(self.model, self.options, messages)
+        reply = self._get(key)
+        if reply is not None:
+            if reply:
+                on_delta(reply)
+            return self._hit(messages, reply)
+
+        if hasattr(self.llm, "generate_stream"):
+            res = self.llm.generate_stream(messages, on_delta)
+        else:
+            res = self.llm.generate(messages)
+            if res.reply:
+                on_delta(res.reply)
+        self._put(key, res.reply)
+        return res
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._mem), "path": self.path}
+
+    def close(self) -> None:
+        try:
+            close = getattr(self.llm, "close", None)
+            if close is not None:
+                close()
+        finally:
+            with self._lock:
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
@@ -0,0 +1,139 @@
+# py3_nao_behavior_manager/dialog/backends/llm_hedged.py
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from dialog.interfaces import History, LLMBackend, LLMResult
+
+
+class _Cancelled(Exception):
+    """Intern: deze stream heeft de race verloren (of de caller brak af)."""
+
+
+class HedgedLLMBackend(LLMBackend):
+    """
+    Primary + secondary LLM (bijv. ollama.com + lokaal llama3.1:8b) met hedging en failover.
+
+    - De vraag gaat eerst naar primary.
+    - Is er na hedge_after_s nog geen eerste token, dan gaat dezelfde vraag ook naar
+      secondary. Faalt primary vóór het eerste token, dan meteen (failover).
+    - Wie het eerst een token (of een compleet antwoord) levert, wint; alleen diens
+      tokens gaan naar on_delta. De andere stream wordt afgebroken bij zijn volgende
+      chunk (de HTTP-stream sluit dan).
+    - Faalt de winnaar halverwege, dan komt die fout door (een half uitgesproken
+      antwoord kan niet opnieuw). Falen beide, dan de fout van primary.
+
+    Backends zonder generate_stream doen mee met hun complete antwoord als "eerste token".
+    on_delta wordt op de thread van de caller aangeroepen; een exceptie daaruit
+    (bijv. barge-in) breekt beide streams af.
+    """
+
+    def __init__(self, primary: Any, secondary: Any, *, hedge_after_s: float = 2.0) -> None:
+        if hedge_after_s < 0:
+            raise ValueError("hedge_after_s moet >= 0 zijn.")
+        self.backends = (primary, secondary)
+        self.hedge_after_s = float(hedge_after_s)
+
+        self.hedges = 0  # secondary gestart omdat primary te traag was
+        self.failovers = 0  # secondary gestart omdat primary faalde
+        self.secondary_wins = 0
+
+    def _start(
+        self, idx: int, messages: History, q: "queue.Queue[Tuple[str, int, Any]]", cancel: threading.Event
+    ) -> None:
+        backend = self.backends[idx]
+
+        def on_delta(delta: str) -> None:
+            if cancel.is_set():
+                raise _Cancelled()
+            q.put(("delta", idx, delta))
+
+        def run() -> None:
+            try:
+                if hasattr(backend, "generate_stream"):
+                    res = backend.generate_stream(messages, on_delta)
+                else:
+                    res = backend.generate(messages)
+                    if res.reply:
+                        on_delta(res.reply)
+                q.put(("done", idx, res))
+            except _Cancelled:
+                pass
+            except BaseException as e:
+                q.put(("error", idx, e))
+
+        threading.Thread(target=run, name=f"HedgedLLM-{idx}", daemon=True).start()
+
+    def generate_stream(self, messages: History, on_delta: Callable[[str], None]) -> LLMResult:
+        q: "queue.Queue[Tuple[str, int, Any]]" = queue.Queue()
+        cancels = (threading.Event(), threading.Event())
+        errors: Dict[int, BaseException] = {}
+        winner = -1
+
+        self._start(0, messages, q, cancels[0])
+        secondary_started = False
+        deadline = time.monotonic() + self.hedge_after_s
+
+        try:
+            while True:
+                timeout = None if secondary_started else max(0.0, deadline - time.monotonic())
+                try:
+                    kind, idx, value = q.get(timeout=timeout)
+                except queue.Empty:
+                    # geen eerste token van primary binnen de deadline: hedge
+                    self._start(1, messages, q, cancels[1])
+                    secondary_started = True
+                    self.hedges += 1
+                    continue
+
+                if winner >= 0 and idx != winner:
+                    continue  # nasleep van de verliezer
+
+                if kind == "error":
+                    if winner >= 0:
+                        raise value
+                    errors[idx] = value
+                    if not secondary_started:
+                        self._start(1, messages, q, cancels[1])
+                        secondary_started = True
+                        self.failovers += 1
+                    elif len(errors) == 2:
+                        raise errors[0]
+                    continue
+
+                if winner < 0:
+                    winner = idx
+                    cancels[1 - idx].set()
+                    if idx == 1:
+                        self.secondary_wins += 1
+
+                if kind == "delta":
+                    on_delta(value)
+                else:
+                    return value
+        finally:
+            # normaal klaar: no-op; bij een exceptie (barge-in, fout): beide streams afbreken
+            for c in cancels:
+                c.set()
+
+    def generate(self, messages: History) -> LLMResult:
+        return self.generate_stream(messages, lambda _delta: None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hedges": self.hedges, "failovers": self.failovers, "secondary_wins": self.secondary_wins}
+
+    def close(self) -> None:
+        errors: List[BaseException] = []
+        for backend in self.backends:
+            close = getattr(backend, "close", None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
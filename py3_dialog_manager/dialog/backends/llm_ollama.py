@@ -1,36 +1,249 @@
 # app/dialog/backends/llm_ollama.py
 
+import importlib.util
 import os
-from typing import List, Dict, Any, Optional
+import random
+import sys
+import threading
+import time
+from typing import List, Dict, Any, Callable, Iterator, Optional, TypeVar, Union
 
+import httpx
 from ollama import Client as OllamaHttpClient
+from ollama import ResponseError
 
 from dialog.interfaces import LLMBackend, LLMResult, History, ChatMessage
 
 
+T = TypeVar("T")
+
+# HTTP-statussen waarbij een nieuwe poging zin heeft (rate limit / overbelaste gateway)
+RETRY_STATUS = (429, 502, 503, 504)
+MAX_BACKOFF_S = 8.0
+
+# Fouten waarbij de server het request niet verwerkt heeft: geen verbinding, geen plek in de
+# pool, of een (keep-alive) verbinding die dichtging vóór er een response was. Een ReadTimeout
+# betekent dat de server al bezig is: opnieuw proberen zou de wachttijd alleen vermenigvuldigen.
+RETRY_TRANSPORT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+
+
+def _retryable(e: BaseException) -> bool:
+    if isinstance(e, ResponseError):
+        return e.status_code in RETRY_STATUS
+    # ollama zet httpx.ConnectError om in de builtin ConnectionError
+    return isinstance(e, (ConnectionError,) + RETRY_TRANSPORT)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
 class OllamaClient:
     """
     Dunne wrapper om de officiële Ollama Python client.
+
+    keep_alive: hoe lang de server het model na een request geladen houdt
+    ("30m", seconden, -1 = altijd); None = server-default (5 min).
+    last_used: time.monotonic() van het laatste echte chat-request (voor KeepWarmPinger).
+
+    HTTP (één httpx-client per OllamaClient; deel de client over sessies om TLS-verbindingen
+    te hergebruiken): connect/read-timeouts (read_timeout_s: default None = geen read-timeout,
+    zoals de Ollama-client zelf; zet hem via llm.params.http), pool-grootte (max_connections, max_keepalive,
+    keepalive_expiry_s) en http2 (vereist pip install h2; zonder h2 terugval naar HTTP/1.1).
+    retries: extra pogingen bij verbindings-/poolfouten (niet bij een read-timeout) en 429/502/503/504, met
+    exponentiële backoff en full jitter (retry_backoff_s * 2^poging, max 8 s). Een stream
+    wordt alleen opnieuw geprobeerd zolang er nog geen chunk binnen is.
     """
 
-    def __init__(self, model: str, host: str, api_key: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        model: str,
+        host: str,
+        api_key: Optional[str] = None,
+        *,
+        keep_alive: Optional[Union[str, float]] = None,
+        connect_timeout_s: float = 10.0,
+        read_timeout_s: Optional[float] = None,
+        max_connections: int = 10,
+        max_keepalive: int = 10,
+        keepalive_expiry_s: float = 60.0,
+        http2: bool = False,
+        retries: int = 2,
+        retry_backoff_s: float = 0.5,
+    ) -> None:
         headers: Dict[str, str] = {}
         if api_key:
             headers["Authorization"] = f"Bearer {api_key}"
-        self._client = OllamaHttpClient(host=host, headers=headers or None)
+
+        if http2 and not _http2_available():
+            print("[Ollama] http2 gevraagd maar 'h2' ontbreekt (pip install h2); HTTP/1.1 wordt gebruikt.", file=sys.stderr)
+            http2 = False
+
+        self._client = OllamaHttpClient(
+            host=host,
+            headers=headers or None,
+            timeout=httpx.Timeout(read_timeout_s, connect=connect_timeout_s),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry_s,
+            ),
+            http2=http2,
+        )
         self.model = model
+        self.host = host
+        self.keep_alive = keep_alive
+        self.http2 = http2
+        self.retries = max(0, int(retries))
+        self.retry_backoff_s = float(retry_backoff_s)
+        self.retried = 0
+        self.last_used = time.monotonic()
+
+    def _backoff(self, attempt: int) -> None:
+        self.retried += 1
+        time.sleep(random.uniform(0.0, min(MAX_BACKOFF_S, self.retry_backoff_s * (2**attempt))))
+
+    def _with_retries(self, fn: Callable[[], T]) -> T:
+        for attempt in range(self.retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.retries or not _retryable(e):
+                    raise
+                self._backoff(attempt)
+        raise AssertionError("onbereikbaar")
+
+    def _kwargs(self) -> Dict[str, Any]:
+        return {"keep_alive": self.keep_alive} if self.keep_alive is not None else {}
 
     def chat(self, messages: History) -> Dict[str, Any]:
-        return self._client.chat(self.model, messages=messages, stream=False)
+        self.last_used = time.monotonic()
+        return self._with_retries(
+            lambda: self._client.chat(self.model, messages=messages, stream=False, **self._kwargs())
+        )
+
+    def chat_stream(self, messages: History) -> Iterator[Dict[str, Any]]:
+        self.last_used = time.monotonic()
+        for attempt in range(self.retries + 1):
+            # het request gaat pas de deur uit bij het eerste next()
+            stream = self._client.chat(self.model, messages=messages, stream=True, **self._kwargs())
+            try:
+                first = next(stream)
+            except StopIteration:
+                return
+            except Exception as e:
+                if attempt >= self.retries or not _retryable(e):
+                    raise
+                self._backoff(attempt)
+                continue
+            yield first
+            yield from stream
+            return
+
+    def warm_up(self) -> None:
+        """Laadt het model op de server (generate zonder prompt: geen tokens, alleen laden)."""
+        self._with_retries(lambda: self._client.generate(self.model, prompt="", **self._kwargs()))
+
+    def warm_up_background(self) -> threading.Thread:
+        """warm_up() op een eigen thread, zodat het bouwen van de pipeline niet op het laden wacht."""
+        t = threading.Thread(target=self._warm_up_logged, name="OllamaWarmUp", daemon=True)
+        t.start()
+        return t
+
+    def _warm_up_logged(self) -> None:
+        try:
+            self.warm_up()
+        except Exception as e:
+            print(f"[Ollama] warm-up van {self.model!r} mislukt: {e!r}", file=sys.stderr)
+
+
+class KeepWarmPinger:
+    """
+    Houdt het model geladen tijdens een actieve sessie.
+
+    Elke interval_s: is er al interval_s geen echt request geweest, dan een warm-up
+    (lege generate, verlengt keep_alive op de server). Na idle_stop_s zonder echt
+    request is de sessie voorbij en wordt er niet meer gepingd, zodat de server het
+    model weer mag vrijgeven; het volgende request maakt de sessie weer actief.
+    """
+
+    def __init__(self, client: OllamaClient, interval_s: float, *, idle_stop_s: float = 1800.0) -> None:
+        if interval_s <= 0:
+            raise ValueError("keep_warm_s moet > 0 zijn.")
+        self.client = client
+        self.interval_s = float(interval_s)
+        self.idle_stop_s = float(idle_stop_s)
+        self.pings = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="OllamaKeepWarm", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            idle = time.monotonic() - self.client.last_used
+            if idle < self.interval_s or idle >= self.idle_stop_s:
+                continue
+            try:
+                self.client.warm_up()
+                self.pings += 1
+            except Exception as e:
+                print(f"[Ollama] keep-warm ping mislukt: {e!r}", file=sys.stderr)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+
+def _ns_to_ms(v: Any) -> Optional[float]:
+    return None if v is None else round(v / 1e6, 1)
+
+
+def _usage(resp: Any, *, ttft_ms: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Gebruik en servertijden uit een Ollama-response (of het laatste stream-chunk, done=True).
+    Ollama levert duren in nanoseconden; tokens_per_s = eval_count / eval_duration.
+    ttft_ms alleen als de caller hem gemeten heeft (streaming); server_ttft_ms = load + prompt_eval.
+    """
+    tokens_in = resp.get("prompt_eval_count")
+    tokens_out = resp.get("eval_count")
+    prompt_eval_ms = _ns_to_ms(resp.get("prompt_eval_duration"))
+    eval_ms = _ns_to_ms(resp.get("eval_duration"))
+    load_ms = _ns_to_ms(resp.get("load_duration"))
+
+    tokens_per_s = None
+    if tokens_out and eval_ms:
+        tokens_per_s = round(tokens_out / (eval_ms / 1000.0), 1)
+    server_ttft_ms = None
+    if prompt_eval_ms is not None:
+        server_ttft_ms = round((load_ms or 0.0) + prompt_eval_ms, 1)
+
+    return {
+        "model": resp.get("model"),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "prompt_eval_ms": prompt_eval_ms,
+        "eval_ms": eval_ms,
+        "load_ms": load_ms,
+        "tokens_per_s": tokens_per_s,
+        "ttft_ms": ttft_ms,
+        "server_ttft_ms": server_ttft_ms,
+    }
 
 
 class OllamaLLMBackend(LLMBackend):
     """
     LLM-backend via Ollama (cloud of local, afhankelijk van host/api_key).
+
+    keep_warm: optionele KeepWarmPinger; close() stopt die.
     """
 
-    def __init__(self, client: OllamaClient) -> None:
+    def __init__(self, client: OllamaClient, *, keep_warm: Optional[KeepWarmPinger] = None) -> None:
         self.client = client
+        self.keep_warm = keep_warm
+
+    def close(self) -> None:
+        if self.keep_warm is not None:
+            self.keep_warm.close()
 
     def generate(self, messages: History) -> LLMResult:
         resp = self.client.chat(messages)
@@ -41,9 +254,31 @@ class OllamaLLMBackend(LLMBackend):
             ChatMessage(role="assistant", content=reply)  # type: ignore[arg-type]
         ]
 
-        return LLMResult(
-            reply=reply,
-            messages=new_history,
-            tokens_in=None,
-            tokens_out=None,
-        )
+        return LLMResult(reply=reply, messages=new_history, **_usage(resp))
+
+    def generate_stream(self, messages: History, on_delta: Callable[[str], None]) -> LLMResult:
+        """
+        Zelfde als generate(), maar streamt: on_delta(tekst) per binnenkomend stuk.
+        ttft_ms is hier in de client gemeten (incl. netwerk); tellers komen uit het laatste chunk.
+        """
+        parts: List[str] = []
+        last: Any = {}
+        ttft_ms: Optional[float] = None
+        t0 = time.monotonic()
+        for chunk in self.client.chat_stream(messages):
+            last = chunk
+            msg = chunk.get("message", {}) or {}
+            delta = msg.get("content") or ""
+            if delta:
+                if ttft_ms is None:
+                    ttft_ms = round((time.monotonic() - t0) * 1000.0, 1)
+                parts.append(delta)
+                on_delta(delta)
+
+        reply = "".join(parts).strip()
+
+        new_history: History = list(messages) + [
+            ChatMessage(role="assistant", content=reply)  # type: ignore[arg-type]
+        ]
+
+        return LLMResult(reply=reply, messages=new_history, **_usage(last, ttft_ms=ttft_ms))
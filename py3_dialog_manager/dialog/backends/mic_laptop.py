@@ -1,27 +1,39 @@
 # app/dialog/backends/mic_laptop.py
 from __future__ import annotations
 
-import queue
 import sys
-from typing import Optional
+import time
+from typing import Callable, Optional
 
 import numpy as np
 import sounddevice as sd
 
 from dialog.interfaces import MicBackend, UtteranceAudio
+from dialog.backends.audio_stream import BlockRingBuffer, PersistentStreamMic
+from dialog.speaking_gate import SpeakingGate, discard_stale
 from dialog.backends.vad_segmenter import (
     RmsVadConfig,
-    RmsVadUtteranceCapturer,
-    int16_to_wav_bytes,
+    make_utterance_capturer,
 )
 
 
-class LaptopMic(MicBackend):
+class LaptopMic(PersistentStreamMic, MicBackend):
     """
-    Laptop microfoon backend met utterance-VAD (RMS):
-    - wacht op spraak (boven threshold)
+    Laptop microfoon backend met utterance-VAD (RMS of WebRTC, zie 'vad'):
+    - wacht op spraak (boven threshold / volgens webrtcvad)
     - neemt door tot er N ms stilte is
-    - retourneert precies één utterance als WAV-bytes in UtteranceAudio.pcm
+    - retourneert precies één utterance als int16-buffer in UtteranceAudio.samples
+
+    persistent_stream:
+        False (default): InputStream per utterance openen en weer sluiten.
+        True: de stream blijft open over turns heen. Blocks gaan (met timestamp) in een
+        begrensde ringbuffer (stream_buffer_s); bij overflow valt het oudste block weg en
+        telt dropped_blocks op. Bij elke capture wordt audio van vóór de call (bijv. terwijl
+        de robot sprak) weggegooid, op 'pre_roll_ms' na.
+
+    speaking_gate:
+        Optioneel (run.overlap_listen): blocks die binnenkwamen terwijl de robot sprak
+        (plus echo-staart) worden overgeslagen, zodat al tijdens TTS geluisterd kan worden.
     """
 
     def __init__(
@@ -33,6 +45,14 @@ class LaptopMic(MicBackend):
         max_utterance_s: float = 12.0,   # safety cap
         input_device: Optional[int] = None,  # None = default mic
         block_ms: int = 20,              # callback blokgrootte
+        vad: str = "rms",                # "rms" | "webrtc"
+        vad_aggressiveness: int = 2,     # alleen webrtc: 0..3
+        vad_min_speech_ms: int = 60,     # alleen webrtc: min. spraak vóór start
+        adaptive_threshold: bool = False,  # alleen rms: drempels t.o.v. ruisvloer
+        noise_start_ratio: float = 3.0,
+        noise_stop_ratio: float = 2.0,
+        persistent_stream: bool = False,
+        stream_buffer_s: float = 10.0,
     ) -> None:
         self.cfg = RmsVadConfig(
             sample_rate=sample_rate,
@@ -41,42 +61,82 @@ class LaptopMic(MicBackend):
             pre_roll_ms=pre_roll_ms,
             max_utterance_s=max_utterance_s,
             block_ms=block_ms,
+            adaptive_threshold=adaptive_threshold,
+            noise_start_ratio=noise_start_ratio,
+            noise_stop_ratio=noise_stop_ratio,
         )
         self.input_device = input_device
+        self._vad = make_utterance_capturer(
+            self.cfg,
+            vad,
+            aggressiveness=vad_aggressiveness,
+            min_speech_ms=vad_min_speech_ms,
+        )
 
-        self._q: "queue.Queue[np.ndarray]" = queue.Queue()
+        self.persistent_stream = bool(persistent_stream)
+        self._ring = BlockRingBuffer(max_blocks=int(stream_buffer_s * 1000 / block_ms))
+        self._stream: Optional[sd.InputStream] = None
+
+        self.input_overflows = 0  # door PortAudio gemelde input-overflows
+        self.speaking_gate: Optional[SpeakingGate] = None
 
     def _cb(self, indata, frames, t, status):
         if status:
+            if status.input_overflow:
+                self.input_overflows += 1
             print(status, file=sys.stderr)
         # indata: shape (frames, channels), dtype int16
-        self._q.put(indata[:, 0].copy())
+        self._ring.put(indata[:, 0].copy(), time.monotonic())
 
-    def capture_utterance(self, timeout_s: float = 10.0) -> UtteranceAudio:
+    def _open_stream(self) -> sd.InputStream:
         blocksize = int(self.cfg.sample_rate * (self.cfg.block_ms / 1000.0))
-        vad = RmsVadUtteranceCapturer(self.cfg)
-
-        def get_block(timeout: float) -> Optional[np.ndarray]:
-            try:
-                return self._q.get(timeout=timeout)
-            except queue.Empty:
-                return None
-
-        with sd.InputStream(
+        return sd.InputStream(
             samplerate=self.cfg.sample_rate,
             channels=1,
             dtype="int16",
             callback=self._cb,
             blocksize=blocksize,
             device=self.input_device,
-        ):
-            audio_int16 = vad.capture(get_block=get_block, timeout_s=timeout_s)
+        )
+
+    def close(self) -> None:
+        """Sluit de persistent stream (no-op als er geen open stream is)."""
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            finally:
+                self._stream = None
+        self._ring.clear()
+
+    def _start_stream(self) -> None:
+        if self._stream is None:
+            self._stream = self._open_stream()
+            self._stream.start()
 
-        wav_bytes = int16_to_wav_bytes(audio_int16, self.cfg.sample_rate)
+    def capture_utterance(
+        self,
+        timeout_s: float = 10.0,
+        on_progress: Optional[Callable[[np.ndarray], None]] = None,
+    ) -> UtteranceAudio:
+        if self.persistent_stream:
+            self._start_stream()
+            discard_stale(self._ring, self.speaking_gate, self.cfg.pre_roll_ms)
+            audio_int16 = self._vad.capture(
+                get_block=self._get_block(), timeout_s=timeout_s, on_progress=on_progress, hold=self._hold()
+            )
+        else:
+            self._ring.clear()
+            with self._open_stream():
+                audio_int16 = self._vad.capture(
+                    get_block=self._get_block(), timeout_s=timeout_s, on_progress=on_progress, hold=self._hold()
+                )
 
         return UtteranceAudio(
-            pcm=wav_bytes,          # WAV-bytes, matcht WhisperSTTBackend
+            pcm=None,               # WAV pas lazy via wav_bytes()
             sample_rate=self.cfg.sample_rate,
             channels=1,
             sample_width=2,
+            samples=audio_int16,
+            timings=dict(self._vad.last_timings),
         )
@@ -2,26 +2,41 @@
 from __future__ import annotations
 
 import socket
-from typing import Optional
+import sys
+import threading
+import time
+from typing import Callable, Optional
 
 import numpy as np
 import paramiko
 
 from dialog.interfaces import MicBackend, UtteranceAudio
+from dialog.backends.audio_stream import BlockRingBuffer, PersistentStreamMic
+from dialog.speaking_gate import SpeakingGate, discard_stale
 from dialog.backends.vad_segmenter import (
     RmsVadConfig,
-    RmsVadUtteranceCapturer,
-    int16_to_wav_bytes,
+    make_utterance_capturer,
 )
 
 
-class NaoSshMic(MicBackend):
+class NaoSshMic(PersistentStreamMic, MicBackend):
     """
-    NAO-mic backend via SSH + arecord (raw stream), met utterance-VAD (RMS).
+    NAO-mic backend via SSH + arecord (raw stream), met utterance-VAD (RMS of WebRTC, zie 'vad').
 
     Belangrijk:
     - We streamen raw S16_LE (geen -d), en stoppen lokaal op stilte.
-    - Output blijft WAV-bytes in UtteranceAudio.pcm (zodat STT unchanged kan blijven).
+    - Output is de int16-buffer in UtteranceAudio.samples (WAV alleen lazy via wav_bytes()).
+
+    persistent_stream:
+        False (default): per utterance een nieuwe SSH-verbinding + arecord.
+        True: één langlevende verbinding met continu lopende arecord; een reader-thread
+        vult een begrensde ringbuffer (stream_buffer_s) en verbindt opnieuw na fouten
+        of een stilgevallen stream. capture_utterance doet dan alleen nog VAD op audio
+        die al binnenkomt (geen handshake, geen weggevallen eerste lettergrepen).
+
+    speaking_gate:
+        Optioneel (run.overlap_listen): blocks die binnenkwamen terwijl de robot sprak
+        (plus echo-staart) worden overgeslagen, zodat al tijdens TTS geluisterd kan worden.
     """
 
     def __init__(
@@ -36,6 +51,16 @@ class NaoSshMic(MicBackend):
         max_utterance_s: float = 12.0,
         block_ms: int = 20,
         arecord_cmd: Optional[str] = None,
+        vad: str = "rms",
+        vad_aggressiveness: int = 2,
+        vad_min_speech_ms: int = 60,
+        adaptive_threshold: bool = False,
+        noise_start_ratio: float = 3.0,
+        noise_stop_ratio: float = 2.0,
+        persistent_stream: bool = False,
+        stream_buffer_s: float = 10.0,
+        reconnect_delay_s: float = 1.0,
+        stall_timeout_s: float = 3.0,
     ) -> None:
         self.host = host
         self.username = username
@@ -48,17 +73,34 @@ class NaoSshMic(MicBackend):
             pre_roll_ms=pre_roll_ms,
             max_utterance_s=max_utterance_s,
             block_ms=block_ms,
+            adaptive_threshold=adaptive_threshold,
+            noise_start_ratio=noise_start_ratio,
+            noise_stop_ratio=noise_stop_ratio,
+        )
+
+        self._vad = make_utterance_capturer(
+            self.cfg,
+            vad,
+            aggressiveness=vad_aggressiveness,
+            min_speech_ms=vad_min_speech_ms,
         )
 
         # Stream raw PCM (geen -d) zodat we zelf stop op stilte kunnen doen.
         self.arecord_cmd = arecord_cmd or f"arecord -f S16_LE -r {sample_rate} -c 1 -t raw"
 
-    def capture_utterance(self, timeout_s: float = 10.0) -> UtteranceAudio:
-        vad = RmsVadUtteranceCapturer(self.cfg)
+        self.persistent_stream = bool(persistent_stream)
+        self.reconnect_delay_s = float(reconnect_delay_s)
+        self.stall_timeout_s = float(stall_timeout_s)
 
-        block_n = int(self.cfg.sample_rate * (self.cfg.block_ms / 1000.0))
-        block_bytes = block_n * 2  # int16
+        self._block_bytes = int(sample_rate * (block_ms / 1000.0)) * 2  # int16
+        self._ring = BlockRingBuffer(max_blocks=int(stream_buffer_s * 1000 / block_ms))
+        self._reader: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._last_error: Optional[BaseException] = None
+        self.speaking_gate: Optional[SpeakingGate] = None
 
+    def _connect(self) -> paramiko.SSHClient:
         client = paramiko.SSHClient()
         client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         client.connect(
@@ -67,6 +109,109 @@ class NaoSshMic(MicBackend):
             password=self.password,
             timeout=5,
         )
+        return client
+
+    # ---- persistent stream ----
+
+    def _start_stream(self) -> None:
+        if self._reader is not None and self._reader.is_alive():
+            return
+        self._stop.clear()
+        self._reader = threading.Thread(target=self._reader_loop, name="NaoSshMic-reader", daemon=True)
+        self._reader.start()
+
+    def _reader_loop(self) -> None:
+        while not self._stop.is_set():
+            client = None
+            channel = None
+            try:
+                client = self._connect()
+                _stdin, stdout, _stderr = client.exec_command(self.arecord_cmd)
+                channel = stdout.channel
+                channel.settimeout(0.5)
+                self._connected.set()
+                self._last_error = None
+
+                buf = bytearray()
+                last_data = time.monotonic()
+
+                while not self._stop.is_set():
+                    try:
+                        chunk = channel.recv(4096)
+                    except socket.timeout:
+                        if time.monotonic() - last_data > self.stall_timeout_s:
+                            raise TimeoutError("arecord-stream levert geen data meer")
+                        continue
+
+                    if not chunk:
+                        raise EOFError("arecord-stream gesloten")
+
+                    last_data = time.monotonic()
+                    buf.extend(chunk)
+
+                    need = self._block_bytes
+                    while len(buf) >= need:
+                        block = np.frombuffer(bytes(buf[:need]), dtype=np.int16)
+                        del buf[:need]
+                        self._ring.put(block, last_data)
+
+            except Exception as e:
+                self._last_error = e
+                if not self._stop.is_set():
+                    print(f"[NaoSshMic] stream-fout: {e!r}; reconnect over {self.reconnect_delay_s}s", file=sys.stderr)
+            finally:
+                self._connected.clear()
+                try:
+                    if channel is not None:
+                        channel.close()
+                except Exception:
+                    pass
+                try:
+                    if client is not None:
+                        client.close()
+                except Exception:
+                    pass
+
+            self._stop.wait(self.reconnect_delay_s)
+
+    def close(self) -> None:
+        """Stop de persistent stream (sluit kanaal; remote arecord stopt via SIGPIPE)."""
+        self._stop.set()
+        if self._reader is not None:
+            self._reader.join(timeout=2.0)
+            self._reader = None
+        self._ring.clear()
+
+    def _capture_from_stream(
+        self,
+        timeout_s: float,
+        on_progress: Optional[Callable[[np.ndarray], None]] = None,
+    ) -> np.ndarray:
+        self._start_stream()
+
+        discard_stale(self._ring, self.speaking_gate, self.cfg.pre_roll_ms)
+
+        try:
+            return self._vad.capture(
+                get_block=self._get_block(), timeout_s=timeout_s, on_progress=on_progress, hold=self._hold()
+            )
+        except TimeoutError:
+            if not self._connected.is_set() and self._last_error is not None:
+                raise ConnectionError(
+                    f"Geen audio-stream van NAO {self.host}: {self._last_error!r}"
+                ) from self._last_error
+            raise
+
+    # ---- per-utterance verbinding ----
+
+    def _capture_one_shot(
+        self,
+        timeout_s: float,
+        on_progress: Optional[Callable[[np.ndarray], None]] = None,
+    ) -> np.ndarray:
+        block_bytes = self._block_bytes
+
+        client = self._connect()
 
         stdout = None
         channel = None
@@ -105,9 +250,14 @@ class NaoSshMic(MicBackend):
                     if not out:
                         return None
 
+                if self.speaking_gate is not None and self.speaking_gate.is_muted(time.monotonic()):
+                    return None
+
                 return np.frombuffer(out, dtype=np.int16)
 
-            audio_int16 = vad.capture(get_block=get_block, timeout_s=timeout_s)
+            return self._vad.capture(
+                get_block=get_block, timeout_s=timeout_s, on_progress=on_progress, hold=self._hold()
+            )
 
         finally:
             # Sluit kanaal zodat remote arecord stopt (SIGPIPE)
@@ -121,11 +271,21 @@ class NaoSshMic(MicBackend):
             except Exception:
                 pass
 
-        wav_bytes = int16_to_wav_bytes(audio_int16, self.cfg.sample_rate)
+    def capture_utterance(
+        self,
+        timeout_s: float = 10.0,
+        on_progress: Optional[Callable[[np.ndarray], None]] = None,
+    ) -> UtteranceAudio:
+        if self.persistent_stream:
+            audio_int16 = self._capture_from_stream(timeout_s, on_progress)
+        else:
+            audio_int16 = self._capture_one_shot(timeout_s, on_progress)
 
         return UtteranceAudio(
-            pcm=wav_bytes,
+            pcm=None,
             sample_rate=self.cfg.sample_rate,
             channels=1,
             sample_width=2,
+            samples=audio_int16,
+            timings=dict(self._vad.last_timings),
         )
@@ -0,0 +1,66 @@
+# py3_nao_behavior_manager/dialog/backends/output_background.py
+from __future__ import annotations
+
+import queue
+import sys
+import threading
+from typing import Optional
+
+from dialog.interfaces import OutputBackend
+from dialog.speaking_gate import SpeakingGate
+
+
+class BackgroundOutputBackend(OutputBackend):
+    """
+    Laat een (blokkerende) output, bijv. NAO /tts, op een eigen thread spreken.
+
+    emit() zet de tekst in een queue en keert direct terug, zodat de pipeline al de
+    volgende capture kan starten terwijl de robot nog praat. Rond elke uitspraak
+    zet de worker de SpeakingGate aan/uit; de mic negeert audio binnen die
+    intervallen (plus echo_tail_ms), dus de robot hoort zichzelf niet.
+
+    Een fout uit output.emit wordt gelogd en bij de volgende emit()/close() opnieuw opgegooid.
+    """
+
+    def __init__(self, output: OutputBackend, gate: Optional[SpeakingGate] = None) -> None:
+        self.output = output
+        self.gate = gate or SpeakingGate()
+        self._q: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="BackgroundOutput", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            text = self._q.get()
+            try:
+                if text is None:
+                    return
+                self.gate.begin()
+                try:
+                    self.output.emit(text)
+                finally:
+                    self.gate.end()
+            except BaseException as e:
+                self._error = e
+                print(f"[BackgroundOutput] emit mislukt: {e!r}", file=sys.stderr)
+            finally:
+                self._q.task_done()
+
+    def _raise_pending(self) -> None:
+        err, self._error = self._error, None
+        if err is not None:
+            raise err
+
+    def emit(self, text: str) -> None:
+        self._raise_pending()
+        self._q.put(text)
+
+    def wait_idle(self) -> None:
+        """Wacht tot alles in de queue uitgesproken is."""
+        self._q.join()
+
+    def close(self) -> None:
+        self._q.put(None)
+        self._thread.join()
+        self._raise_pending()
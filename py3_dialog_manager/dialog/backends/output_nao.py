@@ -15,3 +15,6 @@ class NaoTTSOutputBackend(OutputBackend):
 
     def emit(self, text: str) -> None:
         self._tts.speak(text)
+
+    def stop(self) -> None:
+        self._tts.stop()
@@ -0,0 +1,128 @@
+# py3_nao_behavior_manager/dialog/backends/stt_pool.py
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+
+from dialog.interfaces import STTBackend, STTResult, UtteranceAudio
+
+
+class STTPoolBusy(RuntimeError):
+    """De wachtrij van de STT-pool is vol (backpressure; web: HTTP 503)."""
+
+
+class STTPoolTimeout(STTPoolBusy):
+    """Geen resultaat binnen timeout_s (pool overbelast); telt als busy, dus ook HTTP 503."""
+
+
+class STTWorkerPool(STTBackend):
+    """
+    Begrensde worker-pool vóór één of meer STT-backends.
+
+    - Eén worker-thread per backend-slot; 'backends' mag dezelfde instantie
+      meerdere keren bevatten (N workers over één model met num_workers=N),
+      of aparte instanties (N modelkopieën).
+    - Requests gaan via een begrensde wachtrij (max_queue). Is die vol, dan
+      faalt transcribe() meteen met STTPoolBusy i.p.v. ongelimiteerd op te stapelen.
+    - Duurt het langer dan timeout_s, dan STTPoolTimeout; een job die nog in de
+      wachtrij staat wordt dan geannuleerd (een lopende transcriptie maakt de worker af).
+    - stats() levert wachtrij-diepte en tellers voor /health.
+
+    Implementeert zelf STTBackend, dus kan overal waar een STT verwacht wordt.
+    """
+
+    def __init__(
+        self,
+        backends: List[STTBackend],
+        *,
+        max_queue: int = 8,
+        timeout_s: Optional[float] = 120.0,
+    ) -> None:
+        if not backends:
+            raise ValueError("STTWorkerPool heeft minstens één backend nodig.")
+
+        self.backends = list(backends)
+        self.max_queue = max(1, int(max_queue))
+        self.timeout_s = timeout_s
+
+        self._q: "queue.Queue[Optional[Tuple[UtteranceAudio, Future]]]" = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+        self._workers = [
+            threading.Thread(target=self._worker, args=(b,), name=f"STTWorker-{i}", daemon=True)
+            for i, b in enumerate(self.backends)
+        ]
+        for w in self._workers:
+            w.start()
+
+    def _worker(self, backend: STTBackend) -> None:
+        while True:
+            job = self._q.get()
+            if job is None:
+                return
+            audio, fut = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+
+            with self._lock:
+                self._in_flight += 1
+            try:
+                res = backend.transcribe(audio)
+            except BaseException as e:
+                with self._lock:
+                    self._failed += 1
+                fut.set_exception(e)
+            else:
+                with self._lock:
+                    self._completed += 1
+                fut.set_result(res)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def submit(self, audio: UtteranceAudio) -> "Future[STTResult]":
+        fut: "Future[STTResult]" = Future()
+        try:
+            self._q.put_nowait((audio, fut))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise STTPoolBusy(f"STT-wachtrij vol ({self.max_queue}).")
+        return fut
+
+    def transcribe(self, audio: UtteranceAudio) -> STTResult:
+        fut = self.submit(audio)
+        try:
+            return fut.result(timeout=self.timeout_s)
+        except FutureTimeout:
+            fut.cancel()  # nog in de wachtrij: de worker slaat hem over
+            with self._lock:
+                self._timed_out += 1
+            raise STTPoolTimeout(f"STT gaf geen resultaat binnen {self.timeout_s} s.") from None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "max_queue": self.max_queue,
+                "queue_depth": self._q.qsize(),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+    def close(self) -> None:
+        for _ in self._workers:
+            self._q.put(None)
+        for w in self._workers:
+            w.join(timeout=1.0)
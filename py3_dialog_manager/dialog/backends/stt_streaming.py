@@ -0,0 +1,133 @@
+# py3_nao_behavior_manager/dialog/backends/stt_streaming.py
+from __future__ import annotations
+
+import sys
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from dialog.interfaces import STTResult
+
+Word = Tuple[float, float, str]  # (start_s, eind_s, tekst) absoluut t.o.v. begin utterance
+
+
+def _norm(word: str) -> str:
+    return word.strip().lower().strip(".,!?;:\"'")
+
+
+class IncrementalTranscriber:
+    """
+    Incrementele STT tijdens het spreken (LocalAgreement-2).
+
+    Terwijl de VAD-capture nog loopt, transcribeert een achtergrondthread elke
+    'interval_ms' het nog niet vastgelegde deel van de groeiende utterance.
+    Woorden waarover twee opeenvolgende hypotheses het eens zijn, worden
+    vastgelegd ('committed'); de audio tot het eind van het laatste vastgelegde
+    woord hoeft daarna niet meer opnieuw door Whisper.
+
+    Na einde-spraak doet finish() alleen nog de (korte) staart, met de
+    vastgelegde tekst als initial_prompt. Het eindtranscript is daardoor enkele
+    honderden ms na einde-spraak klaar i.p.v. na een volledige Whisper-run.
+
+    Vereist een STT met transcribe_words(samples, initial_prompt=...) (WhisperSTTBackend).
+    """
+
+    def __init__(
+        self,
+        stt,
+        sample_rate: int = 16000,
+        *,
+        language: str = "nl",
+        interval_ms: int = 500,
+        min_window_ms: int = 1000,
+        on_partial: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.stt = stt
+        self.sample_rate = int(sample_rate)
+        self.language = language
+        self.interval_s = interval_ms / 1000.0
+        self._min_window_n = int(self.sample_rate * (min_window_ms / 1000.0))
+        self.on_partial = on_partial
+
+        self._lock = threading.Lock()
+        self._latest: Optional[np.ndarray] = None  # view op de utterance-buffer
+        self._last_n = 0                           # lengte bij vorige hypothese
+
+        self._committed: List[Word] = []
+        self._committed_n = 0                      # samples tot eind laatste vastgelegd woord
+        self._prev_hyp: List[Word] = []
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- aangeroepen vanuit de capture-thread ----
+
+    def on_progress(self, view: np.ndarray) -> None:
+        with self._lock:
+            self._latest = view
+
+    # ---- lifecycle ----
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="IncrementalSTT", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self._step()
+            except Exception as e:
+                # Partials zijn best-effort; finish() transcribeert de rest alsnog.
+                print(f"[IncrementalSTT] partial mislukt: {e!r}", file=sys.stderr)
+
+    @property
+    def committed_text(self) -> str:
+        return "".join(w[2] for w in self._committed).strip()
+
+    def _step(self) -> None:
+        with self._lock:
+            view = self._latest
+        if view is None:
+            return
+
+        n = view.size
+        if n - self._last_n < self._min_window_n // 4 or n - self._committed_n < self._min_window_n:
+            return
+        self._last_n = n
+
+        hyp = self._transcribe_from(view[self._committed_n:n], self._committed_n)
+
+        # LocalAgreement: gemeenschappelijk prefix van vorige en huidige hypothese vastleggen
+        k = 0
+        while k < len(hyp) and k < len(self._prev_hyp) and _norm(hyp[k][2]) == _norm(self._prev_hyp[k][2]):
+            k += 1
+
+        if k > 0:
+            self._committed.extend(hyp[:k])
+            self._committed_n = min(n, int(hyp[k - 1][1] * self.sample_rate))
+            if self.on_partial is not None:
+                self.on_partial(self.committed_text)
+        self._prev_hyp = hyp[k:]
+
+    def _transcribe_from(self, samples: np.ndarray, offset_n: int) -> List[Word]:
+        offset_s = offset_n / self.sample_rate
+        words = self.stt.transcribe_words(samples, initial_prompt=self.committed_text or None)
+        return [(offset_s + s, offset_s + e, w) for (s, e, w) in words]
+
+    def cancel(self) -> None:
+        """Stop de achtergrondthread (wacht op een lopende partial)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def finish(self, final: np.ndarray) -> STTResult:
+        """Stop de achtergrondthread en transcribeer alleen de niet-vastgelegde staart."""
+        self.cancel()
+
+        tail = final[self._committed_n:]
+        tail_words = self._transcribe_from(tail, self._committed_n) if tail.size else []
+
+        text = "".join(w[2] for w in self._committed + tail_words).strip()
+        return STTResult(text=text, language=self.language, confidence=None)
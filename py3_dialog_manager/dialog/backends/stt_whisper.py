@@ -1,7 +1,9 @@
 # py3_nao_behavior_manager/dialog/backends/stt_whisper.py
 import io
+import sys
+import threading
 import wave
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from faster_whisper import WhisperModel
@@ -28,6 +30,12 @@ def _wav_bytes_to_float32(wav_bytes: bytes) -> Tuple[np.ndarray, int]:
     return audio, sample_rate
 
 
+def _int16_to_float32(samples: np.ndarray) -> np.ndarray:
+    audio = np.asarray(samples, dtype=np.int16).astype(np.float32)
+    audio *= 1.0 / 32768.0
+    return audio.reshape(-1)
+
+
 def _cuda_available_via_torch() -> bool:
     try:
         import torch  # type: ignore
@@ -36,6 +44,39 @@ def _cuda_available_via_torch() -> bool:
         return False
 
 
+# Proces-breed: alle WhisperSTTBackend-instanties met dezelfde
+# (model, device, compute_type, cpu_threads, num_workers, replica) delen één geladen
+# WhisperModel (bijv. pipeline-STT én /api/transcribe in de web app); replica > 0 = bewust
+# een aparte kopie.
+_ModelKey = Tuple[str, str, str, int, int, int]
+_MODEL_REGISTRY: Dict[_ModelKey, WhisperModel] = {}
+_MODEL_REGISTRY_LOCK = threading.Lock()
+
+
+def _get_shared_model(
+    model_name: str,
+    device: str,
+    compute_type: str,
+    *,
+    cpu_threads: int = 0,
+    num_workers: int = 1,
+    replica: int = 0,
+) -> WhisperModel:
+    key = (model_name, device, compute_type, cpu_threads, num_workers, replica)
+    with _MODEL_REGISTRY_LOCK:
+        model = _MODEL_REGISTRY.get(key)
+        if model is None:
+            model = WhisperModel(
+                model_name,
+                device=device,
+                compute_type=compute_type,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers,
+            )
+            _MODEL_REGISTRY[key] = model
+        return model
+
+
 def _select_backend(
     mode: str,
     *,
@@ -69,6 +110,8 @@ class WhisperSTTBackend(STTBackend):
     """
     STT-backend op basis van faster-whisper.
     Laadt het model lazy bij de eerste call en hergebruikt het daarna.
+    Geladen modellen worden proces-breed gedeeld per
+    (model, device, compute_type, cpu_threads, num_workers, replica).
 
     Config (via JSON -> params):
       - mode: "AUTO" | "GPU" | "CPU"        (default: AUTO)
@@ -80,6 +123,12 @@ class WhisperSTTBackend(STTBackend):
       - language: str                       (default: nl)
       - vad_filter: bool                    (default: True)
       - min_silence_duration_ms: int        (default: 800)
+      - cpu_threads: int                    (default: 0 = ctranslate2 kiest)
+      - num_workers: int                    (default: 1; >1 = parallelle transcribe-calls op één model)
+      - replica: int                        (default: 0; andere waarde = eigen modelkopie)
+      - preload: bool                       (default: False)
+          True = model in een achtergrondthread laden bij het bouwen van de pipeline,
+          plus een korte warm-up op stilte; zie 'ready'.
     """
 
     def __init__(
@@ -94,6 +143,10 @@ class WhisperSTTBackend(STTBackend):
         compute_type_gpu: str = "float16",
         vad_filter: bool = True,
         min_silence_duration_ms: int = 800,
+        cpu_threads: int = 0,
+        num_workers: int = 1,
+        replica: int = 0,
+        preload: bool = False,
     ) -> None:
         self.mode = mode
         self.model_name = model_name
@@ -106,41 +159,102 @@ class WhisperSTTBackend(STTBackend):
         self.vad_filter = bool(vad_filter)
         self.min_silence_duration_ms = int(min_silence_duration_ms)
 
+        self.cpu_threads = int(cpu_threads)
+        self.num_workers = int(num_workers)
+        self.replica = int(replica)
+
         self._model: Optional[WhisperModel] = None
         self._device: Optional[str] = None
         self._compute_type: Optional[str] = None
         self._chosen_model_name: Optional[str] = None
 
-    def _get_model(self) -> WhisperModel:
-        if self._model is None:
-            device, compute_type, chosen_model = _select_backend(
-                self.mode,
-                model_name=self.model_name,
-                model_cpu=self.model_cpu,
-                model_gpu=self.model_gpu,
-                compute_type_cpu=self.compute_type_cpu,
-                compute_type_gpu=self.compute_type_gpu,
-            )
+        self.preload = bool(preload)
+        self._model_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._preload_thread: Optional[threading.Thread] = None
+        self.preload_error: Optional[BaseException] = None
+
+    @property
+    def ready(self) -> bool:
+        """True zodra het model geladen is (en bij preload: de warm-up klaar is)."""
+        return self._ready.is_set()
 
-            # Probeer CUDA echt te initialiseren; als dat faalt (driver/ct2), val terug naar CPU.
-            try:
-                self._model = WhisperModel(chosen_model, device=device, compute_type=compute_type)
-                self._device = device
-                self._compute_type = compute_type
-                self._chosen_model_name = chosen_model
-            except Exception:
-                # Fallback naar CPU
-                cpu_model = self.model_cpu or self.model_name
-                self._model = WhisperModel(cpu_model, device="cpu", compute_type=self.compute_type_cpu)
-                self._device = "cpu"
-                self._compute_type = self.compute_type_cpu
-                self._chosen_model_name = cpu_model
+    @property
+    def loading(self) -> bool:
+        """True zolang de preload-thread (laden + warm-up) nog loopt."""
+        t = self._preload_thread
+        return t is not None and t.is_alive()
 
+    def start_preload(self) -> None:
+        """Laad + warm het model op de achtergrond; idempotent."""
+        if self._ready.is_set():
+            return
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            return
+        self._preload_thread = threading.Thread(
+            target=self._preload_worker, name="WhisperSTT-preload", daemon=True
+        )
+        self._preload_thread.start()
+
+    def _preload_worker(self) -> None:
+        try:
+            model = self._get_model(mark_ready=False)
+            # Korte warm-up (0.5 s stilte): eerste inferentie initialiseert kernels/buffers.
+            segments, _info = model.transcribe(np.zeros((8000,), dtype=np.float32), language=self.language)
+            for _ in segments:
+                pass
+        except Exception as e:
+            self.preload_error = e
+            print(f"[WhisperSTT] preload mislukt: {e!r}", file=sys.stderr)
+        finally:
+            if self._model is not None:
+                self._ready.set()
+
+    def _get_model(self, *, mark_ready: bool = True) -> WhisperModel:
+        if self._model is not None:
+            return self._model
+
+        # Lock: preload-thread en eerste transcribe mogen niet allebei laden.
+        with self._model_lock:
+            if self._model is None:
+                self._load_model()
+        if mark_ready:
+            self._ready.set()
         return self._model
 
+    def _model_opts(self) -> Dict[str, int]:
+        return {"cpu_threads": self.cpu_threads, "num_workers": self.num_workers, "replica": self.replica}
+
+    def _load_model(self) -> None:
+        device, compute_type, chosen_model = _select_backend(
+            self.mode,
+            model_name=self.model_name,
+            model_cpu=self.model_cpu,
+            model_gpu=self.model_gpu,
+            compute_type_cpu=self.compute_type_cpu,
+            compute_type_gpu=self.compute_type_gpu,
+        )
+
+        # Probeer CUDA echt te initialiseren; als dat faalt (driver/ct2), val terug naar CPU.
+        try:
+            self._model = _get_shared_model(chosen_model, device, compute_type, **self._model_opts())
+            self._device = device
+            self._compute_type = compute_type
+            self._chosen_model_name = chosen_model
+        except Exception:
+            # Fallback naar CPU
+            cpu_model = self.model_cpu or self.model_name
+            self._model = _get_shared_model(cpu_model, "cpu", self.compute_type_cpu, **self._model_opts())
+            self._device = "cpu"
+            self._compute_type = self.compute_type_cpu
+            self._chosen_model_name = cpu_model
+
     def transcribe(self, audio: UtteranceAudio) -> STTResult:
-        wav_bytes = audio.pcm  # WAV-bytes
-        float_audio, _sr = _wav_bytes_to_float32(wav_bytes)
+        if audio.samples is not None:
+            # Direct uit de mic-buffer: één int16 -> float32 conversie, geen WAV-roundtrip.
+            float_audio = _int16_to_float32(audio.samples)
+        else:
+            float_audio, _sr = _wav_bytes_to_float32(audio.wav_bytes())
 
         model = self._get_model()
 
@@ -153,3 +267,28 @@ class WhisperSTTBackend(STTBackend):
 
         text = "".join(seg.text for seg in segments).strip()
         return STTResult(text=text, language=self.language, confidence=None)
+
+    def transcribe_words(
+        self,
+        samples: np.ndarray,
+        *,
+        initial_prompt: Optional[str] = None,
+    ) -> List[Tuple[float, float, str]]:
+        """
+        Voor incrementele STT: woorden als (start_s, eind_s, tekst), tijden t.o.v. begin van 'samples'.
+        Geen vad_filter (korte, groeiende vensters); initial_prompt = al vastgelegde tekst.
+        """
+        model = self._get_model()
+        segments, _info = model.transcribe(
+            _int16_to_float32(samples),
+            language=self.language,
+            word_timestamps=True,
+            initial_prompt=initial_prompt or None,
+            condition_on_previous_text=False,
+        )
+
+        words: List[Tuple[float, float, str]] = []
+        for seg in segments:
+            for w in seg.words or []:
+                words.append((float(w.start), float(w.end), w.word))
+        return words
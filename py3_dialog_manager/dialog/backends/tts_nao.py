@@ -20,3 +20,9 @@ class Py2NaoTTSBackend(TTSBackend):
         payload = {"text": text}
         resp = requests.post(url, json=payload, timeout=self.timeout)
         resp.raise_for_status()
+
+    def stop(self) -> None:
+        """Breek lopende spraak af (barge-in); een lopende speak() keert dan terug."""
+        url = f"{self.base_url}/tts_stop"
+        resp = requests.post(url, json={}, timeout=self.timeout)
+        resp.raise_for_status()
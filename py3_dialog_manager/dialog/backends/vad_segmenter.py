@@ -1,27 +1,69 @@
 # app/dialog/backends/vad_segmenter.py
 from __future__ import annotations
 
-import io
+import math
 import time
-import wave
 from dataclasses import dataclass
-from typing import Callable, Optional
+from typing import Callable, Dict, Optional, Tuple
 
 import numpy as np
 
 
-def int16_to_wav_bytes(int16_mono: np.ndarray, sample_rate: int) -> bytes:
-    """Encodeer int16 mono PCM naar WAV-bytes (RIFF/WAVE)."""
-    if int16_mono.dtype != np.int16:
-        int16_mono = int16_mono.astype(np.int16)
+class Int16RingBuffer:
+    """
+    Ringbuffer met vaste capaciteit voor int16 mono samples.
+
+    push() overschrijft de oudste samples; kosten zijn O(blockgrootte),
+    onafhankelijk van hoeveel er al in zit.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(0, int(capacity))
+        self._buf = np.zeros((self.capacity,), dtype=np.int16)
+        self._pos = 0  # volgende schrijfpositie
+        self._n = 0    # aantal geldige samples
+
+    def __len__(self) -> int:
+        return self._n
+
+    def clear(self) -> None:
+        self._pos = 0
+        self._n = 0
 
-    buf = io.BytesIO()
-    with wave.open(buf, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)  # int16
-        wf.setframerate(sample_rate)
-        wf.writeframes(int16_mono.tobytes())
-    return buf.getvalue()
+    def push(self, block: np.ndarray) -> None:
+        cap = self.capacity
+        if cap == 0 or block.size == 0:
+            return
+        if block.size >= cap:
+            # alleen de staart past
+            self._buf[:] = block[-cap:]
+            self._pos = 0
+            self._n = cap
+            return
+
+        end = self._pos + block.size
+        if end <= cap:
+            self._buf[self._pos:end] = block
+        else:
+            first = cap - self._pos
+            self._buf[self._pos:] = block[:first]
+            self._buf[: end - cap] = block[first:]
+        self._pos = end % cap
+        self._n = min(cap, self._n + block.size)
+
+    def copy_into(self, out: np.ndarray) -> int:
+        """Kopieer de inhoud (oud -> nieuw) naar out[0:n]; retourneert n."""
+        n = self._n
+        if n == 0:
+            return 0
+        start = (self._pos - n) % self.capacity
+        if start + n <= self.capacity:
+            out[:n] = self._buf[start:start + n]
+        else:
+            first = self.capacity - start
+            out[:first] = self._buf[start:]
+            out[first:n] = self._buf[: n - first]
+        return n
 
 
 @dataclass(frozen=True)
@@ -32,52 +74,117 @@ class RmsVadConfig:
     pre_roll_ms: int = 200
     max_utterance_s: float = 12.0
     block_ms: int = 20
+    # Adaptief: drempels relatief aan een lopende ruisvloer-schatting.
+    # start_threshold_rms blijft dan de absolute ondergrens.
+    adaptive_threshold: bool = False
+    noise_start_ratio: float = 3.0    # start bij rms >= vloer * ratio
+    noise_stop_ratio: float = 2.0     # stilte bij rms < vloer * ratio (hysterese)
+    noise_floor_rise_ms: int = 5000   # tijdconstante omhoog (traag; elk block vóór de start telt mee)
+    noise_floor_fall_ms: int = 200    # tijdconstante omlaag (snel, pauzes tussen woorden)
 
 
-class RmsVadUtteranceCapturer:
+@dataclass(frozen=True)
+class WebRtcVadConfig:
+    sample_rate: int = 16000       # webrtcvad: 8000 | 16000 | 32000 | 48000
+    aggressiveness: int = 2        # 0 (mild) .. 3 (agressief filteren van niet-spraak)
+    min_speech_ms: int = 60        # zoveel aaneengesloten spraak nodig om te starten
+    stop_silence_ms: int = 500
+    pre_roll_ms: int = 200
+    max_utterance_s: float = 12.0
+    block_ms: int = 20
+
+
+class _BlockVadUtteranceCapturer:
     """
-    Utterance-segmentatie op simpele RMS-energie:
-    - wacht op spraak (rms >= threshold)
+    Gedeelde capture-engine; subklassen bepalen per block of het spraak is.
+
+    - wacht op spraak (_is_speech), evt. 'min_speech' aaneengesloten
     - neemt door tot er 'stop_silence_ms' stilte is
     - bewaart 'pre_roll_ms' audio vóór start (handig voor eerste woord)
+
+    Buffers worden één keer gealloceerd (pre-roll ring + lineaire utterance-buffer
+    van pre_roll + max_utterance) en per capture hergebruikt; per block is de
+    boekhouding O(1) en aan het eind volgt één slice-copy.
+    Houd dus één capturer per mic aan i.p.v. er per utterance een te maken.
     """
 
-    def __init__(self, cfg: RmsVadConfig) -> None:
-        self.cfg = cfg
+    def __init__(
+        self,
+        *,
+        sample_rate: int,
+        stop_silence_ms: int,
+        pre_roll_ms: int,
+        max_utterance_s: float,
+        block_ms: int,
+        min_speech_ms: int = 0,
+    ) -> None:
+        self._block_n = int(sample_rate * (block_ms / 1000.0))
+        self._pre_roll_n = int(sample_rate * (pre_roll_ms / 1000.0))
+        self._stop_sil_n = int(sample_rate * (stop_silence_ms / 1000.0))
+        self._max_n = int(sample_rate * max_utterance_s)
+        self._min_speech_n = int(sample_rate * (min_speech_ms / 1000.0))
 
-        self._block_n = int(cfg.sample_rate * (cfg.block_ms / 1000.0))
-        self._pre_roll_n = int(cfg.sample_rate * (cfg.pre_roll_ms / 1000.0))
-        self._stop_sil_n = int(cfg.sample_rate * (cfg.stop_silence_ms / 1000.0))
-        self._max_n = int(cfg.sample_rate * cfg.max_utterance_s)
+        self._pre_roll = Int16RingBuffer(self._pre_roll_n)
+        self._out = np.zeros((self._pre_roll_n + self._max_n,), dtype=np.int16)
 
-    @staticmethod
-    def _rms(block: np.ndarray) -> int:
-        # block: int16 mono
-        if block.size == 0:
-            return 0
-        x = block.astype(np.float32)
-        return int(np.sqrt(np.mean(x * x)) + 0.5)
+        # monotonic stamps van de laatste capture: speech_start, speech_end, capture_end
+        self.last_timings: Dict[str, float] = {}
+
+    def _is_speech(self, block: np.ndarray, started: bool) -> bool:
+        raise NotImplementedError
+
+    def _capture_done(self, hit_max: bool) -> None:
+        """Na een geslaagde capture; hit_max: afgekapt op max_utterance_s zonder stilte."""
+
+    def speech_detector(self) -> Callable[[np.ndarray], bool]:
+        """
+        Losse per-block spraakdetectie met dezelfde instellingen (barge-in). Gebruikt een
+        eigen kopie van de capturer, zodat ruisvloer/VAD-state van captures niet meeverandert.
+        """
+        twin = type(self)(self.cfg)  # type: ignore[attr-defined,call-arg]
+        return lambda block: twin._is_speech(block, False)
+
+    def _append(self, idx: int, block: np.ndarray) -> int:
+        """Schrijf block achter out[idx]; kapt af op de capaciteit. Retourneert nieuwe idx."""
+        room = self._out.size - idx
+        if room <= 0:
+            return idx
+        n = min(room, block.size)
+        self._out[idx:idx + n] = block[:n]
+        return idx + n
 
     def capture(
         self,
         get_block: Callable[[float], Optional[np.ndarray]],
         timeout_s: float = 10.0,
+        on_progress: Optional[Callable[[np.ndarray], None]] = None,
+        hold: Optional[Callable[[], bool]] = None,
     ) -> np.ndarray:
         """
         get_block(timeout) -> np.ndarray[int16] (mono) of None als er geen block beschikbaar is.
 
         timeout_s:
             Alleen relevant vóór start van spraak (hoe lang wachten tot er überhaupt spraak is).
+        hold:
+            Optioneel; zolang hold() True is (robot spreekt, zie SpeakingGate.muted_now) loopt
+            de timeout niet: die begint pas te tellen als de robot klaar is (incl. echo-staart).
+        on_progress:
+            Optioneel; na elk block na start aangeroepen met een view op de utterance tot nu toe
+            (zonder kopie, alleen geldig tot de volgende capture). Moet goedkoop zijn.
         """
         started = False
-        silence_run = 0  # in samples
+        speech_run = 0   # in samples, vóór start
+        silence_run = 0  # in samples, na start
+        idx = 0          # aantal samples in self._out
 
-        pre_roll = np.zeros((0,), dtype=np.int16)
-        captured: list[np.ndarray] = []
+        self._pre_roll.clear()
+        self.last_timings = {}
 
         t0 = time.time()
 
         while True:
+            if (not started) and hold is not None and hold():
+                t0 = time.time()
             if (not started) and (time.time() - t0 > timeout_s):
                 raise TimeoutError("Geen spraak gedetecteerd binnen timeout.")
 
@@ -91,38 +198,224 @@ class RmsVadUtteranceCapturer:
             if block.dtype != np.int16:
                 block = block.astype(np.int16)
 
-            rms = self._rms(block)
+            speech = self._is_speech(block, started)
 
             if not started:
-                # bouw pre-roll buffer op
-                if self._pre_roll_n > 0:
-                    pre_roll = np.concatenate([pre_roll, block])
-                    if pre_roll.size > self._pre_roll_n:
-                        pre_roll = pre_roll[-self._pre_roll_n :]
-
-                if rms >= self.cfg.start_threshold_rms:
+                speech_run = speech_run + block.size if speech else 0
+                if speech and speech_run >= self._min_speech_n:
                     started = True
-                    if pre_roll.size:
-                        captured.append(pre_roll.copy())
-                    captured.append(block)
+                    self.last_timings["speech_start"] = time.monotonic()
+                    self.last_timings["speech_end"] = self.last_timings["speech_start"]
+                    # pre-roll (zonder huidig block) vooraan in de utterance
+                    idx = self._pre_roll.copy_into(self._out)
+                    idx = self._append(idx, block)
                     silence_run = 0
+                    if on_progress is not None:
+                        on_progress(self._out[:idx])
+                else:
+                    # bouw pre-roll buffer op
+                    self._pre_roll.push(block)
                 continue
 
             # started
-            captured.append(block)
+            idx = self._append(idx, block)
+            if on_progress is not None:
+                on_progress(self._out[:idx])
 
-            if rms < self.cfg.start_threshold_rms:
+            if not speech:
                 silence_run += block.size
             else:
                 silence_run = 0
+                self.last_timings["speech_end"] = time.monotonic()
 
-            total_n = sum(x.size for x in captured)
             if silence_run >= self._stop_sil_n:
                 break
-            if total_n >= self._max_n:
+            if idx >= self._max_n:
                 break
 
-        if not captured:
+        if idx == 0:
             raise TimeoutError("Geen bruikbare audio gecaptured.")
 
-        return np.concatenate(captured).astype(np.int16)
+        self._capture_done(hit_max=silence_run < self._stop_sil_n)
+
+        self.last_timings["capture_end"] = time.monotonic()
+
+        return self._out[:idx].copy()
+
+
+class RmsVadUtteranceCapturer(_BlockVadUtteranceCapturer):
+    """
+    Utterance-segmentatie op simpele RMS-energie:
+    - wacht op spraak (rms >= threshold)
+    - neemt door tot er 'stop_silence_ms' stilte is
+    - bewaart 'pre_roll_ms' audio vóór start (handig voor eerste woord)
+
+    Met adaptive_threshold volgt de capturer een ruisvloer (bijv. NAO-hoofdventilatoren)
+    en legt start/stop-drempels relatief daaraan, zodat een utterance ook bij veel
+    achtergrondruis op tijd stopt i.p.v. door te lopen tot max_utterance_s.
+
+    De vloer volgt elk block vóór de start (ongeacht of het spraak is) en staat stil
+    tijdens een utterance (doorlopende spraak mag hem niet opstuwen). Eindigt een capture
+    op max_utterance_s zonder stilte, dan is hij vrijwel zeker door ruis gestart (vloer
+    te laag geseed of ruis die omhoog sprong): de vloer wordt dan opnieuw geschat uit
+    het 10e percentiel van de block-RMS van die capture.
+    """
+
+    def __init__(self, cfg: RmsVadConfig) -> None:
+        self.cfg = cfg
+        super().__init__(
+            sample_rate=cfg.sample_rate,
+            stop_silence_ms=cfg.stop_silence_ms,
+            pre_roll_ms=cfg.pre_roll_ms,
+            max_utterance_s=cfg.max_utterance_s,
+            block_ms=cfg.block_ms,
+        )
+
+        # Asymmetrische EMA (minimum-tracking): snel omlaag, traag omhoog.
+        self._noise_floor: Optional[float] = None
+        self._alpha_rise = 1.0 - math.exp(-cfg.block_ms / max(1.0, float(cfg.noise_floor_rise_ms)))
+        self._alpha_fall = 1.0 - math.exp(-cfg.block_ms / max(1.0, float(cfg.noise_floor_fall_ms)))
+        # block-RMS van de lopende utterance (voor de herschatting na max_utterance_s)
+        self._utt_rms = np.zeros((self._max_n // max(1, self._block_n) + 2,), dtype=np.float32)
+        self._utt_n = 0
+
+    @staticmethod
+    def _rms(block: np.ndarray) -> int:
+        # block: int16 mono
+        if block.size == 0:
+            return 0
+        x = block.astype(np.float32)
+        return int(np.sqrt(np.mean(x * x)) + 0.5)
+
+    @property
+    def noise_floor_rms(self) -> Optional[float]:
+        """Huidige ruisvloer-schatting (alleen bij adaptive_threshold), blijft over captures heen staan."""
+        return self._noise_floor
+
+    def _thresholds(self) -> Tuple[float, float]:
+        base = float(self.cfg.start_threshold_rms)
+        if not self.cfg.adaptive_threshold or self._noise_floor is None:
+            return base, base
+        return (
+            max(base, self._noise_floor * self.cfg.noise_start_ratio),
+            max(base, self._noise_floor * self.cfg.noise_stop_ratio),
+        )
+
+    def _update_noise_floor(self, rms: int) -> None:
+        if self._noise_floor is None:
+            self._noise_floor = float(rms)
+            return
+        a = self._alpha_fall if rms < self._noise_floor else self._alpha_rise
+        self._noise_floor += a * (rms - self._noise_floor)
+
+    def _is_speech(self, block: np.ndarray, started: bool) -> bool:
+        rms = self._rms(block)
+        if not self.cfg.adaptive_threshold:
+            return rms >= self.cfg.start_threshold_rms
+        if self._noise_floor is None:
+            self._noise_floor = float(rms)  # eerste block ooit: beginschatting
+        start_thr, stop_thr = self._thresholds()
+        speech = rms >= (stop_thr if started else start_thr)
+        if not started:
+            # Vóór de start: elk block telt (traag omhoog), ook als het boven de drempel zit,
+            # anders blijft een te lage vloer na een ruissprong voor altijd te laag.
+            self._update_noise_floor(rms)
+            self._utt_n = 0
+            if speech:
+                self._utt_rms[0] = rms  # dit block start de utterance
+                self._utt_n = 1
+        elif self._utt_n < self._utt_rms.size:
+            # Tijdens een utterance staat de vloer stil: doorlopende spraak zou hem (en dus
+            # stop_thr) opstuwen tot de spraak 'stilte' wordt.
+            self._utt_rms[self._utt_n] = rms
+            self._utt_n += 1
+        return speech
+
+    def _capture_done(self, hit_max: bool) -> None:
+        if self.cfg.adaptive_threshold and hit_max and self._utt_n:
+            self._noise_floor = float(np.percentile(self._utt_rms[: self._utt_n], 10))
+
+
+class WebRtcVadUtteranceCapturer(_BlockVadUtteranceCapturer):
+    """
+    Utterance-segmentatie met de WebRTC GMM-VAD (pip install webrtcvad).
+
+    Reageert op spraakkarakteristiek i.p.v. energie, dus ventilatorruis (NAO-hoofd)
+    triggert minder snel een start en einde-spraak wordt eerder herkend;
+    een kortere 'stop_silence_ms' (bijv. 500) volstaat meestal.
+
+    Een block wordt opgeknipt in frames van 10/20/30 ms; het block telt als spraak
+    als minstens de helft van de frames spraak is.
+    """
+
+    _VALID_RATES = (8000, 16000, 32000, 48000)
+    _VALID_FRAME_MS = (30, 20, 10)
+
+    def __init__(self, cfg: WebRtcVadConfig) -> None:
+        try:
+            import webrtcvad  # type: ignore
+        except ImportError as e:
+            raise RuntimeError("vad='webrtc' vereist: pip install webrtcvad") from e
+
+        if cfg.sample_rate not in self._VALID_RATES:
+            raise ValueError(f"webrtcvad ondersteunt sample_rate {self._VALID_RATES}, niet {cfg.sample_rate}")
+        if not 0 <= int(cfg.aggressiveness) <= 3:
+            raise ValueError("aggressiveness moet 0..3 zijn")
+
+        self.cfg = cfg
+        super().__init__(
+            sample_rate=cfg.sample_rate,
+            stop_silence_ms=cfg.stop_silence_ms,
+            pre_roll_ms=cfg.pre_roll_ms,
+            max_utterance_s=cfg.max_utterance_s,
+            block_ms=cfg.block_ms,
+            min_speech_ms=cfg.min_speech_ms,
+        )
+
+        self._vad = webrtcvad.Vad(int(cfg.aggressiveness))
+
+        # grootste framelengte die het block precies opdeelt
+        frame_ms = next((f for f in self._VALID_FRAME_MS if cfg.block_ms % f == 0), 10)
+        self._frame_n = int(cfg.sample_rate * (frame_ms / 1000.0))
+
+    def _is_speech(self, block: np.ndarray, started: bool) -> bool:
+        n_frames = block.size // self._frame_n
+        if n_frames == 0:
+            return False
+
+        raw = block[: n_frames * self._frame_n].tobytes()
+        frame_bytes = self._frame_n * 2
+        voiced = 0
+        for i in range(n_frames):
+            if self._vad.is_speech(raw[i * frame_bytes:(i + 1) * frame_bytes], self.cfg.sample_rate):
+                voiced += 1
+        return voiced * 2 >= n_frames
+
+
+def make_utterance_capturer(
+    cfg: RmsVadConfig,
+    vad: str = "rms",
+    *,
+    aggressiveness: int = 2,
+    min_speech_ms: int = 60,
+) -> _BlockVadUtteranceCapturer:
+    """
+    Kies de VAD per mic (mic.params.vad): "rms" (default) of "webrtc".
+    Voor webrtc worden de gedeelde velden (rate, stilte, pre-roll, max, block) uit cfg overgenomen.
+    """
+    v = (vad or "rms").lower()
+    if v == "rms":
+        return RmsVadUtteranceCapturer(cfg)
+    if v == "webrtc":
+        return WebRtcVadUtteranceCapturer(
+            WebRtcVadConfig(
+                sample_rate=cfg.sample_rate,
+                aggressiveness=aggressiveness,
+                min_speech_ms=min_speech_ms,
+                stop_silence_ms=cfg.stop_silence_ms,
+                pre_roll_ms=cfg.pre_roll_ms,
+                max_utterance_s=cfg.max_utterance_s,
+                block_ms=cfg.block_ms,
+            )
+        )
+    raise ValueError(f"Onbekende mic vad: {vad!r} (verwacht 'rms' of 'webrtc')")
@@ -0,0 +1,130 @@
+# py3_nao_behavior_manager/dialog/barge_in.py
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from dialog.speaking_gate import SpeakingGate
+
+
+class BargeInMonitor:
+    """
+    Barge-in: de gebruiker begint te praten terwijl de robot nog spreekt.
+
+    Tijdens de output (arm() ... disarm()) luistert de monitor mee op de
+    mic-stream (add_block_listener; vereist persistent_stream). Een block telt als
+    spraak als de VAD van de mic het spraak vindt (mic.speech_detector(): rms met de
+    drempels van de mic, of webrtc) én de RMS boven 'threshold_rms' ligt. Is dat
+    'min_speech_ms' aaneengesloten zo, dan:
+      - markeert hij de barge-in in de SpeakingGate (de volgende capture bewaart
+        de audio vanaf het begin van die spraak),
+      - roept hij on_barge_in aan (pipeline: resterende zinnen annuleren),
+      - en stopt hij de TTS via output.stop() (NAO: Py2 /tts_stop), op een eigen
+        thread zodat de audio-callback nooit op HTTP wacht.
+
+    De robot hoort zichzelf ook; de VAD onderscheidt de TTS niet van de gebruiker.
+    threshold_rms ligt daarom ruim boven de gewone VAD-drempel (de gebruiker staat
+    dichter bij een laptop-mic dan de NAO-speaker), en de eerste 'grace_ms' na arm()
+    telt niet (inzet van de TTS). Een mic in het NAO-hoofd (nao_ssh) zit naast de
+    speaker zonder echo-onderdrukking en wordt daarom niet ondersteund (zie de builder).
+    is_speech: eigen detector i.p.v. die van de mic (None + mic zonder speech_detector:
+    alleen threshold_rms). De detector krijgt elk block van de stream (vanaf de eerste
+    arm()), zodat een adaptieve ruisvloer de kamer volgt en niet alleen luide blocks.
+    """
+
+    def __init__(
+        self,
+        mic,
+        output,
+        gate: Optional[SpeakingGate] = None,
+        *,
+        threshold_rms: int = 1500,
+        min_speech_ms: int = 250,
+        grace_ms: int = 300,
+        is_speech: Optional[Callable[[np.ndarray], bool]] = None,
+    ) -> None:
+        self.mic = mic
+        self.output = output
+        self.gate = gate or SpeakingGate()
+        self.threshold_rms = float(threshold_rms)
+        self.min_speech_s = min_speech_ms / 1000.0
+        self.grace_s = grace_ms / 1000.0
+        if is_speech is None and hasattr(mic, "speech_detector"):
+            is_speech = mic.speech_detector()
+        self.is_speech = is_speech
+
+        self.triggered_at: Optional[float] = None  # begin van de onderbrekende spraak
+        self._armed = False
+        self._armed_at = 0.0
+        self._run_start: Optional[float] = None
+        self._on_barge_in: Optional[Callable[[], None]] = None
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def arm(self, on_barge_in: Optional[Callable[[], None]] = None) -> None:
+        """Start meeluisteren (vlak vóór de output) en zet de gate op 'robot spreekt'."""
+        if not self._listening:
+            self.mic.add_block_listener(self._on_block)
+            self._listening = True
+        with self._lock:
+            self.triggered_at = None
+            self._run_start = None
+            self._on_barge_in = on_barge_in
+            self._armed_at = time.monotonic()
+            self._armed = True
+        self.gate.begin(self._armed_at)
+
+    def disarm(self) -> Optional[float]:
+        """Stop meeluisteren; retourneert het begin van de barge-in, of None."""
+        with self._lock:
+            self._armed = False
+            self._on_barge_in = None
+            triggered_at = self.triggered_at
+        self.gate.end()
+        return triggered_at
+
+    def close(self) -> None:
+        if self._listening:
+            self.mic.remove_block_listener(self._on_block)
+            self._listening = False
+
+    # ---- op de audio-thread ----
+
+    def _on_block(self, ts: float, block: np.ndarray) -> None:
+        # Elk block naar de detector, ook stille en buiten arm(): een adaptieve mic-VAD
+        # moet de ruisvloer van de kamer zien, niet alleen blocks boven threshold_rms.
+        speech = self.is_speech(block) if self.is_speech is not None else True
+        with self._lock:
+            if not self._armed or self.triggered_at is not None or ts < self._armed_at + self.grace_s:
+                return
+
+            x = block.astype(np.float32)
+            loud = speech and block.size > 0 and float(np.sqrt(np.mean(x * x))) >= self.threshold_rms
+            if not loud:
+                self._run_start = None
+                return
+            if self._run_start is None:
+                self._run_start = ts
+            if ts - self._run_start < self.min_speech_s:
+                return
+
+            self.triggered_at = self._run_start
+            callback = self._on_barge_in
+
+        self.gate.barge_in(self.triggered_at)
+        if callback is not None:
+            callback()
+        threading.Thread(target=self._stop_output, name="BargeInStop", daemon=True).start()
+
+    def _stop_output(self) -> None:
+        stop = getattr(self.output, "stop", None)
+        if stop is None:
+            return
+        try:
+            stop()
+        except Exception as e:
+            print(f"[BargeIn] stoppen van TTS mislukt: {e!r}", file=sys.stderr)
@@ -0,0 +1,357 @@
+# py3_nao_behavior_manager/dialog/conversation_log.py
+from __future__ import annotations
+
+import atexit
+import gzip
+import io
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LOG_FORMATS = ("delta", "full")
+COMPRESSIONS = (None, "gzip", "zstd")
+
+Msg = Dict[str, Any]
+
+
+def _ts() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _plain(messages) -> List[Msg]:
+    """ChatMessage/dict/object -> {"role", "content"} (vergelijkbaar + JSON-baar)."""
+    out: List[Msg] = []
+    for m in messages:
+        if isinstance(m, dict):
+            out.append({"role": m.get("role"), "content": m.get("content")})
+        else:
+            out.append({"role": getattr(m, "role", None), "content": getattr(m, "content", None)})
+    return out
+
+
+def compute_delta(prev: List[Msg], cur: List[Msg]) -> Tuple[int, int, List[Msg]]:
+    """
+    (keep, drop, append) zodat cur == prev[:keep] + prev[keep+drop:] + append.
+
+    Dekt het normale patroon: gelijk prefix (system prompt), oudste turns eraf
+    (trimming), nieuwe messages erachter. Past niets, dan is drop alles en staat
+    de hele rest in append (altijd correct, alleen minder compact).
+    """
+    keep = 0
+    while keep < len(prev) and keep < len(cur) and prev[keep] == cur[keep]:
+        keep += 1
+
+    rest = len(prev) - keep
+    for drop in range(rest + 1):
+        tail = prev[keep + drop:]
+        if cur[keep:keep + len(tail)] == tail:
+            return keep, drop, cur[keep + len(tail):]
+    return keep, rest, cur[keep:]  # pragma: no cover (drop == rest matcht altijd)
+
+
+def apply_delta(prev: List[Msg], keep: int, drop: int, append: List[Msg]) -> List[Msg]:
+    return list(prev[:keep]) + list(prev[keep + drop:]) + list(append)
+
+
+class ConversationLog:
+    """
+    JSONL-log van wat naar de LLM gaat, geschreven door een achtergrondthread.
+
+    format "delta" (default):
+      - 1x header per bestand: {"event": "header", "meta": ..., "system_prompt": ...}
+      - per turn: {"event": "turn", "turn_idx", "sid", "keep", "drop", "append"}
+        t.o.v. de vorige messages van dezelfde sessie (sid); de system prompt uit
+        de header staat in append als {"role": "system", "ref": "system_prompt"}
+    format "full": het oude formaat, per turn {"ts", "turn_idx", "meta", "messages"}.
+
+    Overige records (bijv. timings) gaan via write_event ongewijzigd het bestand in.
+
+    log_messages/write_event zetten alleen een snapshot in een begrensde queue en
+    blokkeren nooit: is de queue vol (trage schijf/netwerkshare), dan wordt het record
+    weggegooid en geteld in 'dropped'. De writer-thread rekent de delta's uit,
+    flusht hooguit elke flush_interval_s en roteert optioneel bij rotate_bytes of
+    rotate_s naar <naam>.<n>.jsonl(.gz/.zst); elk segment begint met een eigen header.
+    read_turns() bouwt uit beide formaten (ook gecomprimeerd) weer volledige message-lijsten op.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        meta: Optional[Dict[str, Any]] = None,
+        system_prompt: Optional[str] = None,
+        fmt: str = "delta",
+        flush_interval_s: float = 1.0,
+        max_queue: int = 1000,
+        rotate_bytes: int = 0,
+        rotate_s: float = 0.0,
+        compress: Optional[str] = None,
+    ) -> None:
+        if fmt not in LOG_FORMATS:
+            raise ValueError(f"Onbekend log-formaat: {fmt!r} (verwacht een van {LOG_FORMATS})")
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"Onbekende log-compressie: {compress!r} (verwacht een van {COMPRESSIONS})")
+        if compress == "zstd":
+            try:
+                import zstandard  # type: ignore  # noqa: F401
+            except ImportError as e:
+                raise RuntimeError("log_compress='zstd' vereist: pip install zstandard") from e
+
+        self.path = path
+        self.meta = meta or {}
+        self.system_prompt = system_prompt
+        self.fmt = fmt
+        self.flush_interval_s = float(flush_interval_s)
+        self.rotate_bytes = int(rotate_bytes)
+        self.rotate_s = float(rotate_s)
+        self.compress = compress
+
+        self.dropped = 0
+        self.written = 0
+        self.segments: List[str] = []  # geroteerde (evt. gecomprimeerde) bestanden
+
+        self._q: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+        # alleen de writer-thread komt hieraan
+        self._prev: Dict[str, List[Msg]] = {}
+        self._f = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._last_flush = 0.0
+        self._open()
+
+        self._thread = threading.Thread(target=self._run, name="ConversationLog", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---- aangeroepen vanuit de pipeline (niet-blokkerend) ----
+
+    def _enqueue(self, item: tuple) -> None:
+        if self._closed:
+            return
+        try:
+            self._q.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_event(self, rec: Dict[str, Any]) -> None:
+        self._enqueue(("event", dict(rec)))
+
+    def log_messages(self, messages, *, turn_idx: int, sid: str = "") -> None:
+        self._enqueue(("turn", _ts(), turn_idx, sid, _plain(messages)))
+
+    # ---- writer-thread ----
+
+    def _open(self) -> None:
+        self._f = open(self.path, "a", encoding="utf-8", buffering=64 * 1024)
+        self._size = os.path.getsize(self.path)
+        self._opened_at = time.monotonic()
+        self._last_flush = self._opened_at
+        self._prev = {}  # nieuw segment: delta's beginnen opnieuw
+        if self.fmt == "delta":
+            self._write(
+                {
+                    "ts": _ts(),
+                    "event": "header",
+                    "format": "delta",
+                    "version": 1,
+                    "segment": len(self.segments),
+                    "meta": self.meta,
+                    "system_prompt": self.system_prompt,
+                }
+            )
+
+    def _write(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        self._f.write(line)
+        self._size += len(line)  # tekens ~ bytes; goed genoeg voor rotatie
+
+    def _turn_record(self, ts: str, turn_idx: int, sid: str, cur: List[Msg]) -> Dict[str, Any]:
+        if self.fmt == "full":
+            return {"ts": ts, "turn_idx": turn_idx, "meta": self.meta, "messages": cur}
+
+        keep, drop, append = compute_delta(self._prev.get(sid, []), cur)
+        self._prev[sid] = cur
+
+        if self.system_prompt:
+            append = [
+                {"role": "system", "ref": "system_prompt"}
+                if m["role"] == "system" and m["content"] == self.system_prompt
+                else m
+                for m in append
+            ]
+
+        rec: Dict[str, Any] = {"ts": ts, "event": "turn", "turn_idx": turn_idx}
+        if sid:
+            rec["sid"] = sid
+        rec.update({"keep": keep, "drop": drop, "append": append})
+        return rec
+
+    def _should_rotate(self) -> bool:
+        if self.rotate_bytes > 0 and self._size >= self.rotate_bytes:
+            return True
+        if self.rotate_s > 0 and time.monotonic() - self._opened_at >= self.rotate_s:
+            return True
+        return False
+
+    def _rotate(self) -> None:
+        self._f.close()
+
+        root, ext = os.path.splitext(self.path)
+        n = len(self.segments) + 1
+        target = f"{root}.{n:03d}{ext or '.jsonl'}"
+        while any(os.path.exists(target + suffix) for suffix in ("", ".gz", ".zst")):
+            n += 1  # segmenten van een eerdere run met hetzelfde pad
+            target = f"{root}.{n:03d}{ext or '.jsonl'}"
+        try:
+            os.replace(self.path, target)
+            if self.compress:
+                target = _compress_file(target, self.compress)
+            self.segments.append(target)
+        finally:
+            self._open()  # ook na een mislukte rotatie verder loggen
+
+    def _run(self) -> None:
+        while True:
+            timeout = max(0.0, self.flush_interval_s - (time.monotonic() - self._last_flush))
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+
+            try:
+                if item and item[0] == "flush":
+                    self._f.flush()
+                    self._last_flush = time.monotonic()
+                    item[1].set()
+                elif item:
+                    if item[0] == "turn":
+                        self._write(self._turn_record(*item[1:]))
+                    else:
+                        self._write(item[1])
+                    self.written += 1
+                    if self._should_rotate():
+                        self._rotate()
+
+                if time.monotonic() - self._last_flush >= self.flush_interval_s:
+                    self._f.flush()
+                    self._last_flush = time.monotonic()
+            except Exception as e:
+                # Logging mag de dialoog nooit stoppen.
+                print(f"[ConversationLog] schrijven mislukt: {e!r}", file=sys.stderr)
+
+        self._f.close()
+
+    # ---- lifecycle ----
+
+    def flush(self, timeout_s: float = 5.0) -> None:
+        """Wacht (begrensd) tot alles wat al in de queue stond op schijf staat."""
+        done = threading.Event()
+        self._enqueue(("flush", done))
+        done.wait(timeout_s)
+
+    def close(self) -> None:
+        """Queue leegschrijven, bestand sluiten en writer-thread stoppen."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._q.put(None)  # na de al aanwezige records; wacht evt. op een plek
+        self._thread.join()
+        atexit.unregister(self.close)
+        if self.dropped:
+            print(f"[ConversationLog] {self.dropped} records weggegooid (queue vol)", file=sys.stderr)
+
+
+def _compress_file(path: str, method: str) -> str:
+    """Comprimeer een afgesloten segment naar path.gz / path.zst en verwijder het origineel."""
+    if method == "gzip":
+        target = path + ".gz"
+        with open(path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    else:
+        import zstandard  # type: ignore
+
+        target = path + ".zst"
+        with open(path, "rb") as src, open(target, "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+    os.remove(path)
+    return target
+
+
+# ---- lezen ----
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        import zstandard  # type: ignore
+
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Alle JSON-records uit een log (.jsonl/.gz/.zst); een afgebroken laatste regel (crash) wordt overgeslagen."""
+    with _open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_turns(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Per LLM-call: {"ts", "turn_idx", "sid", "meta", "messages"} met de volledige
+    message-lijst, voor zowel delta- als (oude) full-logs. Meerdere runs achter
+    elkaar in één bestand mogen (elke header begint opnieuw).
+    """
+    meta: Dict[str, Any] = {}
+    system_prompt: Optional[str] = None
+    prev: Dict[str, List[Msg]] = {}
+
+    for rec in iter_records(path):
+        event = rec.get("event")
+
+        if event == "header":
+            meta = rec.get("meta") or {}
+            system_prompt = rec.get("system_prompt")
+            prev = {}
+            continue
+
+        if event == "turn":
+            sid = rec.get("sid", "")
+            append = [
+                {"role": m.get("role"), "content": system_prompt} if "ref" in m else m
+                for m in rec.get("append", [])
+            ]
+            messages = apply_delta(prev.get(sid, []), rec["keep"], rec["drop"], append)
+            prev[sid] = messages
+            yield {"ts": rec.get("ts"), "turn_idx": rec.get("turn_idx"), "sid": sid, "meta": meta, "messages": messages}
+            continue
+
+        if event is None and "messages" in rec:
+            yield {
+                "ts": rec.get("ts"),
+                "turn_idx": rec.get("turn_idx"),
+                "sid": rec.get("sid", ""),
+                "meta": rec.get("meta") or {},
+                "messages": rec["messages"],
+            }
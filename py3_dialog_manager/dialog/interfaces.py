@@ -1,8 +1,12 @@
 # py3_nao_behavior_manager/dialog/interfaces.py
 from __future__ import annotations
 
-from dataclasses import dataclass
+import io
+import wave
+from dataclasses import dataclass, field
 from typing import (
+    TYPE_CHECKING,
+    Dict,
     List,
     Optional,
     Protocol,
@@ -11,6 +15,9 @@ from typing import (
     runtime_checkable,
 )
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 # ====== Basis types ======
 
@@ -32,8 +39,8 @@ class UtteranceAudio:
     Eén gesproken utterance als audio.
 
     pcm:
-        Audiobytes. In deze codebase wordt dit in de praktijk vaak als WAV-bytes
-        (RIFF/WAVE) gebruikt, omdat WhisperSTTBackend wave.open(...) doet.
+        Audiobytes als WAV (RIFF/WAVE), of None als alleen 'samples' gezet is.
+        Gebruik wav_bytes() als je echt een bestand/bytes nodig hebt.
         (De naam 'pcm' is historisch.)
     sample_rate:
         Sample rate in Hz (bijv. 16000).
@@ -41,11 +48,32 @@ class UtteranceAudio:
         Aantal kanalen (1 = mono).
     sample_width:
         Bytes per sample (2 voor 16-bit).
+    samples:
+        Optioneel: de ruwe int16 mono buffer (zoals de mic-VAD hem oplevert, zonder kopie).
+        WhisperSTTBackend gebruikt die direct; WAV wordt dan pas lazy gemaakt in wav_bytes().
+    timings:
+        time.monotonic()-stamps van de VAD (speech_start, speech_end, capture_end).
     """
-    pcm: bytes
+    pcm: Optional[bytes]
     sample_rate: int
     channels: int = 1
     sample_width: int = 2
+    samples: Optional["np.ndarray"] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def wav_bytes(self) -> bytes:
+        """WAV-bytes; bij alleen 'samples' eenmalig encoderen en cachen in pcm."""
+        if self.pcm is None:
+            if self.samples is None:
+                raise ValueError("UtteranceAudio heeft geen pcm en geen samples.")
+            buf = io.BytesIO()
+            with wave.open(buf, "wb") as wf:
+                wf.setnchannels(self.channels)
+                wf.setsampwidth(self.sample_width)
+                wf.setframerate(self.sample_rate)
+                wf.writeframes(self.samples.tobytes())
+            self.pcm = buf.getvalue()
+        return self.pcm
 
 
 @dataclass
@@ -69,20 +97,40 @@ class UserInput:
         Optioneel: de audio-utterance (alleen bij audio input).
     stt:
         Optioneel: STTResult (alleen bij audio input).
+    timings:
+        time.monotonic()-stamps van de input-stages (zie dialog.timing.STAGES).
     """
     raw_text: str
     text: str
     audio: Optional[UtteranceAudio] = None
     stt: Optional[STTResult] = None
+    timings: Dict[str, float] = field(default_factory=dict)
 
 
 @dataclass
 class LLMResult:
-    """Resultaat van de LLM-call."""
+    """
+    Resultaat van de LLM-call.
+
+    Gebruik/tijden (None als de backend ze niet levert; zie dialog.llm_usage):
+    tokens_in/tokens_out = prompt- en antwoord-tokens; prompt_eval_ms/eval_ms/load_ms =
+    servertijden; tokens_per_s = tokens_out / eval; ttft_ms = tijd tot het eerste token
+    gemeten in de client (alleen bij streaming, incl. netwerk); server_ttft_ms = load +
+    prompt_eval volgens de server (altijd, als de backend het levert).
+    cached: antwoord kwam uit de response-cache (dialog.backends.llm_cache).
+    """
     reply: str
     messages: History
     tokens_in: Optional[int] = None
     tokens_out: Optional[int] = None
+    model: Optional[str] = None
+    prompt_eval_ms: Optional[float] = None
+    eval_ms: Optional[float] = None
+    load_ms: Optional[float] = None
+    tokens_per_s: Optional[float] = None
+    ttft_ms: Optional[float] = None
+    server_ttft_ms: Optional[float] = None
+    cached: bool = False
 
 
 @dataclass
@@ -90,11 +138,19 @@ class DialogTurn:
     """
     Data van één ronde:
     input (text/audio), optioneel STT, en LLM-resultaat.
+
+    timings: time.monotonic()-stamps per stage (listen_start ... output_done),
+    zie dialog.timing voor de namen en afgeleide duren.
+
+    interrupted: de gebruiker onderbrak de robot (barge-in); llm.reply en het
+    assistant-bericht in llm.messages bevatten dan alleen wat echt gezegd is.
     """
     user_input: UserInput
     llm: LLMResult
     user_audio: Optional[UtteranceAudio] = None
     stt: Optional[STTResult] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    interrupted: bool = False
 
 
 # ====== Interfaces / Protocols ======
@@ -160,3 +216,31 @@ class DialogPipeline(Protocol):
 
     def run_once(self, history: Optional[History] = None) -> DialogTurn:
         ...
+
+
+# ====== Async varianten (AsyncInputLLMOutputPipeline) ======
+# Bestaande sync backends passen hierop via dialog.async_adapters (executor).
+
+@runtime_checkable
+class AsyncInputBackend(Protocol):
+    async def get_input(self) -> UserInput:
+        ...
+
+
+@runtime_checkable
+class AsyncLLMBackend(Protocol):
+    async def generate(self, messages: History) -> LLMResult:
+        ...
+
+
+@runtime_checkable
+class AsyncOutputBackend(Protocol):
+    async def emit(self, text: str) -> None:
+        ...
+
+
+class AsyncDialogPipeline(Protocol):
+    """Async Input → LLM → Output; meerdere pipelines kunnen in één event loop draaien."""
+
+    async def run_once(self, history: Optional[History] = None) -> DialogTurn:
+        ...
@@ -0,0 +1,100 @@
+# py3_nao_behavior_manager/dialog/llm_usage.py
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from dialog.interfaces import LLMResult
+
+# LLMResult-velden die per turn in de log komen (event "timings", sleutel "llm")
+USAGE_FIELDS = (
+    "model",
+    "tokens_in",
+    "tokens_out",
+    "prompt_eval_ms",
+    "eval_ms",
+    "load_ms",
+    "tokens_per_s",
+    "ttft_ms",
+    "server_ttft_ms",
+)
+
+
+def usage_fields(res: LLMResult) -> Dict[str, Any]:
+    """Alleen de gevulde gebruiksvelden van een LLMResult (plus cached: true bij een cache-hit)."""
+    out = {k: getattr(res, k) for k in USAGE_FIELDS if getattr(res, k, None) is not None}
+    if getattr(res, "cached", False):
+        out["cached"] = True
+    return out
+
+
+def _median(vals: List[float]) -> Optional[float]:
+    if not vals:
+        return None
+    s = sorted(vals)
+    mid = len(s) // 2
+    return s[mid] if len(s) % 2 else (s[mid - 1] + s[mid]) / 2.0
+
+
+class UsageTotals:
+    """
+    Optelling van LLM-gebruik over een run (per model), voor het "llm_summary"-record
+    bij close. tokens_per_s is gewogen: totaal tokens_out / totale eval-tijd.
+    ttft_ms (client, streaming) en server_ttft_ms (load + prompt_eval) blijven apart,
+    zodat cloud en lokaal appels met appels vergeleken worden.
+
+    Thread-safe: de webapp deelt één instantie over alle requests.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._per_model: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, res: LLMResult) -> None:
+        if res.tokens_out is None and res.ttft_ms is None and res.server_ttft_ms is None:
+            return  # backend levert niets (echo/none, cache-hit) of afgebroken stream
+        with self._lock:
+            m = self._per_model.setdefault(
+                res.model or "",
+                {
+                    "calls": 0,
+                    "tokens_in": 0,
+                    "tokens_out": 0,
+                    "prompt_eval_ms": 0.0,
+                    "eval_ms": 0.0,
+                    "ttft": [],
+                    "server_ttft": [],
+                },
+            )
+            m["calls"] += 1
+            m["tokens_in"] += res.tokens_in or 0
+            m["tokens_out"] += res.tokens_out or 0
+            m["prompt_eval_ms"] += res.prompt_eval_ms or 0.0
+            m["eval_ms"] += res.eval_ms or 0.0
+            if res.ttft_ms is not None:
+                m["ttft"].append(res.ttft_ms)
+            if res.server_ttft_ms is not None:
+                m["server_ttft"].append(res.server_ttft_ms)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            per_model = {
+                k: dict(v, ttft=list(v["ttft"]), server_ttft=list(v["server_ttft"])) for k, v in self._per_model.items()
+            }
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for model, m in per_model.items():
+            ttft = _median(m["ttft"])
+            server_ttft = _median(m["server_ttft"])
+            out[model] = {
+                "calls": m["calls"],
+                "tokens_in": m["tokens_in"],
+                "tokens_out": m["tokens_out"],
+                "tokens_per_s": round(m["tokens_out"] / (m["eval_ms"] / 1000.0), 1) if m["eval_ms"] else None,
+                "prompt_tokens_per_s": (
+                    round(m["tokens_in"] / (m["prompt_eval_ms"] / 1000.0), 1) if m["prompt_eval_ms"] else None
+                ),
+                "ttft_ms_p50": round(ttft, 1) if ttft is not None else None,
+                "server_ttft_ms_p50": round(server_ttft, 1) if server_ttft is not None else None,
+            }
+        return out
@@ -0,0 +1,265 @@
+# py3_nao_behavior_manager/dialog/multi_session.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from dialog.interfaces import History, LLMResult
+from dialog.pipeline_async import AsyncInputLLMOutputPipeline
+from dialog.pipeline_builder import (
+    build_async_pipeline_from_config,
+    make_llm_from_config,
+    make_stt_pool_from_config,
+)
+
+JsonLike = Dict[str, Any]
+
+# llm.params die per robot mogen verschillen zonder dat de client anders wordt
+_PER_SESSION_LLM_PARAMS = ("system_prompt", "system_prompt_file", "context", "stream")
+
+
+def _llm_key(cfg: JsonLike) -> str:
+    llm_cfg = cfg.get("llm", {}) or {}
+    params = {k: v for k, v in (llm_cfg.get("params", {}) or {}).items() if k not in _PER_SESSION_LLM_PARAMS}
+    return json.dumps({"type": llm_cfg.get("type"), "params": params}, sort_keys=True)
+
+
+def _stt_key(cfg: JsonLike) -> Optional[str]:
+    input_cfg = cfg.get("input", {}) or {}
+    if str(input_cfg.get("type", "")).lower() != "audio" or not input_cfg.get("stt"):
+        return None
+    return json.dumps(input_cfg["stt"], sort_keys=True)
+
+
+class FairLimiter:
+    """
+    Hoogstens 'limit' tegelijk binnen (with limiter: ...), over threads heen. Wachtenden
+    komen in volgorde van aankomst aan de beurt (FIFO), dus één drukke robot kan de
+    andere niet uithongeren.
+    """
+
+    def __init__(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError("limit moet >= 1 zijn.")
+        self.limit = int(limit)
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting: Deque[object] = deque()
+
+    def __enter__(self) -> "FairLimiter":
+        ticket = object()
+        with self._cond:
+            self._waiting.append(ticket)
+            while self._waiting[0] is not ticket or self._active >= self.limit:
+                self._cond.wait()
+            self._waiting.popleft()
+            self._active += 1
+            self._cond.notify_all()  # volgende in de rij mag kijken of er nog plek is
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+
+class _FairLLM:
+    """
+    Sync LLM achter een gedeelde FairLimiter. Begrenst elke call op de backend, dus
+    zowel dialoog-turns (via de executor) als de RollingSummarizer (eigen thread).
+    Andere attributen lopen door naar de LLM.
+    """
+
+    def __init__(self, llm: Any, limiter: FairLimiter) -> None:
+        self.llm = llm
+        self.limiter = limiter
+
+    def generate(self, messages: History) -> LLMResult:
+        with self.limiter:
+            return self.llm.generate(messages)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+
+class _FairStreamingLLM(_FairLLM):
+    def generate_stream(self, messages: History, on_delta: Callable[[str], None]) -> LLMResult:
+        with self.limiter:
+            return self.llm.generate_stream(messages, on_delta)
+
+
+def limit_llm(llm: Any, limiter: FairLimiter) -> Any:
+    """Sync LLM -> zelfde LLM, maar begrensd door 'limiter' (vóór het bouwen van de pipelines)."""
+    if hasattr(llm, "generate_stream"):
+        return _FairStreamingLLM(llm, limiter)
+    return _FairLLM(llm, limiter)
+
+
+@dataclass
+class RobotSession:
+    name: str
+    pipeline: AsyncInputLLMOutputPipeline
+    history: History = field(default_factory=list)
+    turns: int = 0
+    errors: int = 0
+
+
+class MultiSessionRunner:
+    """
+    Meerdere robots (sessies) vanuit één proces, in één event loop.
+
+    from_configs() bouwt per robot-config een AsyncInputLLMOutputPipeline en deelt:
+      - de LLM-backend tussen configs met dezelfde llm.type + client-params
+        (system prompt, context en stream blijven per robot);
+      - de STT tussen configs met dezelfde input.stt: één Whisper-model achter een
+        STTWorkerPool (FIFO-wachtrij, input.stt.pool.workers bepaalt de parallelliteit).
+    Alle LLM-calls (turns én samenvattingen) gaan via een gedeelde FairLimiter: standaard
+    één plek per robot (niemand wacht op een ander), met een lagere max_concurrent_llm
+    (bijv. één lokale GPU) gaan robots FIFO om de beurt.
+
+    Een fout in één sessie stopt de andere niet: de sessie logt hem en probeert het
+    na error_backoff_s opnieuw.
+    """
+
+    def __init__(
+        self,
+        sessions: Sequence[RobotSession],
+        *,
+        executor: Optional[Executor] = None,
+        resources: Sequence[Any] = (),
+        error_backoff_s: float = 1.0,
+    ) -> None:
+        names = [s.name for s in sessions]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Sessienamen moeten uniek zijn: {names}")
+        self.sessions = list(sessions)
+        self.executor = executor
+        self.resources = list(resources)  # gedeelde backends met close() (STT-pools, LLM's)
+        self.error_backoff_s = float(error_backoff_s)
+
+    @classmethod
+    def from_configs(
+        cls,
+        configs: Sequence[Tuple[str, JsonLike]],
+        *,
+        max_concurrent_llm: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        **kwargs: Any,
+    ) -> "MultiSessionRunner":
+        """
+        configs: [(config_path, cfg), ...]; sessienaam = run.session_name of de
+        bestandsnaam van de config (komt als 'sid' in de log).
+        max_concurrent_llm: None = aantal robots.
+        """
+        if not configs:
+            raise ValueError("MultiSessionRunner heeft minstens één robot-config nodig.")
+        if max_concurrent_llm is not None and max_concurrent_llm < 1:
+            raise ValueError("max_concurrent_llm moet >= 1 zijn.")
+
+        # per robot: een thread voor mic/STT, een voor de output en wat marge
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers or 3 * len(configs) + 2, thread_name_prefix="robot"
+        )
+        limiter = FairLimiter(max_concurrent_llm or len(configs))
+
+        stt_users: Dict[str, int] = {}
+        for _path, cfg in configs:
+            key = _stt_key(cfg)
+            if key is not None:
+                stt_users[key] = stt_users.get(key, 0) + 1
+
+        llms: Dict[str, Any] = {}
+        stts: Dict[str, Any] = {}
+        sessions: List[RobotSession] = []
+        try:
+            for path, cfg in configs:
+                run_cfg = cfg.get("run", {}) or {}
+                name = run_cfg.get("session_name") or os.path.splitext(os.path.basename(path))[0]
+
+                lk = _llm_key(cfg)
+                if lk not in llms:
+                    llms[lk] = limit_llm(make_llm_from_config(cfg), limiter)
+
+                sk = _stt_key(cfg)
+                if sk is not None and sk not in stts:
+                    # elke robot moet altijd een plek in de wachtrij krijgen
+                    pool_cfg = cfg["input"]["stt"].get("pool", {}) or {}
+                    max_queue = max(stt_users[sk], int(pool_cfg.get("max_queue", 8)))
+                    stts[sk] = make_stt_pool_from_config(cfg, max_queue=max_queue)
+
+                pipeline = build_async_pipeline_from_config(
+                    cfg,
+                    config_path=path,
+                    executor=executor,
+                    llm=llms[lk],
+                    stt=stts.get(sk) if sk is not None else None,
+                    session_id=name,
+                )
+                summarizer = pipeline.summarizer
+                if summarizer is not None and summarizer.llm is not llms[lk]:
+                    summarizer.llm = limit_llm(summarizer.llm, limiter)  # eigen samenvattingsmodel
+                sessions.append(RobotSession(name=name, pipeline=pipeline))
+
+            # gedeelde LLM's met close() (bijv. keep-warm pinger) sluit de runner, niet de pipeline
+            resources = list(stts.values()) + [llm for llm in llms.values() if hasattr(llm, "close")]
+            return cls(sessions, executor=executor, resources=resources, **kwargs)
+        except BaseException:
+            for s in sessions:
+                s.pipeline.close()
+            for r in list(stts.values()) + list(llms.values()):
+                if hasattr(r, "close"):
+                    r.close()
+            executor.shutdown(wait=False)
+            raise
+
+    @classmethod
+    def from_json(cls, paths: Sequence[str], **kwargs: Any) -> "MultiSessionRunner":
+        configs = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                configs.append((path, json.load(f)))
+        return cls.from_configs(configs, **kwargs)
+
+    async def _run_session(self, session: RobotSession, max_turns: Optional[int]) -> None:
+        while max_turns is None or session.turns < max_turns:
+            try:
+                turn = await session.pipeline.run_once(history=session.history)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                session.errors += 1
+                print(f"[{session.name}] turn mislukt: {e!r}", file=sys.stderr)
+                await asyncio.sleep(self.error_backoff_s)
+                continue
+            session.history = turn.llm.messages
+            session.turns += 1
+
+    async def run(self, *, max_turns: Optional[int] = None) -> None:
+        """Alle sessies tegelijk draaien (max_turns per sessie; None = tot cancel/Ctrl+C)."""
+        await asyncio.gather(*(self._run_session(s, max_turns) for s in self.sessions))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": {s.name: {"turns": s.turns, "errors": s.errors} for s in self.sessions},
+            "stt_pools": [r.stats() for r in self.resources if hasattr(r, "stats")],
+        }
+
+    def close(self) -> None:
+        try:
+            for s in self.sessions:
+                try:
+                    s.pipeline.close()
+                except Exception as e:
+                    print(f"[{s.name}] close mislukt: {e!r}", file=sys.stderr)
+        finally:
+            for r in self.resources:
+                r.close()
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
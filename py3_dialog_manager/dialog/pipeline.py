@@ -1,10 +1,16 @@
 # py3_nao_behavior_manager/dialog/pipeline.py
 from __future__ import annotations
 
-import json
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
-
+from typing import Optional, Dict, Any, List, Tuple
+
+from dialog import timing
+from dialog.barge_in import BargeInMonitor
+from dialog.conversation_log import ConversationLog
+from dialog.llm_usage import UsageTotals, usage_fields
+from dialog.streaming import SentenceChunker, SentenceSpeaker
+from dialog.summarizer import RollingSummarizer, is_summary_message
+from dialog.token_budget import TokenEstimator
 from dialog.interfaces import (
     DialogPipeline,
     DialogTurn,
@@ -15,6 +21,10 @@ from dialog.interfaces import (
 )
 
 
+class _BargeIn(Exception):
+    """Intern: LLM-stream afbreken nadat de gebruiker de robot onderbrak."""
+
+
 def _role(msg: Any) -> Optional[str]:
     if isinstance(msg, dict):
         return msg.get("role")
@@ -26,8 +36,24 @@ class InputLLMOutputPipeline(DialogPipeline):
     Input -> LLM -> Output
 
     - system_prompt: als eerste system-message meegestuurd
-    - log_messages_path: JSONL met exacte 'messages' die naar LLM gaan
+    - log_messages_path: JSONL met exacte 'messages' die naar LLM gaan (zie ConversationLog;
+      log_format "delta" schrijft system prompt/meta 1x en daarna alleen wijzigingen)
+    - log_options: extra ConversationLog-opties (max_queue, flush_interval_s, rotate_bytes,
+      rotate_s, compress); schrijven gebeurt op een achtergrondthread, nooit in de turn
+    - conversation_log: gedeelde ConversationLog (webapp: één log, session_id per sessie)
+    - llm_usage: gedeelde UsageTotals (webapp: over alle requests); het "llm_summary"-record
+      schrijft alleen de pipeline die de log zelf geopend heeft, bij close()
+    - owns_llm: close() sluit ook de LLM (keep-warm pinger, cache); False als de LLM
+      gedeeld is (webapp-requests, multi-session)
     - max_history_turns: bewaart laatste N user-turns (inclusief huidige user turn)
+    - max_prompt_tokens: token-budget voor de hele prompt (incl. system prompt); oudste
+      turns vallen eraf tot de (geschatte) prompt past; de huidige turn blijft altijd staan
+    - barge_in: BargeInMonitor; de output gaat dan per zin en stopt zodra de gebruiker
+      de robot onderbreekt; het assistant-bericht bevat alleen de uitgesproken zinnen
+    - summarizer: RollingSummarizer; turns die door trimming wegvallen worden na de output
+      (op de achtergrond) samengevat en als system-message na de system prompt meegestuurd
+    - stream_output: als de LLM generate_stream heeft, wordt de reply per zin naar
+      output.emit gestuurd zodra die zin af is (uitspreken overlapt met genereren)
     """
 
     def __init__(
@@ -41,6 +67,17 @@ class InputLLMOutputPipeline(DialogPipeline):
         log_messages_path: Optional[str] = None,
         log_meta: Optional[Dict[str, Any]] = None,
         max_history_turns: Optional[int] = None,
+        max_prompt_tokens: Optional[int] = None,
+        token_estimator: Optional[TokenEstimator] = None,
+        llm_usage: Optional[UsageTotals] = None,
+        summarizer: Optional[RollingSummarizer] = None,
+        barge_in: Optional[BargeInMonitor] = None,
+        stream_output: bool = False,
+        log_format: str = "delta",
+        log_options: Optional[Dict[str, Any]] = None,
+        conversation_log: Optional[ConversationLog] = None,
+        session_id: str = "",
+        owns_llm: bool = False,
     ) -> None:
         self.input = input_backend
         self.llm = llm
@@ -52,27 +89,62 @@ class InputLLMOutputPipeline(DialogPipeline):
         self.log_messages_path = log_messages_path
         self.log_meta = log_meta or {}
         self.max_history_turns = max_history_turns
+        self.max_prompt_tokens = max_prompt_tokens
+        self.token_estimator = token_estimator or TokenEstimator()
+        self.last_prompt_tokens: Optional[int] = None
+        self.summarizer = summarizer
+        self.barge_in = barge_in
+        self.stream_output = stream_output
+        self.session_id = session_id
+
+        # Eigen log alleen als er geen gedeelde is meegegeven; die sluiten we ook zelf.
+        self._owns_log = conversation_log is None and bool(log_messages_path)
+        if self._owns_log:
+            conversation_log = ConversationLog(
+                log_messages_path,
+                meta=self.log_meta,
+                system_prompt=self.system_prompt,
+                fmt=log_format,
+                **(log_options or {}),
+            )
+        self.conversation_log = conversation_log
 
+        self._owns_llm = owns_llm
         self._turn_idx = 0
+        self.llm_usage = llm_usage or UsageTotals()
 
     def _status(self, msg: str) -> None:
         if self.status_to_console:
             print(msg)
 
+    def _write_log(self, rec: Dict[str, Any]) -> None:
+        if self.conversation_log is None:
+            return
+        if self.session_id:
+            rec["sid"] = self.session_id
+        self.conversation_log.write_event(rec)
+
     def _log_messages(self, messages: History) -> None:
-        if not self.log_messages_path:
+        if self.conversation_log is None:
             return
+        self.conversation_log.log_messages(messages, turn_idx=self._turn_idx, sid=self.session_id)
 
-        rec = {
+    def _log_timings(self, timings: Dict[str, float], llm_res: Optional[LLMResult] = None) -> None:
+        """
+        Na output: per-stage tijden van deze turn (ms t.o.v. eerste stage) + afgeleide duren,
+        en onder "llm" het gebruik uit de LLM-response (tokens, servertijden, tokens/s).
+        """
+        rec: Dict[str, Any] = {
             "ts": datetime.now(timezone.utc).isoformat(),
             "turn_idx": self._turn_idx,
-            "meta": self.log_meta,
-            "messages": messages,
+            "event": "timings",
+            "timings_ms": timing.relative_ms(timings),
+            "durations_ms": timing.durations_ms(timings),
         }
-        line = json.dumps(rec, ensure_ascii=False)
-        with open(self.log_messages_path, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-            f.flush()
+        usage = usage_fields(llm_res) if llm_res is not None else {}
+        if usage:
+            rec["llm"] = usage
+        self._write_log(rec)
 
     def _prepend_system_prompt(self, messages: History) -> History:
         if not self.system_prompt:
@@ -113,49 +185,263 @@ class InputLLMOutputPipeline(DialogPipeline):
         cut = user_idxs[-n]
         return sys_prefix + rest[cut:]
 
-    def run_once(self, history: History | None = None) -> DialogTurn:
-        user_in: UserInput = self.input.get_input()
+    def _trim_to_token_budget(self, history: History, reserved: int = 0) -> History:
+        """
+        Knip hele turns (user + volgende assistant-messages) van voren af tot de
+        geschatte prompt binnen max_prompt_tokens past. Elke message wordt één keer
+        geteld; per weggeknipte turn trekken we af van het lopende totaal.
 
-        # Lege input => geen LLM call, geen output (en dus ook niets te loggen)
-        if not (user_in.text or "").strip():
-            llm_res = LLMResult(reply="", messages=list(history or []))
-            return DialogTurn(
-                user_input=user_in,
-                llm=llm_res,
-                user_audio=user_in.audio,
-                stt=user_in.stt,
-            )
+        De system prompt (al dan niet nog te prependen) telt mee maar blijft staan;
+        de laatste user-turn ook, ook als die alleen al over het budget gaat.
+        'reserved' telt extra mee (bijv. de samenvatting die er nog tussen komt).
+        """
+        budget = self.max_prompt_tokens
+        if budget is None:
+            return history
+
+        sys_prefix: List[Any] = []
+        rest: List[Any] = list(history)
+        if rest and _role(rest[0]) == "system":
+            sys_prefix = [rest[0]]
+            rest = rest[1:]
+
+        est = self.token_estimator
+        counts = [est.count(m) for m in rest]
+        total = est.total(sys_prefix) + sum(counts) + reserved
+        if not sys_prefix and self.system_prompt:
+            total += est.count({"role": "system", "content": self.system_prompt})
+
+        user_idxs = [i for i, m in enumerate(rest) if _role(m) == "user"]
+        cut = 0
+        for start in user_idxs:  # de laatste start is de huidige turn: verder knippen we nooit
+            if total <= budget:
+                break
+            if start > cut:
+                total -= sum(counts[cut:start])
+                cut = start
+
+        self.last_prompt_tokens = total
+        return sys_prefix + rest[cut:]
+
+    @staticmethod
+    def _evicted(before: History, after: History) -> History:
+        """Messages die trimming van voren heeft afgeknipt (trimming houdt altijd een staart)."""
+        rest_before = before[1:] if before and _role(before[0]) == "system" else before
+        rest_after = after[1:] if after and _role(after[0]) == "system" else after
+        return list(rest_before[: len(rest_before) - len(rest_after)])
+
+    def _start_speaker(self) -> SentenceSpeaker:
+        speaker = SentenceSpeaker(self.output)
+        if self.barge_in is not None:
+            self.barge_in.arm(on_barge_in=speaker.cancel)
+        return speaker
+
+    def _finish_speaker(self, speaker: SentenceSpeaker, timings: Dict[str, float]) -> None:
+        try:
+            # wacht tot alles uitgesproken is (en geef emit-fouten door)
+            speaker.close()
+        finally:
+            if self.barge_in is not None:
+                onset = self.barge_in.disarm()
+                if onset is not None:
+                    timings["barge_in"] = onset
+
+    @staticmethod
+    def _truncated(messages: History, spoken: List[str]) -> LLMResult:
+        """LLM-resultaat met als assistant-bericht alleen wat vóór de barge-in gezegd is."""
+        said = " ".join(spoken).strip()
+        content = f"{said} …" if said else "…"
+        return LLMResult(
+            reply=said,
+            messages=list(messages) + [ChatMessage(role="assistant", content=content)],  # type: ignore[arg-type]
+        )
 
-        messages: History = list(history or [])
+    def _generate_streaming(self, messages: History, timings: Dict[str, float]) -> LLMResult:
+        """LLM streamen; elke complete zin meteen (op een eigen thread) naar output."""
+        chunker = SentenceChunker()
+        speaker = self._start_speaker()
+
+        def say(sentence: str) -> None:
+            if "output_start" not in timings:
+                timings["output_start"] = timing.now()
+                self._status("📣 OUTPUT...")
+            speaker.say(sentence)
+
+        def on_delta(delta: str) -> None:
+            if "llm_first_token" not in timings:
+                timings["llm_first_token"] = timing.now()
+            if speaker.cancelled.is_set():
+                raise _BargeIn()  # stream afbreken: de rest wordt toch niet uitgesproken
+            for sentence in chunker.feed(delta):
+                say(sentence)
+
+        llm_res: Optional[LLMResult] = None
+        try:
+            try:
+                llm_res = self.llm.generate_stream(messages, on_delta)
+            except _BargeIn:
+                pass
+            timings["llm_done"] = timing.now()
+            rest = chunker.flush()
+            if rest:
+                say(rest)
+        finally:
+            self._finish_speaker(speaker, timings)
+
+        if speaker.cancelled.is_set() or llm_res is None:
+            return self._truncated(messages, speaker.spoken)
+        return llm_res
+
+    def _speak_interruptible(self, messages: History, llm_res: LLMResult, timings: Dict[str, float]) -> LLMResult:
+        """Niet-streamend antwoord per zin uitspreken, zodat een barge-in per zin kan afkappen."""
+        chunker = SentenceChunker()
+        speaker = self._start_speaker()
+        try:
+            for sentence in chunker.feed(llm_res.reply):
+                speaker.say(sentence)
+            rest = chunker.flush()
+            if rest:
+                speaker.say(rest)
+        finally:
+            self._finish_speaker(speaker, timings)
+
+        if speaker.cancelled.is_set():
+            return self._truncated(messages, speaker.spoken)
+        return llm_res
+
+    # ---- turn-opbouw (gedeeld met AsyncInputLLMOutputPipeline) ----
+
+    @staticmethod
+    def _empty_turn(user_in: UserInput, history: History | None) -> DialogTurn:
+        """Lege input => geen LLM call, geen output (en dus ook niets te loggen)."""
+        llm_res = LLMResult(reply="", messages=list(history or []))
+        return DialogTurn(
+            user_input=user_in,
+            llm=llm_res,
+            user_audio=user_in.audio,
+            stt=user_in.stt,
+            timings=dict(user_in.timings),
+        )
+
+    def _prepare_messages(self, user_in: UserInput, history: History | None) -> Tuple[History, History]:
+        """
+        History + huidige user -> (messages_to_send, evicted): trimmen, system prompt en
+        samenvatting erbij, en loggen. evicted = messages die deze turn zijn weggevallen.
+        """
+        # Samenvatting van vorige turn eruit; die voegen we hieronder vers toe
+        messages: History = [m for m in (history or []) if not is_summary_message(m)]
 
         # Voeg huidige user toe
         messages.append(ChatMessage(role="user", content=user_in.text))  # type: ignore[arg-type]
 
+        summary_msg = self.summarizer.summary_message() if self.summarizer is not None else None
+        reserved = self.token_estimator.count(summary_msg) if summary_msg is not None else 0
+
         # Trim nu (dus inclusief de huidige user turn)
+        before = messages
         messages = self._trim_history(messages)
+        messages = self._trim_to_token_budget(messages, reserved=reserved)
+        evicted = self._evicted(before, messages)
 
-        # System prompt toevoegen (als eerste)
+        # System prompt toevoegen (als eerste), samenvatting direct erna
         messages_to_send = self._prepend_system_prompt(messages)
+        if summary_msg is not None:
+            at = 1 if messages_to_send and _role(messages_to_send[0]) == "system" else 0
+            messages_to_send = messages_to_send[:at] + [summary_msg] + messages_to_send[at:]
 
         # LOG: exact wat we gaan sturen
         self._log_messages(messages_to_send)
+        return messages_to_send, evicted
 
-        self._status("🤖 THINKING...")
-        llm_res = self.llm.generate(messages_to_send)
-
-        self._status("📣 OUTPUT...")
-        self.output.emit(llm_res.reply)
+    def _finish_turn(
+        self, user_in: UserInput, llm_res: LLMResult, timings: Dict[str, float], evicted: History
+    ) -> DialogTurn:
+        timings["output_done"] = timing.now()
 
         turn = DialogTurn(
             user_input=user_in,
             llm=llm_res,
             user_audio=user_in.audio,
             stt=user_in.stt,
+            timings=timings,
+            interrupted="barge_in" in timings,
         )
 
+        self._log_timings(timings, llm_res)
+        self.llm_usage.add(llm_res)
+
+        # Pas na de output: weggevallen turns samenvatten (achtergrondthread)
+        if self.summarizer is not None and evicted:
+            self.summarizer.submit(evicted)
+
         self._turn_idx += 1
         return turn
 
+    def run_once(self, history: History | None = None) -> DialogTurn:
+        user_in: UserInput = self.input.get_input()
+
+        if not (user_in.text or "").strip():
+            return self._empty_turn(user_in, history)
+
+        messages_to_send, evicted = self._prepare_messages(user_in, history)
+
+        timings = dict(user_in.timings)
+
+        self._status("🤖 THINKING...")
+        timings["llm_start"] = timing.now()
+        if self.stream_output and hasattr(self.llm, "generate_stream"):
+            llm_res = self._generate_streaming(messages_to_send, timings)
+        else:
+            llm_res = self.llm.generate(messages_to_send)
+            timings["llm_done"] = timing.now()
+
+            self._status("📣 OUTPUT...")
+            timings["output_start"] = timing.now()
+            if self.barge_in is not None:
+                llm_res = self._speak_interruptible(messages_to_send, llm_res, timings)
+            else:
+                self.output.emit(llm_res.reply)
+
+        return self._finish_turn(user_in, llm_res, timings, evicted)
+
+    def close(self) -> None:
+        """
+        Achtergrond-output laten uitpraten (overlap_listen), barge-in-listener loskoppelen,
+        de input (mic-stream) sluiten, de samenvatter afronden (en zijn eigen model sluiten),
+        het LLM-gebruik van de run loggen ("llm_summary"),
+        de eigen LLM sluiten en de log flushen/sluiten (LLM en log alleen als deze
+        pipeline ze zelf gebouwd heeft).
+        """
+        summary = self.llm_usage.summary() if self._owns_log else None
+        if summary:
+            self._write_log(
+                {
+                    "ts": datetime.now(timezone.utc).isoformat(),
+                    "turn_idx": self._turn_idx,
+                    "event": "llm_summary",
+                    "per_model": summary,
+                }
+            )
+        closers = [
+            getattr(self.output, "close", None),
+            self.barge_in.close if self.barge_in is not None else None,
+            getattr(self.input, "close", None),  # mic: persistent stream / SSH-reader stoppen
+            self.summarizer.close if self.summarizer is not None else None,
+            getattr(self.llm, "close", None) if self._owns_llm else None,
+            self.conversation_log.close if self._owns_log and self.conversation_log is not None else None,
+        ]
+        # alles sluiten, ook als een eerdere close faalt; de eerste fout komt door
+        errors: List[BaseException] = []
+        for close in closers:
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
 
 def build_pipeline(profile_name: str = "nao_whisper_ollama_cloud"):
     raise RuntimeError(
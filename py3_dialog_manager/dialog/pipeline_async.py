@@ -0,0 +1,94 @@
+# py3_nao_behavior_manager/dialog/pipeline_async.py
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, Optional
+
+from dialog import timing
+from dialog.async_adapters import to_async_input, to_async_llm, to_async_output
+from dialog.interfaces import DialogTurn, History, LLMResult, UserInput
+from dialog.pipeline import InputLLMOutputPipeline
+from dialog.streaming import SentenceChunker
+
+
+class AsyncInputLLMOutputPipeline(InputLLMOutputPipeline):
+    """
+    Async variant van InputLLMOutputPipeline: await input -> LLM -> output.
+
+    Zelfde opties en dezelfde turn-opbouw (trimming, token-budget, samenvatting,
+    logging, timings); alleen de I/O is async. Sync backends worden automatisch in
+    een executor gedraaid (dialog.async_adapters), zodat meerdere pipelines (robots /
+    sessies) in één event loop tegelijk kunnen wachten op mic, STT, Ollama en NAO.
+
+    stream_output: zinnen gaan in volgorde naar await output.emit terwijl de LLM nog
+    streamt. barge_in wordt (nog) niet ondersteund.
+    """
+
+    def __init__(self, input_backend, llm, output_backend, *, executor: Optional[Executor] = None, **kwargs) -> None:
+        if kwargs.get("barge_in") is not None:
+            raise ValueError("AsyncInputLLMOutputPipeline ondersteunt barge_in niet.")
+        super().__init__(
+            to_async_input(input_backend, executor),
+            to_async_llm(llm, executor),
+            to_async_output(output_backend, executor),
+            **kwargs,
+        )
+
+    async def _generate_streaming_async(self, messages: History, timings: Dict[str, float]) -> LLMResult:
+        chunker = SentenceChunker()
+        sentences: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+        async def speak() -> None:
+            while True:
+                sentence = await sentences.get()
+                if sentence is None:
+                    return
+                if "output_start" not in timings:
+                    timings["output_start"] = timing.now()
+                    self._status("📣 OUTPUT...")
+                await self.output.emit(sentence)
+
+        def on_delta(delta: str) -> None:
+            if "llm_first_token" not in timings:
+                timings["llm_first_token"] = timing.now()
+            for sentence in chunker.feed(delta):
+                sentences.put_nowait(sentence)
+
+        speaker = asyncio.create_task(speak())
+        try:
+            llm_res = await self.llm.generate_stream(messages, on_delta)
+            timings["llm_done"] = timing.now()
+            rest = chunker.flush()
+            if rest:
+                sentences.put_nowait(rest)
+        finally:
+            sentences.put_nowait(None)
+            # wacht tot alles uitgesproken is (en geef emit-fouten door)
+            await speaker
+
+        return llm_res
+
+    async def run_once(self, history: History | None = None) -> DialogTurn:  # type: ignore[override]
+        user_in: UserInput = await self.input.get_input()
+
+        if not (user_in.text or "").strip():
+            return self._empty_turn(user_in, history)
+
+        messages_to_send, evicted = self._prepare_messages(user_in, history)
+
+        timings = dict(user_in.timings)
+
+        self._status("🤖 THINKING...")
+        timings["llm_start"] = timing.now()
+        if self.stream_output and hasattr(self.llm, "generate_stream"):
+            llm_res = await self._generate_streaming_async(messages_to_send, timings)
+        else:
+            llm_res = await self.llm.generate(messages_to_send)
+            timings["llm_done"] = timing.now()
+
+            self._status("📣 OUTPUT...")
+            timings["output_start"] = timing.now()
+            await self.output.emit(llm_res.reply)
+
+        return self._finish_turn(user_in, llm_res, timings, evicted)
@@ -3,10 +3,16 @@ from __future__ import annotations
 
 import json
 import os
+from concurrent.futures import Executor
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+from dialog.conversation_log import COMPRESSIONS, LOG_FORMATS
 from dialog.pipeline import InputLLMOutputPipeline
+from dialog.pipeline_async import AsyncInputLLMOutputPipeline
+from dialog.barge_in import BargeInMonitor
+from dialog.speaking_gate import SpeakingGate
+from dialog.summarizer import RollingSummarizer
 
 # input backends
 from dialog.backends.input_audio import AudioInputBackend
@@ -16,16 +22,20 @@ from dialog.backends.input_console import ConsoleInputBackend
 from dialog.backends.mic_laptop import LaptopMic
 from dialog.backends.mic_nao_ssh import NaoSshMic
 from dialog.backends.stt_whisper import WhisperSTTBackend
+from dialog.backends.stt_pool import STTWorkerPool
 
 # llm backends
 from dialog.backends.llm_echo import EchoLLMBackend
 from dialog.backends.llm_none import NoOpLLMBackend
-from dialog.backends.llm_ollama import OllamaClient, OllamaLLMBackend
+from dialog.backends.llm_cache import CachingLLMBackend
+from dialog.backends.llm_hedged import HedgedLLMBackend
+from dialog.backends.llm_ollama import KeepWarmPinger, OllamaClient, OllamaLLMBackend
 
 # output backends
 from dialog.backends.output_console import ConsoleOutputBackend
 from dialog.backends.output_none import NoOpOutputBackend
 from dialog.backends.output_nao import NaoTTSOutputBackend
+from dialog.backends.output_background import BackgroundOutputBackend
 
 
 JsonLike = Dict[str, Any]
@@ -118,6 +128,28 @@ def _extract_max_history_turns(cfg: JsonLike) -> Optional[int]:
     return v
 
 
+def _extract_max_prompt_tokens(cfg: JsonLike) -> Optional[int]:
+    """llm.params.context.max_prompt_tokens (token-budget voor de prompt, optioneel)."""
+    params = ((cfg.get("llm", {}) or {}).get("params", {}) or {})
+    ctx = params.get("context", {}) or {}
+    v = ctx.get("max_prompt_tokens", None)
+    if v is None:
+        return None
+    if not isinstance(v, int) or v <= 0:
+        raise ValueError("max_prompt_tokens moet een positieve int zijn (of weglaten).")
+    return v
+
+
+def _extract_stream_output(cfg: JsonLike) -> bool:
+    """llm.params.stream: reply per zin naar output zodra die af is (default: uit)."""
+    llm_cfg = cfg.get("llm", {}) or {}
+    params = (llm_cfg.get("params", {}) or {})
+    v = params.get("stream", False)
+    if not isinstance(v, bool):
+        raise ValueError("llm.params.stream moet een bool zijn.")
+    return v
+
+
 def _make_mic(mic_cfg: JsonLike):
     t = _req(mic_cfg, "type").lower()
     p = mic_cfg.get("params", {}) or {}
@@ -128,16 +160,52 @@ def _make_mic(mic_cfg: JsonLike):
     raise ValueError(f"Onbekende mic.type: {t!r}")
 
 
-def _make_stt(stt_cfg: JsonLike):
+def _make_stt(stt_cfg: JsonLike, **overrides: Any):
     t = _req(stt_cfg, "type").lower()
-    p = stt_cfg.get("params", {}) or {}
+    p = dict(stt_cfg.get("params", {}) or {})
+    p.update(overrides)
     if t == "whisper":
-        return WhisperSTTBackend(**p)
+        stt = WhisperSTTBackend(**p)
+        if stt.preload:
+            stt.start_preload()
+        return stt
     if t == "vosk":
         raise NotImplementedError("Vosk nog niet toegevoegd in deze builder.")
     raise ValueError(f"Onbekende stt.type: {t!r}")
 
 
+def _stt_pool_cfg(stt_cfg: JsonLike) -> JsonLike:
+    pool = stt_cfg.get("pool", {}) or {}
+    if not isinstance(pool, dict):
+        raise ValueError("input.stt.pool moet een object/dict zijn.")
+    return pool
+
+
+def _stt_pool_overrides(stt_cfg: JsonLike, *, replica: int = 0) -> JsonLike:
+    """
+    input.stt.pool = {"workers": N, "max_queue": M, "separate_models": bool}
+
+    - separate_models=false (default): één model met num_workers=N
+    - separate_models=true: N modelkopieën (replica 0..N-1)
+    In beide gevallen worden cpu_threads over de workers verdeeld, tenzij expliciet gezet.
+    Zonder pool-config: geen overrides.
+    """
+    pool = _stt_pool_cfg(stt_cfg)
+    if not pool:
+        return {}
+
+    workers = max(1, int(pool.get("workers", 1)))
+    params = stt_cfg.get("params", {}) or {}
+    out: JsonLike = {}
+    if "cpu_threads" not in params and workers > 1:
+        out["cpu_threads"] = max(1, (os.cpu_count() or 1) // workers)
+    if bool(pool.get("separate_models", False)):
+        out["replica"] = replica
+    elif "num_workers" not in params:
+        out["num_workers"] = workers
+    return out
+
+
 def make_stt_backend_from_config(cfg: JsonLike):
     """
     Factory for "just the STT backend" from a full run config.
@@ -152,10 +220,37 @@ def make_stt_backend_from_config(cfg: JsonLike):
         raise ValueError("Config mist input.stt (nodig voor /api/transcribe).")
     if not isinstance(stt_cfg, dict):
         raise ValueError("input.stt moet een object/dict zijn.")
-    return _make_stt(stt_cfg)
+    return _make_stt(stt_cfg, **_stt_pool_overrides(stt_cfg))
 
 
-def _make_input(cfg: JsonLike):
+def make_stt_pool_from_config(cfg: JsonLike, *, stt=None, max_queue: Optional[int] = None) -> STTWorkerPool:
+    """
+    Bounded STT worker pool for concurrent `/api/transcribe` requests.
+
+    Reads input.stt.pool (workers, max_queue, separate_models); without it this is
+    a single worker over `stt`. Pass `stt` to reuse an already built backend as slot 0.
+    `max_queue` overrides the configured queue size (multi-session: at least one slot per robot).
+    """
+    cfg = _expand_env(cfg)
+    stt_cfg = (cfg.get("input", {}) or {}).get("stt", None) or {}
+    pool = _stt_pool_cfg(stt_cfg)
+    workers = max(1, int(pool.get("workers", 1)))
+    if max_queue is None:
+        max_queue = int(pool.get("max_queue", 8))
+
+    if stt is None:
+        stt = make_stt_backend_from_config(cfg)
+
+    backends = [stt]
+    for i in range(1, workers):
+        if bool(pool.get("separate_models", False)):
+            backends.append(_make_stt(stt_cfg, **_stt_pool_overrides(stt_cfg, replica=i)))
+        else:
+            backends.append(stt)
+    return STTWorkerPool(backends, max_queue=max_queue)
+
+
+def _make_input(cfg: JsonLike, *, stt=None):
     input_cfg = _req(cfg, "input")
     t = _req(input_cfg, "type").lower()
     p = input_cfg.get("params", {}) or {}
@@ -165,13 +260,83 @@ def _make_input(cfg: JsonLike):
 
     if t == "audio":
         mic = _make_mic(_req(input_cfg, "mic"))
-        stt = _make_stt(_req(input_cfg, "stt"))
+        stt_cfg = _req(input_cfg, "stt")
+        if stt is None:
+            # zelfde overrides als de web-pool, zodat het model gedeeld wordt (registry-sleutel)
+            stt = _make_stt(stt_cfg, **_stt_pool_overrides(stt_cfg))
         return AudioInputBackend(mic=mic, stt=stt, **p)
 
     raise ValueError(f"Onbekende input.type: {t!r}")
 
 
-def _make_llm(cfg: JsonLike):
+def _extract_keep_alive(p: JsonLike) -> Optional[Any]:
+    """llm.params.keep_alive: "30m" / "1h", seconden (int/float) of -1 (altijd geladen)."""
+    v = p.get("keep_alive", None)
+    if v is None or isinstance(v, (str, int, float)) and not isinstance(v, bool):
+        return v
+    raise ValueError("llm.params.keep_alive moet een duur-string (\"30m\"), seconden of -1 zijn.")
+
+
+_HTTP_OPTIONS = {
+    "connect_timeout_s": float,
+    "read_timeout_s": float,
+    "max_connections": int,
+    "max_keepalive": int,
+    "keepalive_expiry_s": float,
+    "http2": bool,
+    "retries": int,
+    "retry_backoff_s": float,
+}
+
+
+def _extract_http_options(p: JsonLike) -> Dict[str, Any]:
+    """
+    llm.params.http: transport van de Ollama-client (zie OllamaClient), bijv.
+    {"connect_timeout_s": 5, "read_timeout_s": 60, "max_connections": 10, "http2": true, "retries": 2}
+    read_timeout_s: null = geen read-timeout.
+    """
+    v = p.get("http", None) or {}
+    if not isinstance(v, dict):
+        raise ValueError("llm.params.http moet een object/dict zijn.")
+    unknown = set(v) - set(_HTTP_OPTIONS)
+    if unknown:
+        raise ValueError(f"Onbekende llm.params.http opties: {sorted(unknown)}")
+    return {k: (None if v[k] is None and k == "read_timeout_s" else _HTTP_OPTIONS[k](v[k])) for k in v}
+
+
+def _with_warm_up(client: OllamaClient, p: JsonLike) -> OllamaLLMBackend:
+    """
+    llm.params.warm_up: true -> model meteen (op de achtergrond) laden bij het bouwen.
+    llm.params.keep_warm_s: N -> tijdens een actieve sessie elke N s pingen als er geen
+    request was (keep_warm_idle_s, default 1800: daarna stoppen tot het volgende request).
+    """
+    if p.get("warm_up", False):
+        client.warm_up_background()
+
+    keep_warm = None
+    if p.get("keep_warm_s"):
+        keep_warm = KeepWarmPinger(
+            client, float(p["keep_warm_s"]), idle_stop_s=float(p.get("keep_warm_idle_s", 1800.0))
+        )
+    return OllamaLLMBackend(client, keep_warm=keep_warm)
+
+
+def _make_hedged(p: JsonLike) -> HedgedLLMBackend:
+    """
+    llm.type "hedged": {"primary": {"type": ..., "params": {...}}, "secondary": {...}, "hedge_after_s": 2.0}
+    Sub-configs zijn gewone llm-secties (incl. eigen cache/keep_warm); system prompt,
+    context en stream staan op het hedged-niveau.
+    """
+    subs = []
+    for key in ("primary", "secondary"):
+        sub = _req(p, key)
+        if not isinstance(sub, dict) or "type" not in sub:
+            raise ValueError(f"llm.params.{key} moet een llm-sectie zijn met 'type' (en optioneel 'params').")
+        subs.append(_make_llm({"llm": sub}))
+    return HedgedLLMBackend(subs[0], subs[1], hedge_after_s=float(p.get("hedge_after_s", 2.0)))
+
+
+def _make_llm_backend(cfg: JsonLike):
     llm_cfg = _req(cfg, "llm")
     t = _req(llm_cfg, "type").lower()
     p = llm_cfg.get("params", {}) or {}
@@ -182,12 +347,21 @@ def _make_llm(cfg: JsonLike):
     if t == "none":
         return NoOpLLMBackend()
 
+    if t == "hedged":
+        return _make_hedged(p)
+
     if t in ("ollama_local",):
         host = p.get("host", "http://localhost:11434")
         model = p.get("model", "llama3.1:8b")
         api_key = p.get("api_key", None)
-        client = OllamaClient(model=model, host=host, api_key=api_key)
-        return OllamaLLMBackend(client)
+        client = OllamaClient(
+            model=model,
+            host=host,
+            api_key=api_key,
+            keep_alive=_extract_keep_alive(p),
+            **_extract_http_options(p),
+        )
+        return _with_warm_up(client, p)
 
     if t in ("ollama", "ollama_cloud"):
         api_key = p.get("api_key") or os.environ.get("OLLAMA_API_KEY")
@@ -196,12 +370,81 @@ def _make_llm(cfg: JsonLike):
 
         host = p.get("host", os.environ.get("OLLAMA_HOST", "https://ollama.com"))
         model = p.get("model", os.environ.get("OLLAMA_MODEL", "gpt-oss:120b"))
-        client = OllamaClient(model=model, host=host, api_key=api_key)
+        if p.get("warm_up") or p.get("keep_warm_s"):
+            raise ValueError("llm.params.warm_up/keep_warm_s zijn alleen voor llm.type 'ollama_local'.")
+        client = OllamaClient(
+            model=model,
+            host=host,
+            api_key=api_key,
+            keep_alive=_extract_keep_alive(p),
+            **_extract_http_options(p),
+        )
         return OllamaLLMBackend(client)
 
     raise ValueError(f"Onbekende llm.type: {t!r}")
 
 
+def _make_llm(cfg: JsonLike):
+    """
+    LLM-backend, optioneel met response-cache ervoor:
+    llm.params.cache: true | {"max_entries": int, "ttl_s": float, "path": "cache/llm.sqlite"}
+    (path = SQLite-laag die runs overleeft; zonder path alleen in geheugen).
+    """
+    llm = _make_llm_backend(cfg)
+    llm_cfg = cfg.get("llm", {}) or {}
+    p = llm_cfg.get("params", {}) or {}
+    v = p.get("cache", None)
+    if not v:
+        return llm
+    if v is True:
+        v = {}
+    if not isinstance(v, dict):
+        raise ValueError("llm.params.cache moet true of een object/dict zijn.")
+
+    kwargs: Dict[str, Any] = {}
+    if v.get("max_entries") is not None:
+        kwargs["max_entries"] = int(v["max_entries"])
+    if v.get("ttl_s") is not None:
+        kwargs["ttl_s"] = float(v["ttl_s"])
+    if v.get("path"):
+        kwargs["path"] = str(v["path"])
+    # sleutel op het model/de host die de backend echt gebruikt (zie llm_identity)
+    return CachingLLMBackend(llm, **kwargs)
+
+
+def make_llm_from_config(cfg: JsonLike):
+    """Alleen de LLM-backend uit een run-config (multi-session: één client voor meerdere robots)."""
+    return _make_llm(_expand_env(cfg))
+
+
+def _make_summarizer(cfg: JsonLike, llm) -> Optional[RollingSummarizer]:
+    """
+    llm.params.context.summarize: true | {"model": "...", "max_chars": int}
+    Zonder model gebruikt de samenvatter dezelfde LLM-backend als de dialoog.
+    """
+    llm_cfg = cfg.get("llm", {}) or {}
+    params = (llm_cfg.get("params", {}) or {})
+    v = (params.get("context", {}) or {}).get("summarize", None)
+    if not v:
+        return None
+    if v is True:
+        v = {}
+    if not isinstance(v, dict):
+        raise ValueError("llm.params.context.summarize moet true of een object/dict zijn.")
+
+    summary_llm = llm
+    if v.get("model"):
+        # samenvatten is niet latency-kritisch: geen warm-up/keep-warm voor dit model
+        summary_params = {k: x for k, x in params.items() if k not in ("warm_up", "keep_warm_s")}
+        summary_llm = _make_llm({"llm": {"type": llm_cfg.get("type"), "params": {**summary_params, "model": v["model"]}}})
+
+    kwargs = {}
+    if v.get("max_chars") is not None:
+        kwargs["max_chars"] = int(v["max_chars"])
+    # een apart gebouwd model is van de samenvatter; pipeline.close() sluit het via summarizer.close()
+    return RollingSummarizer(summary_llm, owns_llm=summary_llm is not llm, **kwargs)
+
+
 def _make_output(cfg: JsonLike):
     out_cfg = _req(cfg, "output")
     t = _req(out_cfg, "type").lower()
@@ -217,6 +460,36 @@ def _make_output(cfg: JsonLike):
     raise ValueError(f"Onbekende output.type: {t!r}")
 
 
+def _make_barge_in(run_cfg: JsonLike, input_backend, output, *, overlap_listen: bool) -> Optional[BargeInMonitor]:
+    """
+    run.barge_in: true | {"threshold_rms": int, "min_speech_ms": int, "grace_ms": int, "echo_tail_ms": int}
+    Vereist audio-input met een mic met persistent_stream (meeluisteren tijdens de output);
+    de monitor gebruikt de VAD van die mic plus threshold_rms. Niet met een nao_ssh-mic.
+    """
+    v = run_cfg.get("barge_in", None)
+    if not v:
+        return None
+    if v is True:
+        v = {}
+    if not isinstance(v, dict):
+        raise ValueError("run.barge_in moet true of een object/dict zijn.")
+    if overlap_listen:
+        raise ValueError("run.barge_in en run.overlap_listen gaan niet samen (kies er één).")
+
+    mic = getattr(input_backend, "mic", None)
+    if mic is None or not getattr(mic, "persistent_stream", False):
+        raise ValueError("run.barge_in vereist input.type 'audio' met mic.params.persistent_stream: true.")
+    if isinstance(mic, NaoSshMic):
+        # de NAO-mics zitten naast de speaker en er is geen echo-onderdrukking: de robot onderbreekt zichzelf
+        raise ValueError("run.barge_in werkt niet met mic.type 'nao_ssh' (hoort de eigen TTS); gebruik een laptop-mic.")
+
+    gate = SpeakingGate(echo_tail_ms=int(v.get("echo_tail_ms", run_cfg.get("echo_tail_ms", 300))))
+    mic.speaking_gate = gate
+
+    kwargs = {k: int(v[k]) for k in ("threshold_rms", "min_speech_ms", "grace_ms") if v.get(k) is not None}
+    return BargeInMonitor(mic, output, gate, **kwargs)
+
+
 def _default_log_path(config_path: str, log_dir: str) -> str:
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     cfg_name = os.path.splitext(os.path.basename(config_path))[0]
@@ -224,7 +497,29 @@ def _default_log_path(config_path: str, log_dir: str) -> str:
     return os.path.join(log_dir, filename)
 
 
-def build_pipeline_from_config(cfg: JsonLike, *, config_path: str = "<memory>") -> InputLLMOutputPipeline:
+def _extract_log_options(run_cfg: JsonLike) -> Dict[str, Any]:
+    """run.log_* -> ConversationLog-opties (achtergrond-writer, rotatie, compressie)."""
+    opts: Dict[str, Any] = {}
+    if run_cfg.get("log_queue_size") is not None:
+        opts["max_queue"] = int(run_cfg["log_queue_size"])
+    if run_cfg.get("log_flush_s") is not None:
+        opts["flush_interval_s"] = float(run_cfg["log_flush_s"])
+    if run_cfg.get("log_rotate_mb") is not None:
+        opts["rotate_bytes"] = int(float(run_cfg["log_rotate_mb"]) * 1024 * 1024)
+    if run_cfg.get("log_rotate_s") is not None:
+        opts["rotate_s"] = float(run_cfg["log_rotate_s"])
+
+    compress = run_cfg.get("log_compress")
+    if compress is not None and str(compress).lower() != "none":
+        compress = str(compress).lower()
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"run.log_compress moet 'gzip', 'zstd' of 'none' zijn, niet {compress!r}")
+        opts["compress"] = compress
+    return opts
+
+
+def _build_pipeline(cfg: JsonLike, *, config_path: str, pipeline_cls, llm=None, stt=None, **extra: Any):
+    """llm/stt: al gebouwde (gedeelde) backends i.p.v. nieuwe uit cfg (multi-session)."""
     cfg = _expand_env(cfg)
 
     run_cfg = cfg.get("run", {}) or {}
@@ -234,6 +529,10 @@ def build_pipeline_from_config(cfg: JsonLike, *, config_path: str = "<memory>")
     log_messages = bool(run_cfg.get("log_messages", True))
     log_dir = run_cfg.get("log_dir", "logs")
     log_messages_path = run_cfg.get("log_messages_path", None)
+    log_format = str(run_cfg.get("log_format", "delta")).lower()
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"run.log_format moet een van {LOG_FORMATS} zijn, niet {log_format!r}")
+    log_options = _extract_log_options(run_cfg)
 
     if log_messages:
         if not log_messages_path:
@@ -246,10 +545,26 @@ def build_pipeline_from_config(cfg: JsonLike, *, config_path: str = "<memory>")
 
     system_prompt = _extract_system_prompt(cfg, config_path=config_path)
     max_history_turns = _extract_max_history_turns(cfg)
+    max_prompt_tokens = _extract_max_prompt_tokens(cfg)
+    stream_output = _extract_stream_output(cfg)
 
-    input_backend = _make_input(cfg)
-    llm = _make_llm(cfg)
+    input_backend = _make_input(cfg, stt=stt)
+    owns_llm = llm is None  # een meegegeven (gedeelde) LLM sluit de eigenaar, niet deze pipeline
+    if owns_llm:
+        llm = _make_llm(cfg)
     output = _make_output(cfg)
+    summarizer = _make_summarizer(cfg, llm)
+
+    # Overlap: output spreekt op de achtergrond, mic luistert al (en negeert de robot zelf)
+    overlap_listen = bool(run_cfg.get("overlap_listen", False))
+    if overlap_listen:
+        gate = SpeakingGate(echo_tail_ms=int(run_cfg.get("echo_tail_ms", 300)))
+        output = BackgroundOutputBackend(output, gate)
+        mic = getattr(input_backend, "mic", None)
+        if mic is not None:
+            mic.speaking_gate = gate
+
+    barge_in = _make_barge_in(run_cfg, input_backend, output, overlap_listen=overlap_listen)
 
     llm_cfg = cfg.get("llm", {}) or {}
     llm_params = (llm_cfg.get("params", {}) or {})
@@ -260,9 +575,14 @@ def build_pipeline_from_config(cfg: JsonLike, *, config_path: str = "<memory>")
         "llm_model": llm_params.get("model"),
         "has_system_prompt": bool(system_prompt),
         "max_history_turns": max_history_turns,
+        "max_prompt_tokens": max_prompt_tokens,
+        "summarize": summarizer is not None,
+        "overlap_listen": overlap_listen,
+        "barge_in": barge_in is not None,
+        "stream_output": stream_output,
     }
 
-    return InputLLMOutputPipeline(
+    return pipeline_cls(
         input_backend=input_backend,
         llm=llm,
         output_backend=output,
@@ -271,6 +591,42 @@ def build_pipeline_from_config(cfg: JsonLike, *, config_path: str = "<memory>")
         log_messages_path=log_messages_path if log_messages else None,
         log_meta=log_meta,
         max_history_turns=max_history_turns,
+        max_prompt_tokens=max_prompt_tokens,
+        summarizer=summarizer,
+        barge_in=barge_in,
+        stream_output=stream_output,
+        log_format=log_format,
+        log_options=log_options,
+        owns_llm=owns_llm,
+        **extra,
+    )
+
+
+def build_pipeline_from_config(cfg: JsonLike, *, config_path: str = "<memory>") -> InputLLMOutputPipeline:
+    return _build_pipeline(cfg, config_path=config_path, pipeline_cls=InputLLMOutputPipeline)
+
+
+def build_async_pipeline_from_config(
+    cfg: JsonLike,
+    *,
+    config_path: str = "<memory>",
+    executor: Optional[Executor] = None,
+    llm=None,
+    stt=None,
+    session_id: str = "",
+) -> AsyncInputLLMOutputPipeline:
+    """
+    Zelfde config, maar een AsyncInputLLMOutputPipeline (sync backends via executor).
+    llm/stt: gedeelde backends (dialog.multi_session); session_id komt als 'sid' in de log.
+    """
+    return _build_pipeline(
+        cfg,
+        config_path=config_path,
+        pipeline_cls=AsyncInputLLMOutputPipeline,
+        llm=llm,
+        stt=stt,
+        executor=executor,
+        session_id=session_id,
     )
 
 
@@ -0,0 +1,114 @@
+# py3_nao_behavior_manager/dialog/speaking_gate.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Optional, Tuple
+
+import numpy as np
+
+
+class SpeakingGate:
+    """
+    "Robot spreekt"-vlag met tijdstempels, gedeeld door output en mic.
+
+    De output roept begin()/end() rond elke uitspraak aan; de mic vraagt per
+    audio-block is_muted(ts). Een block is gemute als het binnenkwam terwijl de
+    robot sprak, of binnen echo_tail_ms daarna (galm / nalopende speaker-buffer).
+    Zo kan de mic al luisteren tijdens TTS zonder de robot zelf op te nemen.
+
+    Tijden zijn time.monotonic(), net als de timestamps in BlockRingBuffer.
+
+    barge_in(ts): de gebruiker onderbrak de robot op ts. Het spreek-interval eindigt
+    dan op ts zonder echo-staart (de gebruiker praat vanaf daar) en de volgende
+    capture kan via take_barge_in() de audio vanaf ts bewaren i.p.v. weggooien.
+    """
+
+    def __init__(self, echo_tail_ms: int = 300, history: int = 16) -> None:
+        self.echo_tail_s = echo_tail_ms / 1000.0
+        self._lock = threading.Lock()
+        self._since: Optional[float] = None  # begin lopende uitspraak
+        self._intervals: Deque[Tuple[float, float, float]] = deque(maxlen=max(1, int(history)))
+        self._barge_in_at: Optional[float] = None
+
+    @property
+    def speaking(self) -> bool:
+        with self._lock:
+            return self._since is not None
+
+    def begin(self, ts: Optional[float] = None) -> None:
+        with self._lock:
+            if self._since is None:
+                self._since = time.monotonic() if ts is None else ts
+
+    def end(self, ts: Optional[float] = None) -> None:
+        with self._lock:
+            if self._since is None:
+                return
+            self._intervals.append((self._since, time.monotonic() if ts is None else ts, self.echo_tail_s))
+            self._since = None
+
+    def barge_in(self, ts: float) -> None:
+        with self._lock:
+            self._barge_in_at = ts
+            if self._since is not None:
+                self._intervals.append((self._since, ts, 0.0))
+                self._since = None
+
+    def take_barge_in(self) -> Optional[float]:
+        """Tijdstip van de laatste (nog niet opgehaalde) barge-in, of None."""
+        with self._lock:
+            ts, self._barge_in_at = self._barge_in_at, None
+            return ts
+
+    def is_muted(self, ts: float) -> bool:
+        with self._lock:
+            if self._since is not None and ts >= self._since:
+                return True
+            for start, end, tail in reversed(self._intervals):
+                if start <= ts < end + tail:
+                    return True
+        return False
+
+    def muted_now(self) -> bool:
+        """Nu gemute (robot spreekt of echo-staart); capture gebruikt dit als 'hold' voor de timeout."""
+        return self.is_muted(time.monotonic())
+
+    def gated(
+        self, get_with_ts: Callable[[float], Optional[Tuple[float, np.ndarray]]]
+    ) -> Callable[[float], Optional[np.ndarray]]:
+        """
+        get_block voor VAD capture() die gemute blocks overslaat.
+
+        Overgeslagen blocks tellen niet als stilte: een lopende utterance wordt
+        tijdens robotspraak dus niet afgesloten, alleen gepauzeerd.
+        """
+
+        def get_block(timeout: float) -> Optional[np.ndarray]:
+            deadline = time.monotonic() + timeout
+            while True:
+                item = get_with_ts(max(0.0, deadline - time.monotonic()))
+                if item is None:
+                    return None
+                ts, block = item
+                if not self.is_muted(ts):
+                    return block
+                if time.monotonic() >= deadline:
+                    return None
+
+        return get_block
+
+
+def discard_stale(ring: Any, gate: Optional[SpeakingGate], pre_roll_ms: int) -> None:
+    """
+    Vóór een capture op een persistent stream: audio van vóór nu (bijv. terwijl de robot
+    sprak) uit 'ring' (BlockRingBuffer) weggooien, op 'pre_roll_ms' na. Na een barge-in
+    (gate.take_barge_in) bewaren we de audio vanaf het moment dat de gebruiker begon te praten.
+    """
+    keep_from = time.monotonic()
+    if gate is not None:
+        barge_in_at = gate.take_barge_in()
+        if barge_in_at is not None:
+            keep_from = min(keep_from, barge_in_at)
+    ring.discard_before(keep_from - pre_roll_ms / 1000.0)
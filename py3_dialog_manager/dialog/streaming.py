@@ -0,0 +1,103 @@
+# py3_nao_behavior_manager/dialog/streaming.py
+from __future__ import annotations
+
+import queue
+import threading
+from typing import List, Optional
+
+from dialog.interfaces import OutputBackend
+
+_SENTENCE_END = ".!?…"
+
+
+class SentenceChunker:
+    """
+    Knipt een LLM-tokenstroom op in zinnen voor TTS.
+
+    Een zin is klaar bij . ! ? … gevolgd door witruimte, of bij een newline.
+    "3.5" of "bijv.x" splitst dus niet; de laatste zin komt pas vrij bij witruimte
+    of via flush(). Stukken korter dan min_chars worden samengevoegd met de
+    volgende zin (geen losse "Ja." naar de robot).
+    """
+
+    def __init__(self, min_chars: int = 12) -> None:
+        self.min_chars = int(min_chars)
+        self._buf = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buf += delta
+        out: List[str] = []
+
+        start = 0
+        i = 0
+        buf = self._buf
+        while i < len(buf):
+            c = buf[i]
+            end = None
+            if c == "\n":
+                end = i + 1
+            elif c in _SENTENCE_END and i + 1 < len(buf) and buf[i + 1].isspace():
+                end = i + 1
+            if end is not None:
+                candidate = buf[start:end].strip()
+                if len(candidate) >= self.min_chars or (c == "\n" and candidate):
+                    out.append(candidate)
+                    start = end
+            i += 1
+
+        self._buf = buf[start:]
+        return out
+
+    def flush(self) -> Optional[str]:
+        rest = self._buf.strip()
+        self._buf = ""
+        return rest or None
+
+
+class SentenceSpeaker:
+    """
+    Spreekt zinnen uit op een achtergrondthread, in volgorde.
+
+    Zo overlapt het uitspreken van zin N (bijv. blokkerende NAO /tts POST) met het
+    genereren van zin N+1. close() wacht tot alles uitgesproken is en gooit een
+    eventuele fout uit output.emit opnieuw op.
+
+    cancel() (barge-in): nog niet begonnen zinnen vervallen; de zin die op dat moment
+    werd uitgesproken telt niet als 'spoken' (maar deels gezegd).
+    """
+
+    def __init__(self, output: OutputBackend) -> None:
+        self.output = output
+        self.spoken: List[str] = []
+        self._q: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self.cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="SentenceSpeaker", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            sentence = self._q.get()
+            if sentence is None:
+                return
+            if self._error is not None or self.cancelled.is_set():
+                continue
+            try:
+                self.output.emit(sentence)
+                if not self.cancelled.is_set():
+                    self.spoken.append(sentence)
+            except BaseException as e:
+                if not self.cancelled.is_set():  # emit na een TTS-stop mag mislukken
+                    self._error = e
+
+    def say(self, sentence: str) -> None:
+        self._q.put(sentence)
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    def close(self) -> None:
+        self._q.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
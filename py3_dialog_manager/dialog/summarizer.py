@@ -0,0 +1,135 @@
+# py3_nao_behavior_manager/dialog/summarizer.py
+from __future__ import annotations
+
+import sys
+import threading
+from typing import Any, List, Optional
+
+from dialog.interfaces import ChatMessage, History
+
+# Herkenning van het samenvattings-message in de history (wordt elke turn vervangen).
+SUMMARY_PREFIX = "Samenvatting van het eerdere gesprek:\n"
+
+DEFAULT_INSTRUCTION = (
+    "Je vat een gesprek tussen een gebruiker en de robot NAO samen. "
+    "Combineer de bestaande samenvatting met de nieuwe gespreksdelen tot één korte, "
+    "feitelijke samenvatting in het Nederlands: namen, voorkeuren, afspraken en open vragen. "
+    "Geen inleiding, alleen de samenvatting."
+)
+
+
+def _role(msg: Any) -> Optional[str]:
+    if isinstance(msg, dict):
+        return msg.get("role")
+    return getattr(msg, "role", None)
+
+
+def _content(msg: Any) -> str:
+    if isinstance(msg, dict):
+        return msg.get("content") or ""
+    return getattr(msg, "content", "") or ""
+
+
+def is_summary_message(msg: Any) -> bool:
+    return _role(msg) == "system" and _content(msg).startswith(SUMMARY_PREFIX)
+
+
+class RollingSummarizer:
+    """
+    Lopende samenvatting van turns die door trimming uit de prompt vallen.
+
+    submit(evicted) start (na de output) op een achtergrondthread één LLM-call die
+    de bestaande samenvatting en de weggevallen messages samenvoegt. Komen er nieuwe
+    evicted messages binnen terwijl er nog een call loopt, dan gaan die mee in de
+    volgende call. De pipeline leest alleen summary_message(): nooit wachten in de turn;
+    een samenvatting die nog loopt is er gewoon een turn later.
+
+    owns_llm: True als de samenvatter een eigen (apart gebouwd) model heeft; close()
+    sluit dat dan (cache, HTTP-client). Een gedeelde dialoog-LLM sluit de pipeline zelf.
+    """
+
+    def __init__(
+        self,
+        llm,
+        *,
+        max_chars: int = 1200,
+        instruction: str = DEFAULT_INSTRUCTION,
+        owns_llm: bool = False,
+    ) -> None:
+        self.llm = llm
+        self.owns_llm = bool(owns_llm)
+        self.max_chars = int(max_chars)
+        self.instruction = instruction
+
+        self.summary = ""
+        self.runs = 0
+        self._pending: List[Any] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def summary_message(self) -> Optional[ChatMessage]:
+        with self._lock:
+            summary = self.summary
+        if not summary:
+            return None
+        return ChatMessage(role="system", content=SUMMARY_PREFIX + summary)  # type: ignore[arg-type]
+
+    def submit(self, evicted: History) -> None:
+        msgs = [m for m in evicted if _role(m) in ("user", "assistant")]
+        if not msgs:
+            return
+        with self._lock:
+            self._pending.extend(msgs)
+            if self._thread is not None:
+                return  # lopende worker pakt dit mee
+            self._thread = threading.Thread(target=self._run, name="RollingSummarizer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                summary = self.summary
+                if not batch:
+                    self._thread = None
+                    return
+            try:
+                new_summary = self._summarize(summary, batch)
+            except Exception as e:
+                # Best-effort: oude samenvatting blijft staan, deze messages zijn dan weg.
+                print(f"[RollingSummarizer] samenvatten mislukt: {e!r}", file=sys.stderr)
+                continue
+            with self._lock:
+                self.summary = new_summary
+                self.runs += 1
+
+    def _summarize(self, summary: str, batch: List[Any]) -> str:
+        lines = [f"{'Gebruiker' if _role(m) == 'user' else 'NAO'}: {_content(m)}" for m in batch]
+        prompt = (
+            f"Bestaande samenvatting:\n{summary or '(nog geen)'}\n\n"
+            "Nieuwe gespreksdelen:\n" + "\n".join(lines)
+        )
+        res = self.llm.generate(
+            [
+                ChatMessage(role="system", content=self.instruction),  # type: ignore[arg-type]
+                ChatMessage(role="user", content=prompt),  # type: ignore[arg-type]
+            ]
+        )
+        text = (res.reply or "").strip()
+        if len(text) > self.max_chars:
+            text = text[: self.max_chars].rsplit(" ", 1)[0]
+        return text or summary
+
+    def wait(self, timeout_s: Optional[float] = None) -> None:
+        """Wacht tot een lopende samenvatting klaar is (tests / afsluiten)."""
+        with self._lock:
+            t = self._thread
+        if t is not None:
+            t.join(timeout_s)
+
+    def close(self, timeout_s: Optional[float] = 5.0) -> None:
+        """Lopende samenvatting even laten afronden, daarna het eigen model sluiten (owns_llm)."""
+        self.wait(timeout_s)
+        close = getattr(self.llm, "close", None) if self.owns_llm else None
+        if close is not None:
+            close()
@@ -0,0 +1,56 @@
+# py3_nao_behavior_manager/dialog/timing.py
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Tuple
+
+# Stages in volgorde van een turn; waarden zijn time.monotonic() (seconden).
+STAGES: Tuple[str, ...] = (
+    "listen_start",     # mic gaat luisteren
+    "speech_start",     # VAD: spraak begonnen
+    "speech_end",       # VAD: laatste block met spraak
+    "capture_end",      # VAD: utterance gesloten (na stop_silence_ms)
+    "stt_done",         # transcript klaar
+    "input_done",       # input-laag klaar (na evt. confirm/edit)
+    "llm_start",
+    "llm_first_token",  # alleen bij streaming
+    "llm_done",
+    "output_start",     # eerste emit (bij streaming: eerste zin)
+    "output_done",
+)
+
+# (naam, van, tot) voor de rapportage
+DURATIONS: List[Tuple[str, str, str]] = [
+    ("wait_for_speech", "listen_start", "speech_start"),
+    ("speech", "speech_start", "speech_end"),
+    ("vad_tail", "speech_end", "capture_end"),
+    ("stt", "capture_end", "stt_done"),
+    ("user_confirm", "stt_done", "input_done"),
+    ("llm_ttft", "llm_start", "llm_first_token"),
+    ("llm_total", "llm_start", "llm_done"),
+    ("output", "output_start", "output_done"),
+    ("response_latency", "speech_end", "output_start"),
+    ("turn_total", "listen_start", "output_done"),
+]
+
+
+def now() -> float:
+    return time.monotonic()
+
+
+def relative_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    """Monotonic stamps -> ms t.o.v. de vroegste stage (leesbaar/vergelijkbaar in logs)."""
+    if not timings:
+        return {}
+    t0 = min(timings.values())
+    ordered = sorted(timings.items(), key=lambda kv: (STAGES.index(kv[0]) if kv[0] in STAGES else len(STAGES), kv[1]))
+    return {k: round((v - t0) * 1000.0, 1) for k, v in ordered}
+
+
+def durations_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    """Alleen de duren waarvan beide stages gemeten zijn."""
+    out: Dict[str, float] = {}
+    for name, a, b in DURATIONS:
+        if a in timings and b in timings:
+            out[name] = round((timings[b] - timings[a]) * 1000.0, 1)
+    return out
@@ -0,0 +1,34 @@
+# py3_nao_behavior_manager/dialog/token_budget.py
+from __future__ import annotations
+
+import math
+from typing import Any, Iterable
+
+
+def _content(msg: Any) -> str:
+    if isinstance(msg, dict):
+        return msg.get("content") or ""
+    return getattr(msg, "content", "") or ""
+
+
+class TokenEstimator:
+    """
+    Goedkope token-schatting voor prompt-budgetten: ceil(tekens / chars_per_token)
+    plus een vaste overhead per message (role/template-tokens).
+
+    Geen tokenizer van het model (Ollama geeft die niet), maar voor NL/EN ligt
+    ~4 tekens per token dicht genoeg bij. Een telling is len() plus een deling, dus
+    niets om te cachen; zonder state is één instantie veilig te delen over threads.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0, per_message_overhead: int = 4) -> None:
+        if chars_per_token <= 0:
+            raise ValueError("chars_per_token moet > 0 zijn")
+        self.chars_per_token = float(chars_per_token)
+        self.per_message_overhead = int(per_message_overhead)
+
+    def count(self, msg: Any) -> int:
+        return math.ceil(len(_content(msg)) / self.chars_per_token) + self.per_message_overhead
+
+    def total(self, messages: Iterable[Any]) -> int:
+        return sum(self.count(m) for m in messages)
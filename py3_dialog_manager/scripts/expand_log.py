@@ -0,0 +1,38 @@
+# py3_nao_behavior_manager/scripts/expand_log.py
+#!/usr/bin/env python3
+"""
+Zet een (delta-)conversatielog om naar volledige message-lijsten per LLM-call,
+bijv. om turns opnieuw naar een LLM te sturen (replay).
+
+    python -m scripts.expand_log logs/run_....jsonl > full.jsonl
+    python -m scripts.expand_log logs/run_....jsonl --sid <sid> --out full.jsonl
+
+Uitvoer per regel: {"ts", "turn_idx", "sid", "meta", "messages"} (het oude full-formaat).
+"""
+import argparse
+import json
+import sys
+
+from dialog.conversation_log import read_turns
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("log", help="JSONL-log (delta of full)")
+    p.add_argument("--sid", default=None, help="Alleen deze sessie (webapp)")
+    p.add_argument("--out", default=None, help="Uitvoerbestand (default: stdout)")
+    args = p.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for turn in read_turns(args.log):
+            if args.sid is not None and turn["sid"] != args.sid:
+                continue
+            out.write(json.dumps(turn, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# py3_nao_behavior_manager/scripts/latency_report.py
+#!/usr/bin/env python3
+"""
+Percentiel-rapport van per-stage latency uit de JSONL-logs van de pipeline.
+
+    python -m scripts.latency_report logs/run_*.jsonl
+
+Leest de "timings"-records (event == "timings") en print per duur
+(vad_tail, stt, llm_ttft, llm_total, output, response_latency, ...) n/p50/p90/p95/max in ms.
+Daarna per LLM-model (sleutel "llm" in die records): ttft_ms (client, streaming), server_ttft_ms
+(load + prompt_eval), tokens_per_s, tokens_in en tokens_out,
+bijv. om ollama cloud (gpt-oss:120b) met lokaal (llama3.1:8b) te vergelijken.
+"""
+import argparse
+import glob
+from typing import Dict, Iterable, List
+
+from dialog.conversation_log import iter_records
+from dialog.timing import DURATIONS
+
+
+def _percentile(sorted_vals: List[float], p: float) -> float:
+    if len(sorted_vals) == 1:
+        return sorted_vals[0]
+    k = (len(sorted_vals) - 1) * (p / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def collect_durations(records: Iterable[dict]) -> Dict[str, List[float]]:
+    out: Dict[str, List[float]] = {}
+    for rec in records:
+        if rec.get("event") != "timings":
+            continue
+        for name, ms in (rec.get("durations_ms") or {}).items():
+            out.setdefault(name, []).append(float(ms))
+    return out
+
+
+LLM_METRICS = ("ttft_ms", "server_ttft_ms", "tokens_per_s", "tokens_in", "tokens_out")
+
+
+def collect_llm_usage(records: Iterable[dict]) -> Dict[str, Dict[str, List[float]]]:
+    out: Dict[str, Dict[str, List[float]]] = {}
+    for rec in records:
+        if rec.get("event") != "timings" or not rec.get("llm"):
+            continue
+        usage = rec["llm"]
+        per_model = out.setdefault(usage.get("model") or "?", {})
+        for name in LLM_METRICS:
+            if usage.get(name) is not None:
+                per_model.setdefault(name, []).append(float(usage[name]))
+    return out
+
+
+def _print_row(name: str, vals: List[float], fmt: str = ".0f") -> None:
+    vals = sorted(vals)
+    print(
+        f"{name:<18}{len(vals):>6}"
+        f"{_percentile(vals, 50):>10{fmt}}{_percentile(vals, 90):>10{fmt}}"
+        f"{_percentile(vals, 95):>10{fmt}}{vals[-1]:>10{fmt}}"
+    )
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("logs", nargs="+", help="JSONL-logbestanden (globs toegestaan)")
+    args = p.parse_args()
+
+    paths: List[str] = []
+    for pattern in args.logs:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+
+    records = [rec for path in paths for rec in iter_records(path)]
+    durations = collect_durations(records)
+    if not durations:
+        print("Geen timings-records gevonden.")
+        return
+
+    order = [name for name, _a, _b in DURATIONS] + sorted(set(durations) - {n for n, _a, _b in DURATIONS})
+    print(f"{'stage':<18}{'n':>6}{'p50':>10}{'p90':>10}{'p95':>10}{'max':>10}   (ms)")
+    for name in order:
+        vals = durations.get(name, [])
+        if vals:
+            _print_row(name, vals)
+
+    for model, metrics in sorted(collect_llm_usage(records).items()):
+        print(f"\nLLM {model}")
+        print(f"{'metric':<18}{'n':>6}{'p50':>10}{'p90':>10}{'p95':>10}{'max':>10}")
+        for name in LLM_METRICS:
+            if metrics.get(name):
+                _print_row(name, metrics[name], ".1f" if name == "tokens_per_s" else ".0f")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,8 @@ def main() -> None:
             history = turn.llm.messages
     except KeyboardInterrupt:
         print("\n[Stop]")
+    finally:
+        pipeline.close()
 
 
 if __name__ == "__main__":
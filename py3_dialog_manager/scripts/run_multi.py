@@ -0,0 +1,38 @@
+# py3_nao_behavior_manager/scripts/run_multi.py
+#!/usr/bin/env python3
+import argparse
+import asyncio
+
+from dialog.multi_session import MultiSessionRunner
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Meerdere robots (run-configs) vanuit één proces.")
+    p.add_argument(
+        "--config",
+        action="append",
+        required=True,
+        help="Pad naar run-config JSON per robot; herhaal voor elke robot",
+    )
+    p.add_argument(
+        "--max-concurrent-llm",
+        type=int,
+        default=None,
+        help="Maximaal aantal gelijktijdige LLM-calls over alle robots (FIFO; default: aantal robots)",
+    )
+    args = p.parse_args()
+
+    runner = MultiSessionRunner.from_json(args.config, max_concurrent_llm=args.max_concurrent_llm)
+
+    print(f"[RUN] {len(runner.sessions)} robots: {', '.join(s.name for s in runner.sessions)}  (Ctrl+C om te stoppen)")
+    try:
+        asyncio.run(runner.run())
+    except KeyboardInterrupt:
+        print("\n[Stop]")
+    finally:
+        runner.close()
+        print(f"[Stats] {runner.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Gedeelde test-backends voor pipeline-tests (input, LLM, output zonder I/O)."""
+from __future__ import annotations
+
+import time
+
+from dialog.interfaces import LLMResult, UserInput
+
+
+class FixedInput:
+    """Elke turn dezelfde getypte tekst."""
+
+    def __init__(self, text="hoi"):
+        self.text = text
+
+    def get_input(self):
+        return UserInput(raw_text=self.text, text=self.text)
+
+
+class ScriptedInput:
+    """Per turn de volgende tekst uit 'texts'."""
+
+    def __init__(self, texts):
+        self._texts = list(texts)
+
+    def get_input(self):
+        text = self._texts.pop(0)
+        return UserInput(raw_text=text, text=text)
+
+
+class RecordingLLM:
+    """
+    Onthoudt elke verstuurde prompt (sent, kopie per message) en antwoordt met 'reply',
+    evt. na delay_s (blokkerende HTTP-call). numbered=True: antwoord "antwoord {n}" voor de n-de call.
+    """
+
+    def __init__(self, reply="ok", delay_s=0.0, numbered=False):
+        self.reply = reply
+        self.delay_s = delay_s
+        self.numbered = numbered
+        self.sent = []
+
+    def generate(self, messages):
+        self.sent.append([dict(m) for m in messages])
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        reply = f"antwoord {len(self.sent)}" if self.numbered else self.reply
+        return LLMResult(reply=reply, messages=list(messages) + [{"role": "assistant", "content": reply}])
+
+
+class NullOutput:
+    def emit(self, text):
+        pass
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import numpy as np
+
+from dialog.backends.audio_stream import BlockRingBuffer
+
+
+def _b(v):
+    return np.full((4,), v, dtype=np.int16)
+
+
+def test_ring_buffer_drops_oldest_on_overflow():
+    rb = BlockRingBuffer(max_blocks=2)
+    for i in range(4):
+        rb.put(_b(i), ts=float(i))
+
+    assert rb.dropped == 2
+    assert rb.received == 4
+    assert int(rb.get(0.0)[0]) == 2
+    assert int(rb.get(0.0)[0]) == 3
+    assert rb.get(0.0) is None
+
+
+def test_ring_buffer_discards_stale_blocks_by_timestamp():
+    rb = BlockRingBuffer(max_blocks=10)
+    for i in range(5):
+        rb.put(_b(i), ts=10.0 + i)
+
+    assert rb.discard_before(12.5) == 3
+    ts, block = rb.get_with_ts(0.0)
+    assert ts == 13.0
+    assert int(block[0]) == 3
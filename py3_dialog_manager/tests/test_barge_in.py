@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+
+import pytest
+
+from dialog.backends.audio_stream import BlockRingBuffer
+from dialog.backends.mic_nao_ssh import NaoSshMic
+from dialog.backends.vad_segmenter import RmsVadConfig, RmsVadUtteranceCapturer
+from dialog.barge_in import BargeInMonitor
+from dialog.interfaces import LLMResult
+from dialog.pipeline import InputLLMOutputPipeline
+from dialog.pipeline_builder import _make_barge_in
+from dialog.speaking_gate import SpeakingGate
+from tests.fakes import FixedInput
+
+
+class FakeMic:
+    persistent_stream = True
+
+    def __init__(self):
+        self.ring = BlockRingBuffer(max_blocks=100)
+
+    def add_block_listener(self, fn):
+        self.ring.add_listener(fn)
+
+    def remove_block_listener(self, fn):
+        self.ring.remove_listener(fn)
+
+    def user_speaks(self, n_blocks=5):
+        t = time.monotonic()
+        for i in range(n_blocks):
+            self.ring.put(np.full(320, 5000, dtype=np.int16), t + i * 0.02)
+
+
+class InterruptibleNao:
+    """Blokkeert in emit zoals NAO /tts; de gebruiker praat door de tweede zin heen."""
+
+    def __init__(self, mic):
+        self.mic = mic
+        self.started = []
+        self._stopped = threading.Event()
+
+    def emit(self, text):
+        self.started.append(text)
+        if len(self.started) == 2:
+            self.mic.user_speaks()
+            assert self._stopped.wait(2.0)
+
+    def stop(self):
+        self._stopped.set()
+
+
+class LongReplyLLM:
+    reply = "Dit is de eerste zin. Dit is de tweede zin. En dit is de derde zin."
+
+    def generate(self, messages):
+        return LLMResult(reply=self.reply, messages=list(messages) + [{"role": "assistant", "content": self.reply}])
+
+
+def test_barge_in_stops_tts_and_truncates_history():
+    mic = FakeMic()
+    output = InterruptibleNao(mic)
+    gate = SpeakingGate()
+    monitor = BargeInMonitor(mic, output, gate, threshold_rms=1000, min_speech_ms=40, grace_ms=0)
+    pipeline = InputLLMOutputPipeline(
+        FixedInput("vertel"), LongReplyLLM(), output, status_to_console=False, barge_in=monitor
+    )
+
+    turn = pipeline.run_once(history=[])
+    pipeline.close()
+
+    assert turn.interrupted
+    assert output.started == ["Dit is de eerste zin.", "Dit is de tweede zin."]
+    assert turn.llm.reply == "Dit is de eerste zin."
+    assert turn.llm.messages[-1] == {"role": "assistant", "content": "Dit is de eerste zin. …"}
+    assert "barge_in" in turn.timings
+    assert gate.take_barge_in() == turn.timings["barge_in"]
+    assert not gate.speaking
+
+
+def test_quiet_room_does_not_trigger():
+    mic = FakeMic()
+
+    class Output:
+        def emit(self, text):
+            mic.ring.put(np.full(320, 100, dtype=np.int16))
+
+    monitor = BargeInMonitor(mic, Output(), threshold_rms=1000, min_speech_ms=40, grace_ms=0)
+    pipeline = InputLLMOutputPipeline(FixedInput("vertel"), LongReplyLLM(), Output(), status_to_console=False, barge_in=monitor)
+
+    turn = pipeline.run_once(history=[])
+
+    assert not turn.interrupted
+    assert turn.llm.reply == LongReplyLLM.reply
+
+
+def test_uses_the_mic_vad_on_top_of_threshold():
+    mic = FakeMic()
+    # mic-VAD met een hogere drempel dan de (luide) blocks: geen spraak volgens de mic
+    mic.speech_detector = RmsVadUtteranceCapturer(RmsVadConfig(start_threshold_rms=6000)).speech_detector
+    output = InterruptibleNao(mic)
+    monitor = BargeInMonitor(mic, output, threshold_rms=1000, min_speech_ms=40, grace_ms=0)
+    monitor.arm()
+    mic.user_speaks()
+    assert monitor.disarm() is None
+    monitor.close()
+
+    mic.speech_detector = RmsVadUtteranceCapturer(RmsVadConfig(start_threshold_rms=2000)).speech_detector
+    monitor = BargeInMonitor(mic, output, threshold_rms=1000, min_speech_ms=40, grace_ms=0)
+    monitor.arm()
+    mic.user_speaks()
+    assert monitor.disarm() is not None
+    monitor.close()
+
+
+def test_builder_rejects_nao_mic():
+    class AudioInput:
+        mic = NaoSshMic(host="nao.local", persistent_stream=True)
+
+    with pytest.raises(ValueError, match="nao_ssh"):
+        _make_barge_in({"barge_in": True}, AudioInput(), output=None, overlap_listen=False)
+
+
+def test_adaptive_mic_vad_tracks_the_room_not_only_loud_blocks():
+    mic = FakeMic()
+    cfg = RmsVadConfig(start_threshold_rms=500, adaptive_threshold=True)
+    mic.speech_detector = RmsVadUtteranceCapturer(cfg).speech_detector
+    monitor = BargeInMonitor(mic, InterruptibleNao(mic), threshold_rms=1500, min_speech_ms=250, grace_ms=0)
+    monitor.arm()
+
+    t = time.monotonic()
+    for i in range(50):  # stille kamer (1 s)
+        mic.ring.put(np.full(320, 150, dtype=np.int16), t + i * 0.02)
+    for i in range(100):  # gebruiker praat 2 s op ~3000 rms
+        mic.ring.put(np.full(320, 3000, dtype=np.int16), t + 1.0 + i * 0.02)
+
+    assert monitor.disarm() is not None
+    monitor.close()
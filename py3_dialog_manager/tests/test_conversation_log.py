@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+
+from dialog.conversation_log import ConversationLog, compute_delta, apply_delta, read_turns
+from dialog.pipeline import InputLLMOutputPipeline
+from tests.fakes import NullOutput, RecordingLLM, ScriptedInput
+
+
+def test_delta_roundtrip_with_trimming():
+    prev = [{"role": "system", "content": "S"}, {"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]
+    cur = [{"role": "system", "content": "S"}, {"role": "assistant", "content": "b"}, {"role": "user", "content": "c"}]
+    keep, drop, append = compute_delta(prev, cur)
+    assert (keep, drop, append) == (1, 1, [{"role": "user", "content": "c"}])
+    assert apply_delta(prev, keep, drop, append) == cur
+
+
+def test_pipeline_delta_log_replays_exact_messages(tmp_path):
+    log = tmp_path / "run.jsonl"
+    llm = RecordingLLM(numbered=True)
+    pipeline = InputLLMOutputPipeline(
+        ScriptedInput(["een", "twee", "drie", "vier"]),
+        llm,
+        NullOutput(),
+        status_to_console=False,
+        system_prompt="Je bent NAO. " * 50,
+        log_messages_path=str(log),
+        log_meta={"llm_model": "x"},
+        max_history_turns=2,
+    )
+
+    history = []
+    for _ in range(4):
+        history = pipeline.run_once(history=history).llm.messages
+    pipeline.close()
+
+    records = [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    assert records[0]["event"] == "header"
+    assert sum("Je bent NAO" in json.dumps(r) for r in records) == 1  # system prompt 1x
+
+    turns = list(read_turns(str(log)))
+    assert [t["messages"] for t in turns] == llm.sent
+    assert turns[-1]["meta"] == {"llm_model": "x"}
+
+
+def test_read_turns_handles_full_format_and_sessions(tmp_path):
+    path = tmp_path / "run.jsonl"
+    log = ConversationLog(str(path), meta={}, system_prompt="S", fmt="delta")
+    log.log_messages([{"role": "system", "content": "S"}, {"role": "user", "content": "a"}], turn_idx=0, sid="A")
+    log.log_messages([{"role": "system", "content": "S"}, {"role": "user", "content": "b"}], turn_idx=0, sid="B")
+    log.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": "t", "turn_idx": 0, "meta": {}, "messages": [{"role": "user", "content": "oud"}]}) + "\n")
+
+    turns = list(read_turns(str(path)))
+    assert [t["sid"] for t in turns] == ["A", "B", ""]
+    assert turns[1]["messages"] == [{"role": "system", "content": "S"}, {"role": "user", "content": "b"}]
+    assert turns[2]["messages"] == [{"role": "user", "content": "oud"}]
+
+
+def test_rotation_with_gzip_keeps_turns_replayable(tmp_path):
+    path = tmp_path / "run.jsonl"
+    log = ConversationLog(str(path), system_prompt="S", rotate_bytes=200, compress="gzip")
+    msgs = [{"role": "system", "content": "S"}]
+    sent = []
+    for i in range(6):
+        msgs = msgs + [{"role": "user", "content": f"vraag {i} " * 5}]
+        sent.append(list(msgs))
+        log.log_messages(msgs, turn_idx=i)
+    log.close()
+
+    assert log.segments and all(p.endswith(".gz") for p in log.segments)
+    turns = [t for p in log.segments + [str(path)] for t in read_turns(p)]
+    assert [t["messages"] for t in turns] == sent
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    release = threading.Event()
+    log = ConversationLog(str(tmp_path / "run.jsonl"), max_queue=1)
+    orig = log._write
+
+    def slow_write(rec):
+        release.wait(5)
+        orig(rec)
+
+    monkeypatch.setattr(log, "_write", slow_write)
+
+    t0 = time.monotonic()
+    for i in range(5):
+        log.write_event({"event": "x", "i": i})
+    assert time.monotonic() - t0 < 0.5
+    assert log.dropped >= 3
+
+    release.set()
+    log.close()
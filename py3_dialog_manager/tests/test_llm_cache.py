@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+
+from dialog.backends.llm_cache import CachingLLMBackend
+from dialog.interfaces import LLMResult
+from dialog.pipeline_builder import make_llm_from_config
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, messages):
+        self.calls += 1
+        reply = f"antwoord {self.calls}"
+        return LLMResult(reply=reply, messages=list(messages) + [{"role": "assistant", "content": reply}])
+
+
+def _msgs(text="hoi"):
+    return [{"role": "system", "content": "Jij bent NAO."}, {"role": "user", "content": text}]
+
+
+def test_memory_hit_returns_same_reply_without_calling_llm():
+    inner = CountingLLM()
+    llm = CachingLLMBackend(inner, model="llama3.1:8b")
+
+    first = llm.generate(_msgs())
+    second = llm.generate(_msgs())
+    other = llm.generate(_msgs("iets anders"))
+
+    assert inner.calls == 2
+    assert second.reply == first.reply and second.cached and not first.cached
+    assert second.messages[-1] == {"role": "assistant", "content": first.reply}
+    assert other.reply == "antwoord 2"
+    assert llm.stats()["hits"] == 1
+
+
+def test_sqlite_tier_survives_new_instance_and_ttl_expires(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    llm = CachingLLMBackend(CountingLLM(), model="m", path=path)
+    llm.generate(_msgs())
+    llm.close()
+
+    inner = CountingLLM()
+    llm = CachingLLMBackend(inner, model="m", path=path)
+    assert llm.generate(_msgs()).reply == "antwoord 1"
+    assert inner.calls == 0
+    llm.close()
+
+    inner = CountingLLM()
+    llm = CachingLLMBackend(inner, model="m", path=path, ttl_s=0.05)
+    time.sleep(0.1)
+    llm.generate(_msgs())
+    assert inner.calls == 1
+    llm.close()
+
+
+def test_stream_hit_sends_reply_as_one_delta():
+    llm = CachingLLMBackend(CountingLLM(), model="m")
+    llm.generate(_msgs())
+
+    deltas = []
+    res = llm.generate_stream(_msgs(), deltas.append)
+    assert deltas == ["antwoord 1"] and res.cached
+
+
+def test_model_is_part_of_key():
+    inner = CountingLLM()
+    a = CachingLLMBackend(inner, model="a")
+    b = CachingLLMBackend(inner, model="b")
+    a.generate(_msgs())
+    b.generate(_msgs())
+    assert inner.calls == 2
+
+
+def test_builder_wraps_llm_when_cache_configured():
+    llm = make_llm_from_config({"llm": {"type": "echo", "params": {"cache": {"max_entries": 8}}}})
+    assert isinstance(llm, CachingLLMBackend) and llm.max_entries == 8
+
+
+def test_key_follows_resolved_model_and_host(monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL", "gpt-oss:120b")
+    cfg = {"llm": {"type": "ollama_cloud", "params": {"api_key": "x", "cache": True}}}
+    a = make_llm_from_config(cfg)
+    assert (a.model, a.options["host"]) == ("gpt-oss:120b", "https://ollama.com")
+
+    monkeypatch.setenv("OLLAMA_MODEL", "gpt-oss:20b")
+    b = make_llm_from_config(cfg)
+    assert b.model == "gpt-oss:20b"
+
+    hedged = make_llm_from_config(
+        {
+            "llm": {
+                "type": "hedged",
+                "params": {
+                    "cache": True,
+                    "primary": {"type": "ollama_local", "params": {"model": "llama3.1:8b"}},
+                    "secondary": {"type": "ollama_local", "params": {"model": "gemma:2b"}},
+                },
+            }
+        }
+    )
+    assert [x["model"] for x in hedged.options["backends"]] == ["llama3.1:8b", "gemma:2b"]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from dialog.backends.llm_hedged import HedgedLLMBackend
+from dialog.interfaces import LLMResult
+from dialog.pipeline_builder import make_llm_from_config
+
+
+class StreamLLM:
+    def __init__(self, name, *, first_token_s=0.0, fail=False, parts=3):
+        self.name = name
+        self.first_token_s = first_token_s
+        self.fail = fail
+        self.parts = parts
+        self.calls = 0
+        self.aborted = threading.Event()
+
+    def generate_stream(self, messages, on_delta):
+        self.calls += 1
+        time.sleep(self.first_token_s)
+        if self.fail:
+            raise ConnectionError(f"{self.name} onbereikbaar")
+        try:
+            for i in range(self.parts):
+                on_delta(f"{self.name}{i} ")
+                time.sleep(0.02)
+        except BaseException:
+            self.aborted.set()
+            raise
+        reply = " ".join(f"{self.name}{i}" for i in range(self.parts))
+        return LLMResult(reply=reply, messages=list(messages), model=self.name)
+
+
+MSGS = [{"role": "user", "content": "hoi"}]
+
+
+def test_fast_primary_wins_without_hedge():
+    primary, secondary = StreamLLM("p"), StreamLLM("s")
+    llm = HedgedLLMBackend(primary, secondary, hedge_after_s=0.5)
+
+    deltas = []
+    res = llm.generate_stream(MSGS, deltas.append)
+
+    assert res.model == "p" and deltas == ["p0 ", "p1 ", "p2 "]
+    assert secondary.calls == 0 and llm.stats()["hedges"] == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary, secondary = StreamLLM("p", first_token_s=0.3), StreamLLM("s")
+    llm = HedgedLLMBackend(primary, secondary, hedge_after_s=0.05)
+
+    deltas = []
+    res = llm.generate_stream(MSGS, deltas.append)
+
+    assert res.model == "s" and all(d.startswith("s") for d in deltas)
+    assert llm.stats() == {"hedges": 1, "failovers": 0, "secondary_wins": 1}
+    assert primary.aborted.wait(1.0)  # verliezer afgebroken bij zijn eerste chunk
+
+
+def test_primary_error_fails_over_immediately():
+    primary, secondary = StreamLLM("p", fail=True), StreamLLM("s")
+    llm = HedgedLLMBackend(primary, secondary, hedge_after_s=5.0)
+
+    t0 = time.monotonic()
+    res = llm.generate(MSGS)
+
+    assert res.model == "s" and time.monotonic() - t0 < 1.0
+    assert llm.stats()["failovers"] == 1
+
+
+def test_both_failing_raises_primary_error():
+    llm = HedgedLLMBackend(StreamLLM("p", fail=True), StreamLLM("s", fail=True), hedge_after_s=0.0)
+    with pytest.raises(ConnectionError, match="p onbereikbaar"):
+        llm.generate(MSGS)
+
+
+def test_caller_abort_cancels_winner():
+    primary = StreamLLM("p", parts=20)
+    llm = HedgedLLMBackend(primary, StreamLLM("s"), hedge_after_s=1.0)
+
+    def on_delta(_d):
+        raise KeyboardInterrupt  # bijv. barge-in
+
+    with pytest.raises(KeyboardInterrupt):
+        llm.generate_stream(MSGS, on_delta)
+    assert primary.aborted.wait(1.0)
+
+
+def test_builder_hedged_type():
+    llm = make_llm_from_config(
+        {
+            "llm": {
+                "type": "hedged",
+                "params": {"primary": {"type": "echo"}, "secondary": {"type": "none"}, "hedge_after_s": 1.5},
+            }
+        }
+    )
+    assert isinstance(llm, HedgedLLMBackend) and llm.hedge_after_s == 1.5
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+
+from dialog.backends.llm_ollama import OllamaLLMBackend
+from dialog.pipeline import InputLLMOutputPipeline
+from scripts.latency_report import collect_llm_usage
+from tests.fakes import FixedInput, NullOutput
+
+_DONE = {
+    "model": "llama3.1:8b",
+    "done": True,
+    "prompt_eval_count": 120,
+    "eval_count": 40,
+    "prompt_eval_duration": 300_000_000,  # ns
+    "eval_duration": 2_000_000_000,
+    "load_duration": 50_000_000,
+}
+
+
+class FakeClient:
+    def chat(self, messages):
+        return {**_DONE, "message": {"role": "assistant", "content": "Hallo daar."}}
+
+    def chat_stream(self, messages):
+        yield {"message": {"content": "Hallo "}}
+        yield {"message": {"content": "daar."}}
+        yield {**_DONE, "message": {"content": ""}}
+
+
+def test_generate_parses_counts_and_durations():
+    res = OllamaLLMBackend(FakeClient()).generate([{"role": "user", "content": "hoi"}])
+
+    assert (res.tokens_in, res.tokens_out) == (120, 40)
+    assert (res.prompt_eval_ms, res.eval_ms, res.load_ms) == (300.0, 2000.0, 50.0)
+    assert res.tokens_per_s == 20.0
+    assert res.ttft_ms is None  # niet gestreamd: geen client-meting
+    assert res.server_ttft_ms == 350.0  # load + prompt_eval
+    assert res.model == "llama3.1:8b"
+
+
+def test_generate_stream_measures_ttft_and_reads_last_chunk():
+    deltas = []
+    res = OllamaLLMBackend(FakeClient()).generate_stream([{"role": "user", "content": "hoi"}], deltas.append)
+
+    assert res.reply == "Hallo daar."
+    assert res.tokens_out == 40
+    assert res.ttft_ms is not None and res.ttft_ms < 350.0  # gemeten in de client
+    assert res.server_ttft_ms == 350.0
+
+
+def test_usage_is_logged_per_turn_and_summarized_at_close(tmp_path):
+    log = tmp_path / "run.jsonl"
+    pipeline = InputLLMOutputPipeline(
+        FixedInput(), OllamaLLMBackend(FakeClient()), NullOutput(), status_to_console=False, log_messages_path=str(log)
+    )
+    history = []
+    for _ in range(2):
+        history = pipeline.run_once(history=history).llm.messages
+    pipeline.close()
+
+    records = [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    timing_recs = [r for r in records if r.get("event") == "timings"]
+    assert [r["llm"]["tokens_out"] for r in timing_recs] == [40, 40]
+
+    summary = [r for r in records if r.get("event") == "llm_summary"]
+    assert summary[0]["per_model"]["llama3.1:8b"] == {
+        "calls": 2,
+        "tokens_in": 240,
+        "tokens_out": 80,
+        "tokens_per_s": 20.0,
+        "prompt_tokens_per_s": 400.0,
+        "ttft_ms_p50": None,
+        "server_ttft_ms_p50": 350.0,
+    }
+
+    usage = collect_llm_usage(records)
+    assert usage["llama3.1:8b"]["tokens_per_s"] == [20.0, 20.0]
+
+
+def test_shared_usage_is_summarized_once_by_owning_pipeline(tmp_path):
+    # webapp: base-pipeline bezit de log; per request een nieuwe pipeline die log en usage deelt
+    log = tmp_path / "web.jsonl"
+    llm = OllamaLLMBackend(FakeClient())
+    base = InputLLMOutputPipeline(FixedInput(), llm, NullOutput(), status_to_console=False, log_messages_path=str(log))
+    for sid in ("a", "b", "a"):
+        per_request = InputLLMOutputPipeline(
+            FixedInput(),
+            llm,
+            NullOutput(),
+            status_to_console=False,
+            conversation_log=base.conversation_log,
+            llm_usage=base.llm_usage,
+            session_id=sid,
+        )
+        per_request.run_once(history=[])
+        per_request.close()  # deelt de log: schrijft geen eigen summary
+    base.close()
+
+    records = [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    summary = [r for r in records if r.get("event") == "llm_summary"]
+    assert len(summary) == 1
+    assert summary[0]["per_model"]["llama3.1:8b"]["calls"] == 3
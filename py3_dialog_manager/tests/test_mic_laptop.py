@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+
+from dialog.backends.input_audio import AudioInputBackend
+from dialog.backends.mic_laptop import LaptopMic
+from dialog.pipeline import InputLLMOutputPipeline
+from tests.fakes import NullOutput, RecordingLLM
+
+
+class FakeStream:
+    def __init__(self):
+        self.started = False
+        self.stopped = False
+        self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+    def close(self):
+        self.closed = True
+
+
+def test_block_listener_requires_persistent_stream():
+    mic = LaptopMic()
+    with pytest.raises(RuntimeError):
+        mic.add_block_listener(lambda ts, block: None)
+
+
+def test_pipeline_close_stops_persistent_stream(monkeypatch):
+    stream = FakeStream()
+    monkeypatch.setattr(LaptopMic, "_open_stream", lambda self: stream)
+    mic = LaptopMic(persistent_stream=True)
+    pipeline = InputLLMOutputPipeline(
+        AudioInputBackend(mic, stt=None, status_to_console=False), RecordingLLM(), NullOutput(), status_to_console=False
+    )
+    mic.add_block_listener(lambda ts, block: None)
+    assert stream.started
+
+    pipeline.close()
+
+    assert stream.stopped and stream.closed
+    assert mic._stream is None
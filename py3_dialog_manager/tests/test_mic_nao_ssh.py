@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from dialog.backends.input_audio import AudioInputBackend
+from dialog.backends.mic_nao_ssh import NaoSshMic
+from dialog.pipeline import InputLLMOutputPipeline
+from tests.fakes import NullOutput, RecordingLLM
+
+
+class FakeChannel:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+        self.closed = False
+
+    def settimeout(self, _t):
+        pass
+
+    def recv(self, _n):
+        if self._chunks:
+            return self._chunks.pop(0)
+        # EOF: arecord/verbinding weg
+        return b""
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, channel):
+        self._channel = channel
+
+    def exec_command(self, _cmd):
+        stdout = type("Stdout", (), {"channel": self._channel})()
+        return None, stdout, None
+
+    def close(self):
+        pass
+
+
+def _pcm(level, n_blocks, block_n=320):
+    return np.full((n_blocks * block_n,), level, dtype=np.int16).tobytes()
+
+
+def test_persistent_stream_reconnects_and_feeds_vad(monkeypatch):
+    connects = []
+
+    def fake_connect(self):
+        connects.append(time.monotonic())
+        if len(connects) == 1:
+            # eerste verbinding valt meteen weg
+            return FakeClient(FakeChannel([]))
+        speech = _pcm(2000, 5) + _pcm(0, 60)
+        return FakeClient(FakeChannel([speech]))
+
+    monkeypatch.setattr(NaoSshMic, "_connect", fake_connect)
+
+    mic = NaoSshMic(
+        host="nao.local",
+        persistent_stream=True,
+        reconnect_delay_s=0.01,
+        stop_silence_ms=100,
+        pre_roll_ms=0,
+    )
+    try:
+        audio = mic.capture_utterance(timeout_s=5.0)
+    finally:
+        mic.close()
+
+    assert len(connects) >= 2
+    assert audio.sample_rate == 16000
+    assert audio.samples is not None and audio.samples.size > 0
+    assert audio.wav_bytes()[:4] == b"RIFF"
+
+
+class EndlessChannel(FakeChannel):
+    def recv(self, n):
+        time.sleep(0.005)
+        return b"\x00" * n
+
+
+def test_pipeline_close_stops_persistent_stream(monkeypatch):
+    monkeypatch.setattr(NaoSshMic, "_connect", lambda self: FakeClient(EndlessChannel([])))
+    mic = NaoSshMic(host="nao.local", persistent_stream=True)
+    pipeline = InputLLMOutputPipeline(
+        AudioInputBackend(mic, stt=None, status_to_console=False), RecordingLLM(), NullOutput(), status_to_console=False
+    )
+    mic._start_stream()
+    reader = mic._reader
+    assert reader is not None and reader.is_alive()
+
+    pipeline.close()
+
+    assert not reader.is_alive()
+    assert mic._reader is None
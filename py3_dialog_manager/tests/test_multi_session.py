@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from dialog.multi_session import FairLimiter, MultiSessionRunner, RobotSession, limit_llm
+from dialog.pipeline_async import AsyncInputLLMOutputPipeline
+from tests.fakes import FixedInput, NullOutput, RecordingLLM
+
+
+def _cfg(name, **llm_params):
+    return {
+        "input": {"type": "console"},
+        "llm": {"type": "echo", "params": {"system_prompt": f"Jij bent {name}.", **llm_params}},
+        "output": {"type": "none"},
+        "run": {"log_messages": False, "status_to_console": False, "session_name": name},
+    }
+
+
+def test_turns_alternate_fairly_over_shared_llm():
+    llm = RecordingLLM(delay_s=0.05)
+    limited = limit_llm(llm, FairLimiter(1))
+
+    async def main():
+        sessions = []
+        for name in ("nao1", "nao2"):
+            p = AsyncInputLLMOutputPipeline(FixedInput(name), limited, NullOutput(), status_to_console=False)
+            sessions.append(RobotSession(name=name, pipeline=p))
+        runner = MultiSessionRunner(sessions)
+        await runner.run(max_turns=3)
+        return runner
+
+    runner = asyncio.run(main())
+
+    assert [sent[-1]["content"] for sent in llm.sent] == ["nao1", "nao2"] * 3
+    assert runner.stats()["sessions"] == {"nao1": {"turns": 3, "errors": 0}, "nao2": {"turns": 3, "errors": 0}}
+    # history blijft per robot gescheiden
+    assert all(m["content"] != "nao2" for m in runner.sessions[0].history)
+
+
+def test_from_configs_shares_llm_backend_but_keeps_prompts():
+    runner = MultiSessionRunner.from_configs([("a.json", _cfg("nao1")), ("b.json", _cfg("nao2"))])
+    try:
+        a, b = (s.pipeline for s in runner.sessions)
+        assert a.llm.backend is b.llm.backend
+        assert a.llm.backend.limiter.limit == 2  # default: een plek per robot
+        assert a.system_prompt == "Jij bent nao1."
+        assert b.system_prompt == "Jij bent nao2."
+        assert a.session_id == "nao1"
+    finally:
+        runner.close()
+
+
+def test_duplicate_session_names_rejected():
+    with pytest.raises(ValueError):
+        MultiSessionRunner.from_configs([("a.json", _cfg("nao")), ("b.json", _cfg("nao"))])
+
+
+def test_summarizer_shares_the_llm_limiter():
+    cfg = _cfg("nao1", context={"max_history_turns": 2, "summarize": True})
+    runner = MultiSessionRunner.from_configs([("a.json", cfg)], max_concurrent_llm=1)
+    try:
+        pipeline = runner.sessions[0].pipeline
+        assert pipeline.summarizer.llm is pipeline.llm.backend
+        assert pipeline.summarizer.llm.limiter.limit == 1
+    finally:
+        runner.close()
+
+
+def test_limiter_is_fifo_and_bounded():
+    limiter = FairLimiter(1)
+    order, active = [], []
+
+    def worker(i):
+        with limiter:
+            active.append(i)
+            assert len(active) == 1
+            order.append(i)
+            time.sleep(0.02)
+            active.remove(i)
+
+    threads = []
+    with limiter:  # houd de plek bezet tot iedereen in de rij staat
+        for i in range(4):
+            threads.append(threading.Thread(target=worker, args=(i,)))
+            threads[-1].start()
+            time.sleep(0.02)
+    for t in threads:
+        t.join()
+    assert order == [0, 1, 2, 3]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from dialog.backends.llm_ollama import KeepWarmPinger, OllamaClient
+from dialog.pipeline_builder import (
+    build_async_pipeline_from_config,
+    build_pipeline_from_config,
+    make_llm_from_config,
+)
+
+
+class RecordingHttp:
+    def __init__(self):
+        self.calls = []
+
+    def chat(self, model, **kwargs):
+        self.calls.append(("chat", model, kwargs))
+        return {"message": {"content": "ok"}}
+
+    def generate(self, model, **kwargs):
+        self.calls.append(("generate", model, kwargs))
+        return {"done": True}
+
+
+def _client(**kwargs):
+    client = OllamaClient(model="llama3.1:8b", host="http://localhost:11434", **kwargs)
+    client._client = RecordingHttp()
+    return client
+
+
+def test_keep_alive_is_sent_with_chat_and_warm_up():
+    client = _client(keep_alive="30m")
+    client.chat([{"role": "user", "content": "hoi"}])
+    client.warm_up()
+
+    (kind1, _, kw1), (kind2, _, kw2) = client._client.calls
+    assert (kind1, kw1["keep_alive"]) == ("chat", "30m")
+    assert (kind2, kw2["prompt"], kw2["keep_alive"]) == ("generate", "", "30m")
+
+
+def test_pinger_pings_while_idle_and_stops_after_idle_stop():
+    client = _client()
+    pinger = KeepWarmPinger(client, 0.05, idle_stop_s=0.4)
+    try:
+        time.sleep(0.3)
+        assert pinger.pings >= 2
+        time.sleep(0.4)
+        stopped_at = pinger.pings
+        time.sleep(0.2)
+        assert pinger.pings == stopped_at  # sessie voorbij: geen pings meer
+    finally:
+        pinger.close()
+
+
+def test_keep_warm_only_for_local():
+    cfg = {"llm": {"type": "ollama_cloud", "params": {"api_key": "x", "keep_warm_s": 60}}}
+    with pytest.raises(ValueError):
+        make_llm_from_config(cfg)
+
+
+def test_pipeline_stops_pinger_of_its_own_llm_only():
+    cfg = {
+        "input": {"type": "console"},
+        "llm": {"type": "ollama_local", "params": {"model": "llama3.1:8b", "keep_warm_s": 60}},
+        "output": {"type": "none"},
+        "run": {"log_messages": False, "status_to_console": False},
+    }
+    pipeline = build_pipeline_from_config(cfg)
+    pinger = pipeline.llm.keep_warm
+    pipeline.close()
+    assert not pinger._thread.is_alive()
+
+    shared = make_llm_from_config(cfg)
+    try:
+        build_async_pipeline_from_config(cfg, llm=shared).close()
+        assert shared.keep_warm._thread.is_alive()  # gedeelde LLM: de eigenaar sluit hem
+    finally:
+        shared.close()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+from ollama import ResponseError
+
+from dialog.backends import llm_ollama
+from dialog.backends.llm_ollama import OllamaClient
+
+
+class FlakyHttp:
+    """Faalt de eerste 'failures' calls met 'error', daarna ok."""
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def chat(self, model, messages, stream, **kwargs):
+        self.calls += 1
+        fail = self.calls <= self.failures
+
+        if not stream:
+            if fail:
+                raise self.error
+            return {"message": {"content": "ok"}}
+
+        def gen():
+            if fail:
+                raise self.error
+            yield {"message": {"content": "o"}}
+            yield {"message": {"content": "k"}, "done": True}
+
+        return gen()
+
+
+def _client(http, **kwargs):
+    client = OllamaClient(model="m", host="http://localhost:11434", retry_backoff_s=0.0, **kwargs)
+    client._client = http
+    return client
+
+
+def test_transport_settings_reach_httpx(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(llm_ollama, "OllamaHttpClient", lambda **kwargs: seen.update(kwargs))
+    OllamaClient(
+        model="m",
+        host="http://localhost:11434",
+        connect_timeout_s=3.0,
+        read_timeout_s=30.0,
+        max_connections=4,
+        max_keepalive=2,
+        keepalive_expiry_s=15.0,
+    )
+    assert seen["timeout"] == httpx.Timeout(30.0, connect=3.0)
+    assert seen["limits"] == httpx.Limits(max_connections=4, max_keepalive_connections=2, keepalive_expiry=15.0)
+    assert seen["http2"] is False
+
+
+def test_connection_errors_are_retried_then_succeed():
+    http = FlakyHttp(2, ConnectionError("weg"))
+    client = _client(http, retries=2)
+    assert client.chat([])["message"]["content"] == "ok"
+    assert (http.calls, client.retried) == (3, 2)
+
+
+@pytest.mark.parametrize("error", [httpx.PoolTimeout("pool vol"), httpx.RemoteProtocolError("verbinding dicht")])
+def test_errors_before_a_response_are_retried(error):
+    http = FlakyHttp(1, error)
+    assert _client(http, retries=1).chat([])["message"]["content"] == "ok"
+    assert http.calls == 2
+
+
+def test_retries_are_bounded_and_skip_client_errors():
+    http = FlakyHttp(5, ConnectionError("weg"))
+    with pytest.raises(ConnectionError):
+        _client(http, retries=1).chat([])
+    assert http.calls == 2
+
+    # server is al bezig: een read-timeout nogmaals proberen verdubbelt alleen de wachttijd
+    http = FlakyHttp(5, httpx.ReadTimeout("traag"))
+    with pytest.raises(httpx.ReadTimeout):
+        _client(http, retries=3).chat([])
+    assert http.calls == 1
+
+    http = FlakyHttp(1, ResponseError("fout model", 400))
+    with pytest.raises(ResponseError):
+        _client(http, retries=3).chat([])
+    assert http.calls == 1
+
+
+def test_stream_is_retried_before_first_chunk():
+    http = FlakyHttp(1, ResponseError("rate limit", 429))
+    client = _client(http, retries=1)
+    chunks = list(client.chat_stream([]))
+    assert [c["message"]["content"] for c in chunks] == ["o", "k"]
+    assert http.calls == 2
+
+
+def test_http2_falls_back_without_h2(monkeypatch, capsys):
+    monkeypatch.setattr(llm_ollama, "_http2_available", lambda: False)
+    client = OllamaClient(model="m", host="http://localhost:11434", http2=True)
+    assert client.http2 is False
+    assert "h2" in capsys.readouterr().err
+
+
+def test_builder_passes_http_options():
+    from dialog.pipeline_builder import make_llm_from_config
+
+    llm = make_llm_from_config(
+        {"llm": {"type": "ollama_local", "params": {"http": {"retries": 4, "read_timeout_s": None}}}}
+    )
+    assert llm.client.retries == 4
+    assert llm.client._client._client.timeout.read is None
+
+    with pytest.raises(ValueError):
+        make_llm_from_config({"llm": {"type": "ollama_local", "params": {"http": {"retry": 1}}}})
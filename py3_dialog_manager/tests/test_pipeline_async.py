@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from dialog.interfaces import LLMResult
+from dialog.pipeline_async import AsyncInputLLMOutputPipeline
+from tests.fakes import FixedInput
+
+
+class SlowLLM:
+    def generate(self, messages):
+        time.sleep(0.3)  # blokkerende HTTP-call
+        reply = messages[-1]["content"].upper()
+        return LLMResult(reply=reply, messages=list(messages) + [{"role": "assistant", "content": reply}])
+
+
+class StreamingLLM:
+    def generate_stream(self, messages, on_delta):
+        reply = "Eerste zin is klaar. Tweede zin ook klaar."
+        for part in ("Eerste zin ", "is klaar. Twee", "de zin ook klaar."):
+            on_delta(part)
+        return LLMResult(reply=reply, messages=list(messages) + [{"role": "assistant", "content": reply}])
+
+    def generate(self, messages):  # pragma: no cover
+        raise AssertionError("streaming verwacht")
+
+
+class AsyncOutput:
+    def __init__(self):
+        self.said = []
+
+    async def emit(self, text):
+        await asyncio.sleep(0)
+        self.said.append(text)
+
+
+def test_sync_backends_overlap_across_pipelines():
+    outputs = [AsyncOutput(), AsyncOutput()]
+    pipelines = [
+        AsyncInputLLMOutputPipeline(FixedInput(f"robot {i}"), SlowLLM(), outputs[i], status_to_console=False)
+        for i in range(2)
+    ]
+
+    async def main():
+        return await asyncio.gather(*(p.run_once(history=[]) for p in pipelines))
+
+    t0 = time.monotonic()
+    turns = asyncio.run(main())
+    elapsed = time.monotonic() - t0
+
+    assert [t.llm.reply for t in turns] == ["ROBOT 0", "ROBOT 1"]
+    assert [o.said for o in outputs] == [["ROBOT 0"], ["ROBOT 1"]]
+    assert elapsed < 0.55  # twee LLM-calls van 0.3 s liepen tegelijk
+    assert "output_done" in turns[0].timings
+
+
+def test_streaming_emits_sentences_in_order():
+    out = AsyncOutput()
+    pipeline = AsyncInputLLMOutputPipeline(
+        FixedInput("hoi"), StreamingLLM(), out, status_to_console=False, stream_output=True
+    )
+
+    turn = asyncio.run(pipeline.run_once(history=[]))
+
+    assert out.said == ["Eerste zin is klaar.", "Tweede zin ook klaar."]
+    assert "llm_first_token" in turn.timings
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+
+from dialog.backends.audio_stream import BlockRingBuffer
+from dialog.backends.output_background import BackgroundOutputBackend
+from dialog.speaking_gate import SpeakingGate, discard_stale
+
+
+def test_gate_mutes_speaking_interval_plus_echo_tail():
+    gate = SpeakingGate(echo_tail_ms=300)
+    gate.begin(ts=10.0)
+    assert gate.speaking
+    assert gate.is_muted(10.5)
+    gate.end(ts=11.0)
+
+    assert not gate.is_muted(9.9)
+    assert gate.is_muted(11.2)
+    assert not gate.is_muted(11.4)
+
+
+def test_gated_get_block_skips_robot_audio():
+    gate = SpeakingGate(echo_tail_ms=0)
+    gate.begin(ts=1.0)
+    gate.end(ts=2.0)
+
+    ring = BlockRingBuffer(max_blocks=10)
+    ring.put(np.full(4, 1, dtype=np.int16), ts=0.5)
+    ring.put(np.full(4, 2, dtype=np.int16), ts=1.5)  # robot
+    ring.put(np.full(4, 3, dtype=np.int16), ts=2.5)
+
+    get_block = gate.gated(ring.get_with_ts)
+    assert get_block(0.1)[0] == 1
+    assert get_block(0.1)[0] == 3
+    assert get_block(0.01) is None
+
+
+def test_discard_stale_keeps_pre_roll_or_audio_since_barge_in():
+    now = time.monotonic()
+    ring = BlockRingBuffer(max_blocks=10)
+    for i, age in enumerate((3.0, 1.0, 0.1)):
+        ring.put(np.full(4, i, dtype=np.int16), ts=now - age)
+    discard_stale(ring, None, pre_roll_ms=200)
+    assert ring.get(0.01)[0] == 2 and len(ring) == 0
+
+    gate = SpeakingGate()
+    gate.barge_in(now - 1.1)
+    for i, age in enumerate((3.0, 1.0, 0.1)):
+        ring.put(np.full(4, i, dtype=np.int16), ts=now - age)
+    discard_stale(ring, gate, pre_roll_ms=0)
+    assert [ring.get(0.01)[0] for _ in range(2)] == [1, 2]
+    assert gate.take_barge_in() is None  # opgehaald
+
+
+def test_background_output_returns_immediately_and_sets_gate():
+    release = threading.Event()
+    seen = []
+
+    class BlockingOutput:
+        def emit(self, text):
+            seen.append((text, gate.speaking))
+            release.wait(5)
+
+    gate = SpeakingGate()
+    out = BackgroundOutputBackend(BlockingOutput(), gate)
+
+    out.emit("hallo")  # mag niet blokkeren
+    release.set()
+    out.wait_idle()
+    out.close()
+
+    assert seen == [("hallo", True)]
+    assert not gate.speaking
+
+
+def test_start_timeout_waits_for_robot_to_finish_speaking():
+    import time
+
+    from dialog.backends.vad_segmenter import RmsVadConfig, RmsVadUtteranceCapturer
+
+    gate = SpeakingGate(echo_tail_ms=50)
+    gate.begin()
+    cap = RmsVadUtteranceCapturer(RmsVadConfig(stop_silence_ms=40, pre_roll_ms=0))
+    reply_s = 0.4  # robot praat langer dan de start-timeout
+
+    def get_with_ts(_timeout):
+        time.sleep(0.02)
+        now = time.monotonic()
+        if gate.speaking and now - t0 >= reply_s:
+            gate.end()
+        # na de reply + echo-staart begint de gebruiker te praten
+        level = 2000 if reply_s + 0.15 <= now - t0 < reply_s + 0.35 else 0
+        return now, np.full(320, level, dtype=np.int16)
+
+    t0 = time.monotonic()
+    audio = cap.capture(gate.gated(get_with_ts), timeout_s=0.2, hold=gate.muted_now)
+    assert audio.size > 0
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+
+from dialog.interfaces import LLMResult
+from dialog.pipeline import InputLLMOutputPipeline
+from dialog.streaming import SentenceChunker
+from dialog.backends.input_fixed_text import FixedTextInputBackend
+
+
+def test_chunker_splits_on_sentence_end_followed_by_space():
+    ch = SentenceChunker(min_chars=5)
+    out = []
+    for delta in ["Hallo daar", ". Het is 3.5 gra", "den! Kort", "? Ja"]:
+        out += ch.feed(delta)
+
+    assert out == ["Hallo daar.", "Het is 3.5 graden!", "Kort?"]
+    assert ch.flush() == "Ja"
+
+
+def test_chunker_merges_fragments_shorter_than_min_chars():
+    ch = SentenceChunker(min_chars=12)
+    assert ch.feed("Ja. Dat klopt helemaal. ") == ["Ja. Dat klopt helemaal."]
+
+
+class RecordingOutput:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.first_spoken = threading.Event()
+
+    def emit(self, text: str) -> None:
+        self.calls.append(text)
+        self.first_spoken.set()
+
+
+class StreamingLLM:
+    """Genereert zin 2 pas nadat zin 1 al uitgesproken is: kan alleen bij overlap."""
+
+    def __init__(self, output: RecordingOutput) -> None:
+        self.output = output
+        self.overlapped = False
+
+    def generate(self, messages):  # pragma: no cover
+        raise AssertionError("stream_output moet generate_stream gebruiken")
+
+    def generate_stream(self, messages, on_delta):
+        on_delta("Eerste zin is klaar. ")
+        self.overlapped = self.output.first_spoken.wait(5.0)
+        on_delta("Tweede zin volgt")
+        reply = "Eerste zin is klaar. Tweede zin volgt"
+        return LLMResult(reply=reply, messages=list(messages) + [{"role": "assistant", "content": reply}])
+
+
+def test_pipeline_stream_output_speaks_sentences_while_generating():
+    out = RecordingOutput()
+    llm = StreamingLLM(out)
+    pipeline = InputLLMOutputPipeline(
+        FixedTextInputBackend("hoi"),
+        llm,
+        out,
+        status_to_console=False,
+        stream_output=True,
+    )
+
+    turn = pipeline.run_once(history=[])
+
+    assert llm.overlapped is True
+    assert out.calls == ["Eerste zin is klaar.", "Tweede zin volgt"]
+    assert turn.llm.reply == "Eerste zin is klaar. Tweede zin volgt"
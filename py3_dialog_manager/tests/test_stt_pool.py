@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from dialog.interfaces import STTResult, UtteranceAudio
+from dialog.backends.stt_pool import STTPoolBusy, STTPoolTimeout, STTWorkerPool
+
+
+class BlockingSTT:
+    def __init__(self) -> None:
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def transcribe(self, audio):
+        self.started.set()
+        self.release.wait(5.0)
+        return STTResult(text="hallo")
+
+
+def _audio():
+    return UtteranceAudio(pcm=b"", sample_rate=16000)
+
+
+def test_pool_rejects_when_queue_is_full_and_reports_stats():
+    stt = BlockingSTT()
+    pool = STTWorkerPool([stt], max_queue=1)
+    try:
+        running = pool.submit(_audio())
+        assert stt.started.wait(5.0)
+        queued = pool.submit(_audio())
+
+        with pytest.raises(STTPoolBusy):
+            pool.submit(_audio())
+
+        stats = pool.stats()
+        assert stats["queue_depth"] == 1
+        assert stats["in_flight"] == 1
+        assert stats["rejected"] == 1
+
+        stt.release.set()
+        assert running.result(5.0).text == "hallo"
+        assert queued.result(5.0).text == "hallo"
+        assert pool.stats()["completed"] == 2
+    finally:
+        stt.release.set()
+        pool.close()
+
+
+def test_timeout_cancels_queued_job_and_counts_as_busy():
+    stt = BlockingSTT()
+    pool = STTWorkerPool([stt], max_queue=2, timeout_s=0.1)
+    try:
+        running = pool.submit(_audio())
+        assert stt.started.wait(5.0)
+
+        with pytest.raises(STTPoolBusy) as exc:
+            pool.transcribe(_audio())
+        assert isinstance(exc.value, STTPoolTimeout)
+        assert pool.stats()["timed_out"] == 1
+
+        stt.release.set()
+        assert running.result(5.0).text == "hallo"
+        assert pool.stats()["completed"] == 1  # geannuleerde job is niet meer uitgevoerd
+    finally:
+        stt.release.set()
+        pool.close()
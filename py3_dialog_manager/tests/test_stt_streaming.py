@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import numpy as np
+
+from dialog.backends.stt_streaming import IncrementalTranscriber
+
+SR = 16000
+WORD_N = SR // 2  # elk "woord" = 0.5 s audio met als waarde het woordnummer
+
+
+class WordPerHalfSecondSTT:
+    """Herkent een woord per volledig gevuld halve-seconde-stuk; legt vensterlengtes vast."""
+
+    language = "nl"
+
+    def __init__(self) -> None:
+        self.window_sizes: list[int] = []
+
+    def transcribe_words(self, samples, *, initial_prompt=None):
+        self.window_sizes.append(int(samples.size))
+        words = []
+        for i in range(samples.size // WORD_N):
+            value = int(samples[i * WORD_N])
+            if value:
+                words.append((i * 0.5, i * 0.5 + 0.5, f" w{value}"))
+        return words
+
+
+def _utterance(n_words, silence_words=2):
+    parts = [np.full((WORD_N,), k + 1, dtype=np.int16) for k in range(n_words)]
+    parts += [np.zeros((WORD_N,), dtype=np.int16)] * silence_words
+    return np.concatenate(parts)
+
+
+def test_incremental_commits_agreed_prefix_and_finish_only_does_tail():
+    stt = WordPerHalfSecondSTT()
+    inc = IncrementalTranscriber(stt, sample_rate=SR, min_window_ms=1000)
+    full = _utterance(6)
+
+    # groeiende utterance, zonder achtergrondthread (deterministisch)
+    for n_words in (2, 3, 4, 5, 6):
+        inc.on_progress(full[: n_words * WORD_N])
+        inc._step()
+
+    assert inc.committed_text.startswith("w1 w2 w3")
+
+    res = inc.finish(full)
+    assert res.text == "w1 w2 w3 w4 w5 w6"
+    # staart is veel korter dan de hele utterance
+    assert stt.window_sizes[-1] < full.size // 2
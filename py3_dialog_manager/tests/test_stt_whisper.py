@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import numpy as np
+
+from dialog.interfaces import UtteranceAudio
+from dialog.backends.stt_whisper import _int16_to_float32, _wav_bytes_to_float32
+
+
+def test_samples_path_matches_wav_roundtrip():
+    samples = np.array([0, 1000, -32768, 32767], dtype=np.int16)
+    audio = UtteranceAudio(pcm=None, sample_rate=16000, samples=samples)
+
+    wav = audio.wav_bytes()
+    assert wav[:4] == b"RIFF"
+    assert audio.pcm is wav  # lazy gemaakt en gecachet
+
+    from_wav, sr = _wav_bytes_to_float32(wav)
+    assert sr == 16000
+    np.testing.assert_array_equal(_int16_to_float32(samples), from_wav)
+
+
+class FakeWhisperModel:
+    instances = 0
+
+    def __init__(self, name, device, compute_type, **_kwargs):
+        FakeWhisperModel.instances += 1
+        self.calls = 0
+
+    def transcribe(self, audio, **_kwargs):
+        self.calls += 1
+        return iter(()), None
+
+
+def test_preload_loads_and_warms_up_in_background(monkeypatch):
+    from dialog.backends import stt_whisper
+
+    monkeypatch.setattr(stt_whisper, "WhisperModel", FakeWhisperModel)
+    monkeypatch.setattr(stt_whisper, "_MODEL_REGISTRY", {})
+    stt = stt_whisper.WhisperSTTBackend(mode="CPU", preload=True)
+    assert stt.ready is False
+
+    stt.start_preload()
+    stt._preload_thread.join(timeout=5.0)
+
+    assert stt.ready is True
+    assert stt._model.calls == 1  # warm-up
+
+
+def test_backends_with_same_settings_share_one_model(monkeypatch):
+    from dialog.backends import stt_whisper
+
+    monkeypatch.setattr(stt_whisper, "WhisperModel", FakeWhisperModel)
+    monkeypatch.setattr(stt_whisper, "_MODEL_REGISTRY", {})
+    FakeWhisperModel.instances = 0
+
+    a = stt_whisper.WhisperSTTBackend(mode="CPU", model_cpu="small")
+    b = stt_whisper.WhisperSTTBackend(mode="CPU", model_cpu="small")
+    c = stt_whisper.WhisperSTTBackend(mode="CPU", model_cpu="base")
+
+    assert a._get_model() is b._get_model()
+    assert c._get_model() is not a._get_model()
+    assert FakeWhisperModel.instances == 2
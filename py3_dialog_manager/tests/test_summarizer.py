@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+
+from dialog.interfaces import LLMResult
+from dialog.pipeline import InputLLMOutputPipeline
+from dialog.summarizer import SUMMARY_PREFIX, RollingSummarizer
+from tests.fakes import NullOutput, RecordingLLM, ScriptedInput
+
+
+class SummaryLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, messages):
+        self.prompts.append(messages[-1]["content"])
+        return LLMResult(reply=f"samenvatting {len(self.prompts)}", messages=list(messages))
+
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_evicted_turns_are_summarized_and_sent_after_system_prompt():
+    llm = RecordingLLM(numbered=True)
+    summary_llm = SummaryLLM()
+    summarizer = RollingSummarizer(summary_llm)
+    pipeline = InputLLMOutputPipeline(
+        ScriptedInput(["ik heet Sam", "twee", "drie"]),
+        llm,
+        NullOutput(),
+        status_to_console=False,
+        system_prompt="SYS",
+        max_history_turns=1,
+        summarizer=summarizer,
+    )
+
+    history = pipeline.run_once(history=[]).llm.messages
+    history = pipeline.run_once(history=history).llm.messages  # evict turn 1
+    summarizer.wait()
+    assert summarizer.summary == "samenvatting 1"
+    assert "Gebruiker: ik heet Sam" in summary_llm.prompts[0]
+
+    pipeline.run_once(history=history)
+    summarizer.wait()
+
+    sent = llm.sent[-1]
+    assert sent[0]["content"] == "SYS"
+    assert sent[1]["content"] == SUMMARY_PREFIX + "samenvatting 1"
+    assert [m["content"] for m in sent[2:]] == ["drie"]
+    # turn 2 viel er nu uit en is bij de bestaande samenvatting gevoegd
+    assert "samenvatting 1" in summary_llm.prompts[1]
+    assert summarizer.summary == "samenvatting 2"
+
+
+def test_submit_does_not_block_on_slow_summary():
+    release = threading.Event()
+
+    class SlowLLM:
+        def generate(self, messages):
+            release.wait(5)
+            return LLMResult(reply="klaar", messages=list(messages))
+
+    summarizer = RollingSummarizer(SlowLLM())
+    summarizer.submit([{"role": "user", "content": "a"}])
+    summarizer.submit([{"role": "user", "content": "b"}])
+    assert summarizer.summary_message() is None
+
+    release.set()
+    summarizer.wait()
+    summarizer.wait()
+    assert summarizer.summary == "klaar"
+
+
+def test_pipeline_close_closes_own_summary_model_only():
+    own, shared = SummaryLLM(), SummaryLLM()
+    for summary_llm, owns in ((own, True), (shared, False)):
+        pipeline = InputLLMOutputPipeline(
+            ScriptedInput([]),
+            RecordingLLM(numbered=True),
+            NullOutput(),
+            status_to_console=False,
+            summarizer=RollingSummarizer(summary_llm, owns_llm=owns),
+        )
+        pipeline.close()
+    assert own.closed
+    assert not shared.closed
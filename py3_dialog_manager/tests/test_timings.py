@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+
+from dialog.interfaces import LLMResult, UserInput
+from dialog.pipeline import InputLLMOutputPipeline
+from scripts.latency_report import collect_durations
+from tests.fakes import NullOutput
+
+
+class TimedInput:
+    def get_input(self):
+        return UserInput(
+            raw_text="hoi",
+            text="hoi",
+            timings={"listen_start": 1.0, "speech_start": 1.5, "speech_end": 2.0, "capture_end": 3.0, "stt_done": 3.4},
+        )
+
+
+class EchoLLM:
+    def generate(self, messages):
+        return LLMResult(reply="hoi", messages=list(messages))
+
+
+def test_turn_timings_are_recorded_and_logged(tmp_path):
+    log = tmp_path / "run.jsonl"
+    pipeline = InputLLMOutputPipeline(
+        TimedInput(), EchoLLM(), NullOutput(), status_to_console=False, log_messages_path=str(log)
+    )
+
+    turn = pipeline.run_once(history=[])
+    pipeline.close()
+
+    for stage in ("listen_start", "stt_done", "llm_start", "llm_done", "output_start", "output_done"):
+        assert stage in turn.timings
+
+    records = [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    timing_recs = [r for r in records if r.get("event") == "timings"]
+    assert len(timing_recs) == 1
+    assert timing_recs[0]["durations_ms"]["vad_tail"] == 1000.0
+    assert timing_recs[0]["timings_ms"]["listen_start"] == 0.0
+
+    durations = collect_durations(records)
+    assert durations["stt"] == [400.0]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from dialog.pipeline import InputLLMOutputPipeline
+from dialog.token_budget import TokenEstimator
+from tests.fakes import FixedInput, NullOutput, RecordingLLM
+
+
+def _msg(role, n_chars):
+    return {"role": role, "content": "x" * n_chars}
+
+
+def test_estimator_counts_chars_plus_overhead():
+    est = TokenEstimator(chars_per_token=4, per_message_overhead=4)
+    assert est.count(_msg("user", 40)) == 14
+    assert est.count(_msg("assistant", 41)) == 15  # naar boven afgerond
+    assert est.total([_msg("user", 40), {"role": "user", "content": None}]) == 18
+
+
+def test_budget_drops_oldest_turns_and_pins_system_prompt():
+    llm = RecordingLLM()
+    pipeline = InputLLMOutputPipeline(
+        FixedInput("nu"),
+        llm,
+        NullOutput(),
+        status_to_console=False,
+        system_prompt="S" * 40,  # 14 tokens
+        max_prompt_tokens=60,
+    )
+    history = [
+        _msg("user", 40), _msg("assistant", 400),  # 14 + 104
+        _msg("user", 40), _msg("assistant", 40),   # 14 + 14
+    ]
+
+    pipeline.run_once(history=history)
+
+    assert [m["role"] for m in llm.sent[-1]] == ["system", "user", "assistant", "user"]
+    assert llm.sent[-1][0]["content"] == "S" * 40
+    assert llm.sent[-1][-1]["content"] == "nu"
+    assert pipeline.last_prompt_tokens <= 60
+
+
+def test_budget_keeps_current_turn_even_if_too_large():
+    llm = RecordingLLM()
+    pipeline = InputLLMOutputPipeline(
+        FixedInput("y" * 1000), llm, NullOutput(), status_to_console=False, max_prompt_tokens=10
+    )
+
+    pipeline.run_once(history=[_msg("user", 40), _msg("assistant", 40)])
+
+    assert [m["role"] for m in llm.sent[-1]] == ["user"]
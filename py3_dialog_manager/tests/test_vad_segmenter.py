@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from dialog.backends.vad_segmenter import (
+    Int16RingBuffer,
+    RmsVadConfig,
+    RmsVadUtteranceCapturer,
+    WebRtcVadConfig,
+    WebRtcVadUtteranceCapturer,
+    make_utterance_capturer,
+)
+
+
+def _blocks(*levels, n=320):
+    return [np.full((n,), lvl, dtype=np.int16) for lvl in levels]
+
+
+def _feeder(blocks):
+    it = iter(blocks)
+
+    def get_block(_timeout):
+        try:
+            return next(it)
+        except StopIteration:
+            raise AssertionError("capture vroeg meer blocks dan verwacht")
+
+    return get_block
+
+
+def test_ring_buffer_keeps_newest_samples_in_order():
+    rb = Int16RingBuffer(5)
+    rb.push(np.array([1, 2, 3], dtype=np.int16))
+    rb.push(np.array([4, 5, 6, 7], dtype=np.int16))
+
+    out = np.zeros((5,), dtype=np.int16)
+    n = rb.copy_into(out)
+    assert n == 5
+    assert out.tolist() == [3, 4, 5, 6, 7]
+
+
+def test_capture_includes_pre_roll_and_stops_on_silence():
+    cfg = RmsVadConfig(start_threshold_rms=500, stop_silence_ms=40, pre_roll_ms=20, block_ms=20)
+    vad = RmsVadUtteranceCapturer(cfg)
+
+    audio = vad.capture(_feeder(_blocks(10, 11, 1000, 1000, 0, 0)), timeout_s=5.0)
+
+    # 1 block pre-roll + 2 spraak + 2 stilte
+    assert audio.size == 5 * 320
+    assert audio[0] == 11
+    assert audio[320] == 1000
+
+
+def test_capture_caps_at_max_utterance_and_buffer_is_reusable():
+    cfg = RmsVadConfig(start_threshold_rms=500, pre_roll_ms=0, max_utterance_s=0.06, block_ms=20)
+    vad = RmsVadUtteranceCapturer(cfg)
+
+    first = vad.capture(_feeder(_blocks(1000, 1000, 1000)), timeout_s=5.0)
+    assert first.size == 3 * 320
+
+    second = vad.capture(_feeder(_blocks(0, 2000, 2000, 2000)), timeout_s=5.0)
+    assert second.size == 3 * 320
+    assert int(second[0]) == 2000
+    # eerdere resultaat is een eigen kopie, niet overschreven
+    assert int(first[0]) == 1000
+
+
+def test_capture_times_out_without_speech():
+    vad = RmsVadUtteranceCapturer(RmsVadConfig())
+    with pytest.raises(TimeoutError):
+        vad.capture(lambda _t: None, timeout_s=0.0)
+
+
+def test_make_utterance_capturer_selects_backend():
+    cfg = RmsVadConfig()
+    assert isinstance(make_utterance_capturer(cfg, "rms"), RmsVadUtteranceCapturer)
+    assert isinstance(make_utterance_capturer(cfg, "WebRTC"), WebRtcVadUtteranceCapturer)
+    with pytest.raises(ValueError):
+        make_utterance_capturer(cfg, "energy")
+
+
+def test_webrtc_capturer_ignores_silence():
+    vad = make_utterance_capturer(RmsVadConfig(), "webrtc", aggressiveness=3)
+    silence = _blocks(*([0] * 20))
+    blocks = iter(silence)
+    with pytest.raises(TimeoutError):
+        vad.capture(lambda _t: next(blocks, None), timeout_s=0.05)
+
+
+class StubVad:
+    """webrtcvad.Vad-stub: een frame is spraak als er geen nullen in zitten."""
+
+    frames = []
+
+    def __init__(self, aggressiveness):
+        self.aggressiveness = aggressiveness
+
+    def is_speech(self, frame, sample_rate):
+        StubVad.frames.append((len(frame), sample_rate))
+        return bool(np.frombuffer(frame, dtype=np.int16).all())
+
+
+def test_webrtc_capturer_starts_on_speech_and_stops_on_silence(monkeypatch):
+    monkeypatch.setitem(sys.modules, "webrtcvad", SimpleNamespace(Vad=StubVad))
+    StubVad.frames = []
+    cfg = WebRtcVadConfig(min_speech_ms=80, stop_silence_ms=80, pre_roll_ms=80, block_ms=40)
+    vad = WebRtcVadUtteranceCapturer(cfg)
+
+    half = np.concatenate([np.full(320, 7, dtype=np.int16), np.zeros(320, dtype=np.int16)])
+    click = np.full(640, 9, dtype=np.int16)
+    blocks = _blocks(0, 0, 0, n=640) + [click] + _blocks(0, n=640) + _blocks(5, n=640) + [half] + _blocks(5, n=640)
+    blocks += _blocks(0, 0, n=640)
+    audio = vad.capture(_feeder(blocks), timeout_s=5.0)
+
+    # losse klik (40 ms < min_speech_ms) start niet; start na 80 ms spraak (half stemhebbend telt),
+    # pre-roll = stilte + eerste spraak-block, dan spraak tot 80 ms stilte
+    assert audio.size == 6 * 640
+    assert audio[:640].tolist() == [0] * 640
+    assert audio[640] == 5 and audio[2 * 640] == 7 and audio[3 * 640] == 5
+    assert not audio[4 * 640:].any()
+    assert set(StubVad.frames) == {(320 * 2, 16000)}  # 40 ms block -> twee frames van 20 ms
+
+
+def test_adaptive_threshold_stops_on_fan_noise():
+    cfg = RmsVadConfig(
+        start_threshold_rms=500,
+        stop_silence_ms=60,
+        pre_roll_ms=0,
+        max_utterance_s=2.0,
+        adaptive_threshold=True,
+    )
+    vad = RmsVadUtteranceCapturer(cfg)
+
+    fan, voice = 800, 4000
+    audio = vad.capture(_feeder(_blocks(fan, fan, fan, voice, voice, fan, fan, fan)), timeout_s=5.0)
+
+    # vaste drempel (500) zou op de ventilator starten en nooit stoppen
+    assert audio.size == 5 * 320
+    assert audio[0] == voice
+    assert 700 < vad.noise_floor_rms < 1000
+
+
+def test_adaptive_threshold_keeps_long_speech_together():
+    # regressie: de vloer liep tijdens spraak op tot stop_thr boven de spraak lag
+    cfg = RmsVadConfig(
+        start_threshold_rms=300,
+        stop_silence_ms=200,
+        pre_roll_ms=0,
+        max_utterance_s=30.0,
+        adaptive_threshold=True,
+    )
+    vad = RmsVadUtteranceCapturer(cfg)
+
+    n_speech = 1000  # 20 s spraak bij block_ms=20
+    blocks = _blocks(*([150] * 50 + [1500] * n_speech + [150] * 20))
+    audio = vad.capture(_feeder(blocks), timeout_s=5.0)
+
+    assert audio.size >= n_speech * 320
+    assert vad.noise_floor_rms < 200
+
+
+def _fan_cfg():
+    return RmsVadConfig(
+        start_threshold_rms=500, stop_silence_ms=60, pre_roll_ms=0, max_utterance_s=1.0, adaptive_threshold=True
+    )
+
+
+def test_adaptive_threshold_recovers_from_quiet_first_block():
+    # stream-start levert een (bijna) stil block, daarna alleen de ventilator
+    vad = RmsVadUtteranceCapturer(_fan_cfg())
+    fan, voice = 800, 4000
+
+    first = vad.capture(_feeder(_blocks(0, *([fan] * 60))), timeout_s=5.0)
+    assert first.size == 50 * 320  # vloer 0: ruis start, afgekapt op max_utterance_s
+    assert 700 < vad.noise_floor_rms < 900
+
+    audio = vad.capture(_feeder(_blocks(fan, fan, voice, voice, voice, fan, fan, fan)), timeout_s=5.0)
+    assert audio.size == 6 * 320
+    assert audio[0] == voice
+
+
+def test_adaptive_threshold_follows_noise_step_up():
+    vad = RmsVadUtteranceCapturer(_fan_cfg())
+    quiet, fan, voice = 150, 1200, 6000
+
+    audio = vad.capture(_feeder(_blocks(*([quiet] * 20), voice, voice, quiet, quiet, quiet)), timeout_s=5.0)
+    assert audio.size == 5 * 320
+    assert vad.noise_floor_rms < 200
+
+    # ventilator springt naar een stand boven 3x de oude vloer
+    vad.capture(_feeder(_blocks(*([fan] * 50))), timeout_s=5.0)
+    assert 1100 < vad.noise_floor_rms < 1300
+
+    audio = vad.capture(_feeder(_blocks(fan, fan, voice, voice, fan, fan, fan)), timeout_s=5.0)
+    assert audio.size == 5 * 320
+    assert audio[0] == voice
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import webapp_server
+from dialog.backends.stt_pool import STTPoolTimeout
+
+
+class NotReadySTT:
+    ready = False
+    preload = True
+    loading = True
+
+    def transcribe(self, audio):  # pragma: no cover
+        raise AssertionError("STT not used in these tests")
+
+
+def test_health_reports_stt_readiness(monkeypatch):
+    base_pipeline = SimpleNamespace(system_prompt="SYSTEM")
+    monkeypatch.setattr(webapp_server, "build_pipeline_from_config", lambda *_a, **_k: base_pipeline)
+    monkeypatch.setattr(webapp_server, "make_stt_backend_from_config", lambda *_a, **_k: NotReadySTT())
+
+    app, _, _ = webapp_server.create_app(cfg={}, config_path="<memory>")
+    data = app.test_client().get("/health").get_json()
+
+    assert data["ok"] is True
+    assert data["stt_ready"] is False
+    assert data["stt_loading"] is True
+
+
+def test_health_is_ready_without_preload_before_first_transcribe(monkeypatch):
+    class LazySTT(NotReadySTT):
+        preload = False
+        loading = False
+
+    monkeypatch.setattr(webapp_server, "build_pipeline_from_config", lambda *_a, **_k: SimpleNamespace())
+    monkeypatch.setattr(webapp_server, "make_stt_backend_from_config", lambda *_a, **_k: LazySTT())
+
+    app, _, _ = webapp_server.create_app(cfg={}, config_path="<memory>")
+    data = app.test_client().get("/health").get_json()
+
+    assert data["stt_ready"] is True
+    assert data["stt_loaded"] is False
+
+
+def test_transcribe_timeout_is_503_with_retry_after(monkeypatch):
+    class SlowPool:
+        def transcribe(self, audio):
+            raise STTPoolTimeout("te traag")
+
+    monkeypatch.setattr(webapp_server, "build_pipeline_from_config", lambda *_a, **_k: SimpleNamespace())
+    monkeypatch.setattr(webapp_server, "make_stt_backend_from_config", lambda *_a, **_k: NotReadySTT())
+    monkeypatch.setattr(webapp_server, "make_stt_pool_from_config", lambda *_a, **_k: SlowPool())
+
+    app, _, _ = webapp_server.create_app(cfg={}, config_path="<memory>")
+    resp = app.test_client().post("/api/transcribe", data=b"\x00\x00" * 160)
+
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
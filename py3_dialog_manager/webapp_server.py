@@ -14,6 +14,7 @@ Additions:
 from __future__ import annotations
 
 import argparse
+import atexit
 import json
 import os
 import secrets
@@ -23,7 +24,12 @@ from flask import Flask, jsonify, request, send_from_directory
 
 try:
     from dialog.pipeline import InputLLMOutputPipeline
-    from dialog.pipeline_builder import build_pipeline_from_config, make_stt_backend_from_config
+    from dialog.pipeline_builder import (
+        build_pipeline_from_config,
+        make_stt_backend_from_config,
+        make_stt_pool_from_config,
+    )
+    from dialog.backends.stt_pool import STTPoolBusy
     from dialog.backends.input_fixed_text import FixedTextInputBackend
     from dialog.backends.output_none import NoOpOutputBackend
     from dialog.interfaces import UtteranceAudio
@@ -60,7 +66,13 @@ def create_app(*, cfg: JsonLike, config_path: str) -> Tuple[Flask, Any, InputLLM
     app = Flask(__name__, static_folder="web", static_url_path="")
 
     base_pipeline = build_pipeline_from_config(cfg, config_path=config_path)
+    # bij afsluiten: llm_summary over alle requests schrijven en de log sluiten
+    close_base = getattr(base_pipeline, "close", None)
+    if close_base is not None:
+        atexit.register(close_base)
     stt = make_stt_backend_from_config(cfg)
+    # Flask draait threaded: /api/transcribe gaat via een begrensde pool (503 bij volle wachtrij of timeout).
+    stt_pool = make_stt_pool_from_config(cfg, stt=stt)
 
     # In-memory session histories for intranet testing
     sessions: Dict[str, History] = {}
@@ -84,7 +96,19 @@ def create_app(*, cfg: JsonLike, config_path: str) -> Tuple[Flask, Any, InputLLM
 
     @app.get("/health")
     def health():
-        return jsonify({"ok": True})
+        # stt_loaded: model geladen; stt_loading: preload loopt nog.
+        # stt_ready: zonder preload laadt de eerste transcribe het model zelf (dus klaar);
+        # met preload pas zodra laden + warm-up gelukt zijn.
+        loaded = bool(getattr(stt, "ready", True))
+        return jsonify(
+            {
+                "ok": True,
+                "stt_ready": loaded or not getattr(stt, "preload", False),
+                "stt_loaded": loaded,
+                "stt_loading": bool(getattr(stt, "loading", False)),
+                "stt_pool": stt_pool.stats(),
+            }
+        )
 
     @app.get("/api/state")
     def api_state():
@@ -105,7 +129,12 @@ def create_app(*, cfg: JsonLike, config_path: str) -> Tuple[Flask, Any, InputLLM
             return jsonify({"ok": False, "error": "Geen audio ontvangen."}), 400
 
         audio = UtteranceAudio(pcm=wav_bytes, sample_rate=16000, channels=1, sample_width=2)
-        res = stt.transcribe(audio)
+        try:
+            res = stt_pool.transcribe(audio)
+        except STTPoolBusy:
+            resp = jsonify({"ok": False, "error": "STT is bezet, probeer het zo opnieuw."})
+            resp.headers["Retry-After"] = "1"
+            return resp, 503
         return jsonify({"ok": True, "transcript": res.text, "language": getattr(res, "language", "")})
 
     @app.post("/api/send")
@@ -137,6 +166,13 @@ def create_app(*, cfg: JsonLike, config_path: str) -> Tuple[Flask, Any, InputLLM
             log_messages_path=base_pipeline.log_messages_path,
             log_meta=base_pipeline.log_meta,
             max_history_turns=base_pipeline.max_history_turns,
+            max_prompt_tokens=getattr(base_pipeline, "max_prompt_tokens", None),
+            token_estimator=getattr(base_pipeline, "token_estimator", None),
+            llm_usage=getattr(base_pipeline, "llm_usage", None),  # aggregaat over requests, bij exit gelogd
+            stream_output=getattr(base_pipeline, "stream_output", False),
+            # één gedeelde log (geen eigen bestand per request); delta's per sessie
+            conversation_log=getattr(base_pipeline, "conversation_log", None),
+            session_id=sid,
         )
 
         turn = pipeline.run_once(history=history)
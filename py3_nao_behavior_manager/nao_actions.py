@@ -71,6 +71,12 @@ class NaoActions(object):
         resp.raise_for_status()
         return resp.json()
 
+    def stop_tts(self, timeout=None):
+        """Breek lopende spraak af via /tts_stop (barge-in)."""
+        resp = self._post_json("/tts_stop", {}, timeout=timeout or self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
     def list_behaviors(self, timeout=None):
         """Vraag alle geïnstalleerde behaviors op (/list_behaviors)."""
         resp = self._get("/list_behaviors", timeout=timeout or self.timeout)
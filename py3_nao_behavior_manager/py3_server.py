@@ -107,6 +107,10 @@ def create_app(py2_api_url=None):
             return jsonify({"status": "error", "error": "Missing 'text'"}), 400
         return _wrap_py2_call(nao_actions.say_native, text)
 
+    @app.route("/nao/tts_stop", methods=["POST"])
+    def nao_tts_stop():
+        return _wrap_py2_call(nao_actions.stop_tts)
+
     @app.route("/nao/tts_speed", methods=["POST"])
     def nao_tts_speed():
         data = request.get_json(force=True, silent=True) or {}